@@ -0,0 +1,3 @@
+from burnote.aio import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,102 @@
+"""
+Burn-after-reading: single-winner check and read latency.
+
+Races several threads reading the same burn-after-reading note and
+verifies that exactly one of them receives the plaintext, then compares
+the latency of ``Note.consume`` with the previous read path (SELECT,
+decrypt, UPDATE blanking the row).
+
+Usage (from the ``backend`` directory)::
+
+    BENCH_DATABASE_URI=sqlite:////tmp/bench.db python -m benchmarks.burn
+"""
+import argparse
+import threading
+from datetime import datetime, timezone
+
+from benchmarks.common import (BenchmarkConfig, print_row, summarize,
+                               timed)
+from burnote import create_app, db
+from burnote.models import Note
+from burnote.models.errors import DecryptionError
+
+NOTE = {'title': 'benchmark', 'text': 'x' * 1024, 'expiration': None,
+        'burn_after_reading': True, 'password': ''}
+
+
+def race(app, readers: int) -> int:
+    """
+    Let ``readers`` threads read one note at the same time.
+
+    :return: Number of readers that received the note
+    """
+    with app.app_context():
+        _, key = Note.create(NOTE, save=True)
+
+    barrier = threading.Barrier(readers)
+    winners = []
+
+    def reader():
+        with app.app_context():
+            barrier.wait()
+            try:
+                note = Note.consume(key, '')
+            except DecryptionError:
+                note = None
+            if note is not None and note.text == NOTE['text']:
+                winners.append(note)
+            db.session.remove()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(winners)
+
+
+def legacy_read(key: str) -> None:
+    """
+    The read path used before ``Note.consume``.
+    """
+    note = Note.get_by_key(key)
+    note.decrypt(key, '')
+    note.is_expired = True
+    note.expiration_date = datetime.now(timezone.utc)
+    note.text = b''
+    note.title = b''
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--reads', type=int, default=1_000)
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    results = [race(app, args.readers) for _ in range(args.rounds)]
+    print(f'{args.rounds} races with {args.readers} readers: '
+          f'winners per race {sorted(set(results))}')
+    if set(results) != {1}:
+        raise SystemExit('FAIL: a note was read more than once or never')
+
+    with app.app_context():
+        keys = [Note.create(NOTE, save=True)[1] for _ in range(args.reads)]
+        print_row('legacy select+update',
+                  summarize(timed(lambda i: legacy_read(keys[i]),
+                                  args.reads)))
+        keys = [Note.create(NOTE, save=True)[1] for _ in range(args.reads)]
+        print_row('delete returning',
+                  summarize(timed(lambda i: Note.consume(keys[i], ''),
+                                  args.reads)))
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
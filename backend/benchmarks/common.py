@@ -0,0 +1,78 @@
+import os
+import statistics
+import time
+
+from settings import Config
+
+
+class BenchmarkConfig(Config):
+    """
+    Configuration used by benchmark scripts.
+
+    The database is taken from ``BENCH_DATABASE_URI`` so a benchmark
+    can never touch the application database by accident.
+    """
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = os.getenv('BENCH_DATABASE_URI',
+                                        'sqlite:///bench.db')
+    REAPER_INTERVAL = 0
+
+
+def percentile(samples: list, pct: float) -> float:
+    """
+    Return the given percentile of the samples (nearest-rank method).
+
+    :param samples: Measured values
+    :param pct: Percentile in range 0-100
+    :return: The percentile value
+    """
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1,
+                      round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list) -> dict:
+    """
+    Summarize latency samples measured in seconds.
+
+    :param samples: Measured latencies in seconds
+    :return: Dictionary with mean, p50, p95 and p99 in milliseconds
+    """
+    return {
+        'count': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+    }
+
+
+def timed(func, repeat: int) -> list:
+    """
+    Call ``func`` ``repeat`` times and return per-call latencies.
+
+    :param func: Callable taking the iteration number
+    :param repeat: Number of calls
+    :return: List of latencies in seconds
+    """
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def print_row(label: str, stats: dict) -> None:
+    """
+    Print a single line of a benchmark report.
+
+    :param label: Row label
+    :param stats: Statistics returned by :func:`summarize`
+    :return: None
+    """
+    print(f'{label:<32} ' + '  '.join(
+        f'{k}={v:.3f}' if isinstance(v, float) else f'{k}={v}'
+        for k, v in stats.items()))
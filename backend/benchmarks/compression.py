@@ -0,0 +1,122 @@
+"""
+Storage saved by compressing notes before encryption, and its CPU cost.
+
+Encrypts and decrypts notes of typical content (JSON logs, a
+configuration file, base64 data, random bytes in hex) and sizes with
+compression off, zlib and zstd (if zstandard is installed) at a few
+levels. Reports the stored size relative to the plaintext and the
+encryption and decryption latency. Small and incompressible notes are
+stored uncompressed by the adaptive choice, so their size stays at
+100%. No database is needed.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.compression --repeat 200
+"""
+import argparse
+import base64
+import json
+import os
+import random
+
+from benchmarks.common import summarize, timed
+from burnote.models.compression import (NONE, SAMPLE_SIZE, ZLIB, ZSTD,
+                                        compression, zstandard)
+from burnote.models.encryption import Encryptor, decode_stream
+
+KEY = 'abcd1234'
+PASSWORD = ''
+TITLE = 'benchmark'
+SIZES = (512, 16 * 1024, 1024 * 1024)
+
+
+def json_log(size: int) -> str:
+    rng = random.Random(1)
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append(json.dumps({
+            'time': f'2025-01-01T12:{rng.randrange(60):02}:'
+                    f'{rng.randrange(60):02}Z',
+            'level': rng.choice(['info', 'info', 'warning', 'error']),
+            'request_id': f'{rng.getrandbits(64):016x}',
+            'path': rng.choice(['/api/v1/notes', '/about', '/']),
+            'status': rng.choice([200, 200, 201, 404]),
+            'duration_ms': round(rng.expovariate(0.1), 2),
+        }) + '\n')
+    return ''.join(lines)[:size]
+
+
+def config_file(size: int) -> str:
+    rng = random.Random(2)
+    lines = []
+    while sum(map(len, lines)) < size:
+        section = rng.choice(['server', 'database', 'cache', 'logging'])
+        lines.append(f'[{section}.{rng.randrange(100)}]\n'
+                     f'host = "10.0.{rng.randrange(256)}.'
+                     f'{rng.randrange(256)}"\nport = '
+                     f'{rng.randrange(1024, 65536)}\nenabled = true\n\n')
+    return ''.join(lines)[:size]
+
+
+def base64_data(size: int) -> str:
+    return base64.b64encode(random.Random(3).randbytes(size))[:size].decode()
+
+
+def random_hex(size: int) -> str:
+    return os.urandom(size // 2 + 1).hex()[:size]
+
+
+CONTENTS = {'json log': json_log, 'config': config_file,
+            'base64': base64_data, 'random hex': random_hex}
+
+
+def configure(algorithm: int, level: int) -> None:
+    compression.algorithm = algorithm
+    compression.level = level
+    compression.min_size = 1024
+    compression.max_ratio = 0.9
+    compression.limit = 0
+
+
+def encrypt(text: str) -> bytes:
+    return b''.join(Encryptor.encrypt_note(TITLE, text, PASSWORD, KEY))
+
+
+def decrypt(envelope: bytes) -> str:
+    _, text = Encryptor.decrypt_note([envelope], PASSWORD, KEY)
+    return ''.join(decode_stream(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='Calls per measurement (divided for '
+                             'large notes)')
+    args = parser.parse_args()
+
+    settings = [('none', NONE, 0), ('zlib 1', ZLIB, 1), ('zlib 6', ZLIB, 6)]
+    if zstandard is not None:
+        settings += [('zstd 1', ZSTD, 1), ('zstd 3', ZSTD, 3)]
+    print(f'Compressibility is estimated on the first {SAMPLE_SIZE} '
+          f'bytes; notes under 1024 bytes are not compressed')
+    print(f'{"content":<11} {"size":>8} {"setting":<7} {"stored":>7} '
+          f'{"encrypt ms":>10} {"decrypt ms":>10}')
+    for name, generate in CONTENTS.items():
+        for size in SIZES:
+            text = generate(size)
+            repeat = max(5, args.repeat * 16 * 1024 // max(size, 16 * 1024))
+            for label, algorithm, level in settings:
+                configure(algorithm, level)
+                envelope = encrypt(text)
+                assert decrypt(envelope) == text
+                encrypted = summarize(timed(lambda i: encrypt(text), repeat))
+                decrypted = summarize(timed(lambda i: decrypt(envelope),
+                                            repeat))
+                print(f'{name:<11} {size:>8} {label:<7} '
+                      f'{len(envelope) / size:>7.1%} '
+                      f'{encrypted["p50_ms"]:>10.3f} '
+                      f'{decrypted["p50_ms"]:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Note creation throughput with many parallel writers.
+
+Compares the optimistic insert of ``Note.create`` with the previous
+allocation strategy, which probed the database with a SELECT for every
+candidate key before inserting.
+
+Usage (from the ``backend`` directory)::
+
+    BENCH_DATABASE_URI=postgresql+psycopg2://... \\
+        python -m benchmarks.create --writers 32
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.common import BenchmarkConfig
+from burnote import create_app, db
+from burnote.models import Note
+from burnote.models.keys import random_key
+
+NOTE = {'title': 'benchmark', 'text': 'x' * 1024, 'expiration': None,
+        'burn_after_reading': False, 'password': ''}
+
+
+def probing_create(data: dict) -> None:
+    """
+    The creation path used before optimistic key allocation.
+    """
+    key = random_key()
+    while Note.get_by_key(key, silent=True):
+        key = random_key()
+    note = Note.from_dict(data)
+    note.hash = Note.generate_hash(key)
+    note.encrypt(key, data['password'])
+    note.save()
+
+
+def optimistic_create(data: dict) -> None:
+    Note.create(data, save=True)
+
+
+def run(app, create, writers: int, per_writer: int) -> float:
+    """
+    Run ``writers`` threads creating ``per_writer`` notes each.
+
+    :return: Notes created per second
+    """
+    barrier = threading.Barrier(writers + 1)
+
+    def writer():
+        with app.app_context():
+            barrier.wait()
+            for _ in range(per_writer):
+                create(NOTE)
+            db.session.remove()
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return writers * per_writer / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--notes', type=int, default=200,
+                        help='Notes created by every writer')
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    for label, create in (('select probe + insert', probing_create),
+                          ('optimistic insert', optimistic_create)):
+        rate = run(app, create, args.writers, args.notes)
+        print(f'{label:<32} writers={args.writers}  notes/s={rate:.1f}')
+
+    with app.app_context():
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Throughput of note encryption and decryption with the crypto pool.
+
+Client threads, like the threads of a gthread worker, build and decrypt
+notes of a mixed workload: mostly small notes and some large ones. The
+run is repeated with the crypto on the client threads, on a thread
+pool and on a process pool, for several numbers of workers. It reports
+the throughput and the latency of small and large notes. No database
+is needed; ``COMPRESSION`` and ``KDF`` apply as configured.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.cryptopool --clients 8 --seconds 5
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+from benchmarks.common import BenchmarkConfig, percentile
+from burnote import create_app
+from burnote.models import Note
+from burnote.models.cryptopool import crypto_pool
+
+
+def text_of(size: int) -> str:
+    rng = random.Random(size)
+    words = ['request', 'ok', 'GET', '/api/v1/notes', 'error', 'user',
+             'timeout', 'cache', 'miss', 'hit']
+    return ' '.join(f'{rng.choice(words)}={rng.getrandbits(32):x}'
+                    for _ in range(size // 12))[:size]
+
+
+def run(clients: int, seconds: float, small: str, large: str,
+        large_share: float) -> dict:
+    """
+    Build and decrypt notes on ``clients`` threads for ``seconds``.
+
+    :return: Dictionary with the throughput and latency percentiles
+    """
+    deadline = time.perf_counter() + seconds
+    latencies = {'small': [], 'large': []}
+    lock = threading.Lock()
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            kind = 'large' if rng.random() < large_share else 'small'
+            text = large if kind == 'large' else small
+            start = time.perf_counter()
+            key = f'{seed:04}{rng.getrandbits(32):08x}'
+            note = Note.build({'title': 'benchmark', 'text': text,
+                               'expiration': None}, key)
+            assert note.decrypt(key, '').text == text
+            with lock:
+                latencies[kind].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    done = len(latencies['small']) + len(latencies['large'])
+    return {
+        'notes_per_s': done / seconds,
+        'small_p50_ms': percentile(latencies['small'], 50) * 1000,
+        'small_p99_ms': percentile(latencies['small'], 99) * 1000,
+        'large_p50_ms': (percentile(latencies['large'], 50) * 1000
+                         if latencies['large'] else 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--small', type=int, default=1024,
+                        help='Size of small notes in characters')
+    parser.add_argument('--large', type=int, default=4 << 20,
+                        help='Size of large notes in characters')
+    parser.add_argument('--large-share', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    small, large = text_of(args.small), text_of(args.large)
+    print(f'{args.clients} clients, {args.large_share:.0%} notes of '
+          f'{args.large} characters, others of {args.small}, '
+          f'{os.cpu_count()} CPUs')
+    setups = [('inline', '', 0)] + [
+        (f'{kind} x{workers}', kind, workers)
+        for kind in ('thread', 'process') for workers in args.workers]
+    for label, kind, workers in setups:
+        class Config(BenchmarkConfig):
+            CRYPTO_EXECUTOR = kind
+            CRYPTO_WORKERS = workers
+            CRYPTO_OFFLOAD_SIZE = args.large
+
+        app = create_app(Config)
+        with app.app_context():
+            # Start the workers before measuring
+            run(args.clients, 0.5, small, large, args.large_share)
+            result = run(args.clients, args.seconds, small, large,
+                         args.large_share)
+        print(f'{label:<12} ' + '  '.join(f'{k}={v:.1f}'
+                                          for k, v in result.items()))
+        if crypto_pool.executor is not None:
+            crypto_pool.executor.shutdown()
+            crypto_pool.executor = None
+
+
+if __name__ == '__main__':
+    main()
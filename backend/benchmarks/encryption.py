@@ -0,0 +1,75 @@
+"""
+Micro-benchmarks of ``burnote.models.encryption``.
+
+Measures key derivation and the encryption and decryption of a note in
+the envelope format (title and text under one key and one AEAD
+operation) against the previous layout with two separate ciphertexts,
+for several note sizes. No database is needed.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.encryption --repeat 2000
+"""
+import argparse
+
+from benchmarks.common import print_row, summarize, timed
+from burnote.models.encryption import Encryptor, decode_stream
+
+KEY = 'abcd1234'
+PASSWORD = 'password'
+TITLE = 'benchmark'
+SIZES = (100, 1024, 64 * 1024, 1024 * 1024)
+
+
+def encrypt_pair(text: str) -> tuple[bytes, bytes]:
+    """
+    Encrypt title and text separately, as before the envelope format.
+    """
+    return (Encryptor.encrypt_data(TITLE, PASSWORD, KEY),
+            Encryptor.encrypt_data(text, PASSWORD, KEY))
+
+
+def decrypt_pair(title: bytes, text: bytes) -> tuple[str, str]:
+    return (Encryptor.decrypt_data(title, PASSWORD, KEY),
+            Encryptor.decrypt_data(text, PASSWORD, KEY))
+
+
+def encrypt_envelope(text: str) -> bytes:
+    return b''.join(Encryptor.encrypt_note(TITLE, text, PASSWORD, KEY))
+
+
+def decrypt_envelope(envelope: bytes) -> tuple[str, str]:
+    title, text = Encryptor.decrypt_note([envelope], PASSWORD, KEY)
+    return title, ''.join(decode_stream(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=2000,
+                        help='Calls per measurement (divided for '
+                             'large notes)')
+    args = parser.parse_args()
+
+    print_row('generate_key', summarize(timed(
+        lambda i: Encryptor.generate_key(PASSWORD, KEY), args.repeat)))
+
+    for size in SIZES:
+        text = 'x' * size
+        repeat = max(10, args.repeat * 1024 // max(size, 1024))
+        title_ct, text_ct = encrypt_pair(text)
+        envelope = encrypt_envelope(text)
+        overhead = len(title_ct) + len(text_ct) - size - len(TITLE)
+        print(f'{size} bytes: stored overhead two ciphertexts={overhead} '
+              f'envelope={len(envelope) - size - len(TITLE)}')
+        print_row('  encrypt two ciphertexts', summarize(timed(
+            lambda i: encrypt_pair(text), repeat)))
+        print_row('  encrypt envelope', summarize(timed(
+            lambda i: encrypt_envelope(text), repeat)))
+        print_row('  decrypt two ciphertexts', summarize(timed(
+            lambda i: decrypt_pair(title_ct, text_ct), repeat)))
+        print_row('  decrypt envelope', summarize(timed(
+            lambda i: decrypt_envelope(envelope), repeat)))
+
+
+if __name__ == '__main__':
+    main()
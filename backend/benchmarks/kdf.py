@@ -0,0 +1,65 @@
+"""
+Password KDF throughput.
+
+Reports derivations per second, in total and per core, for each KDF
+parameter set, with one worker and with one worker per core. Use it to
+choose ``KDF`` and ``KDF_WORKERS`` and to size the fleet: a process
+serves at most ``KDF_WORKERS`` times the single-worker rate of
+password-protected creates and reads.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.kdf --spec scrypt:16384:8:1 --spec pbkdf2:600000
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from burnote.models.kdf import derive, parse
+
+SPECS = ('scrypt:16384:8:1', 'scrypt:32768:8:1', 'scrypt:65536:8:1',
+         'pbkdf2:210000', 'pbkdf2:600000')
+
+
+def rate(spec: str, workers: int, duration: float) -> float:
+    """
+    Run derivations on ``workers`` threads for ``duration`` seconds.
+
+    :return: Derivations per second
+    """
+    deadline = time.perf_counter() + duration
+
+    def work(worker: int) -> int:
+        count = 0
+        while time.perf_counter() < deadline:
+            derive('correct horse', f'key{worker:05d}', spec)
+            count += 1
+        return count
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        total = sum(executor.map(work, range(workers)))
+    return total / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--spec', action='append',
+                        help='KDF spec, can be repeated (default: a set '
+                             'of scrypt and PBKDF2 parameters)')
+    parser.add_argument('--duration', type=float, default=3)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    for spec in args.spec or SPECS:
+        parse(spec)
+        single = rate(spec, 1, args.duration)
+        parallel = rate(spec, cores, args.duration)
+        print(f'{spec:<20} 1 worker: {single:8.1f}/s  '
+              f'{cores} workers: {parallel:8.1f}/s '
+              f'({parallel / cores:.1f}/s per core)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+HTTP load test of the note API.
+
+Drives a running deployment with many concurrent clients creating and
+reading notes and reports requests per second and p50/p99 latency.
+Pass several targets to compare deployments, e.g. the sync gunicorn
+server and the ASGI server::
+
+    gunicorn --bind 127.0.0.1:8000 --workers 4 manage:app
+    uvicorn --port 8001 --workers 4 asgi:app
+
+    python -m benchmarks.loadtest --clients 500 --duration 30 \\
+        --target sync=http://127.0.0.1:8000 \\
+        --target async=http://127.0.0.1:8001
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.common import print_row, summarize
+
+NOTE = {'title': 'load test', 'text': 'x' * 1024}
+
+
+async def prepare(client: httpx.AsyncClient, count: int) -> list:
+    """
+    Create ``count`` notes to be read during the test.
+
+    :return: Keys of the created notes
+    """
+    keys = []
+    for _ in range(count):
+        response = await client.post('/api/v1/notes/create', json=NOTE)
+        response.raise_for_status()
+        keys.append(response.json()['key'])
+    return keys
+
+
+async def worker(client: httpx.AsyncClient, keys: list, read_ratio: float,
+                 deadline: float, samples: dict, errors: dict) -> None:
+    while time.perf_counter() < deadline:
+        if random.random() < read_ratio:
+            operation = 'read'
+            request = client.post('/api/v1/notes',
+                                  json={'key': random.choice(keys)})
+        else:
+            operation = 'create'
+            request = client.post('/api/v1/notes/create', json=NOTE)
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            errors[operation] += 1
+            continue
+        samples[operation].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            errors[operation] += 1
+
+
+async def run(url: str, clients: int, duration: float, read_ratio: float,
+              notes: int) -> tuple[dict, dict, float]:
+    limits = httpx.Limits(max_connections=clients,
+                          max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=url, limits=limits,
+                                 timeout=60) as client:
+        keys = await prepare(client, notes)
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            worker(client, keys, read_ratio, deadline, samples, errors)
+            for _ in range(clients)
+        ))
+        return samples, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--target', action='append', required=True,
+                        help='LABEL=URL of a deployment, can be repeated')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--notes', type=int, default=100,
+                        help='Notes created before the test for reading')
+    args = parser.parse_args()
+
+    for target in args.target:
+        label, _, url = target.partition('=')
+        samples, errors, elapsed = asyncio.run(run(
+            url, args.clients, args.duration, args.read_ratio, args.notes))
+        total = sum(len(s) for s in samples.values())
+        print(f'{label}: {total / elapsed:.1f} req/s with '
+              f'{args.clients} clients')
+        for operation, latencies in sorted(samples.items()):
+            print_row(f'  {operation}', {**summarize(latencies),
+                                         'errors': errors[operation]})
+
+
+if __name__ == '__main__':
+    main()
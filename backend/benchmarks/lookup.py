@@ -0,0 +1,121 @@
+"""
+Lookup latency of large notes that are expired or read with a wrong
+password.
+
+Compares the lookup of ``Note.get_by_key``, which reads only the
+lightweight columns and evaluates expiry in SQL, with the previous
+lookup loading the whole row, ciphertext included. An expired note is
+answered without its ciphertext; a wrong password still needs it, now
+with a second query. The API rows measure complete requests.
+
+Usage (from the ``backend`` directory)::
+
+    BENCH_DATABASE_URI=sqlite:////tmp/bench.db KDF=pbkdf2:1000 \\
+        python -m benchmarks.lookup --size 1048576
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer_group
+
+from benchmarks.common import (BenchmarkConfig, print_row, summarize,
+                               timed)
+from burnote import create_app, db
+from burnote.models import Note
+from burnote.models.errors import DecryptionError
+
+
+def eager_lookup(key: str) -> Note:
+    """
+    The lookup before the ciphertext columns were deferred.
+    """
+    return db.session.scalar(
+        select(Note).where(Note.with_hash(Note.generate_hash(key)))
+        .options(undefer_group('content')))
+
+
+def seed(count: int, size: int) -> tuple[list, list]:
+    """
+    Create ``count`` expired notes and ``count`` password-protected ones
+    with a text of ``size`` characters.
+
+    :return: A tuple of (expired keys, password-protected keys)
+    """
+    note = {'title': 'benchmark', 'text': 'x' * size,
+            'expiration': timedelta(days=1), 'burn_after_reading': False}
+    expired = [Note.create({**note, 'password': ''}, save=True)[1]
+               for _ in range(count)]
+    protected = [Note.create({**note, 'password': 'secret'}, save=True)[1]
+                 for _ in range(count)]
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    db.session.execute(
+        update(Note).where(Note.hash.in_(
+            [Note.generate_hash(key) for key in expired]))
+        .values(expiration_date=yesterday.replace(tzinfo=None)))
+    db.session.commit()
+    return expired, protected
+
+
+def wrong_password(note: Note, key: str) -> None:
+    try:
+        note.read(key, 'wrong')
+    except DecryptionError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=1 << 20,
+                        help='Text size of the notes in characters')
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        expired, protected = seed(args.notes, args.size)
+
+    def lookups(keys: list, find, then=None):
+        def run(i):
+            key = keys[i % len(keys)]
+            note = find(key)
+            if then is None:
+                assert not note.is_available()
+            else:
+                then(note, key)
+            db.session.rollback()
+        return run
+
+    client = app.test_client()
+
+    def request(keys: list, password: str = ''):
+        def run(i):
+            response = client.post('/api/v1/notes', json={
+                'key': keys[i % len(keys)], 'password': password})
+            assert response.status_code == 400
+        return run
+
+    rows = {
+        'expired, eager lookup': lookups(expired, eager_lookup),
+        'expired, deferred lookup': lookups(expired, Note.get_by_key),
+        'wrong password, eager lookup': lookups(protected, eager_lookup,
+                                                wrong_password),
+        'wrong password, deferred lookup': lookups(
+            protected, Note.get_by_key, wrong_password),
+        'API expired': request(expired),
+        'API wrong password': request(protected, 'wrong'),
+    }
+    print(f'{args.notes} expired and {args.notes} password-protected notes '
+          f'of {args.size} characters')
+    with app.test_request_context():
+        for label, func in rows.items():
+            func(0)
+            print_row(label, summarize(timed(func, args.repeat)))
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+CPU time of request parsing and response serialization.
+
+Checks that the functions of ``burnote.api.v1.payloads`` return the
+same data and the same error messages as the marshmallow schemas for
+a set of valid and invalid payloads, then compares the CPU time both
+spend per create and per view request. No database is needed.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.payloads --repeat 100000
+"""
+import argparse
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+from marshmallow import ValidationError
+
+from burnote.api.v1.payloads import dump_note, load_access, load_note
+from burnote.api.v1.schemas import NoteAccessDataSchema, NoteDataSchema
+from settings import NOTE_PASSWORD_MAX_LENGTH, NOTE_TITLE_MAX_LENGTH
+
+CREATE = {'title': 'benchmark', 'text': 'x' * 1024, 'expiration': 60,
+          'burn_after_reading': True, 'password': 'secret'}
+VIEW = {'key': 'abcd1234', 'password': 'secret'}
+NOTE = SimpleNamespace(title='benchmark', text='x' * 1024,
+                       timestamp=datetime(2025, 1, 1, 12, 0, 0, 123456),
+                       expiration_date=datetime(2025, 1, 1, 13),
+                       burn_after_reading=True)
+
+CREATE_CASES = [
+    CREATE, {'text': 'only text'}, {}, [], None, 'text', {'text': None},
+    {'text': 5}, {'text': b'bytes'}, {'text': b'\xff'},
+    {'text': 'x', 'title': None}, {'text': 'x', 'title': ['a']},
+    {'text': 'x', 'expiration': '15'}, {'text': 'x', 'expiration': 1.9},
+    {'text': 'x', 'expiration': True}, {'text': 'x', 'expiration': 'soon'},
+    {'text': 'x', 'expiration': 10 ** 20}, {'text': 'x', 'expiration': []},
+    {'text': 'x', 'burn_after_reading': 'yes'},
+    {'text': 'x', 'burn_after_reading': 0},
+    {'text': 'x', 'burn_after_reading': 2},
+    {'text': 'x', 'burn_after_reading': None},
+    {'text': 'x', 'burn_after_reading': []},
+    {'text': 'x', 'password': None}, {'text': 'x', 'key': 'abc'},
+    {'title': 5, 'burn_after_reading': 'maybe', 'timestamp': 'now'},
+    {'text': 'x', 'title': 't' * (NOTE_TITLE_MAX_LENGTH + 1)},
+    {'text': 'x', 'password': 'p' * (NOTE_PASSWORD_MAX_LENGTH + 1),
+     'title': 't' * NOTE_TITLE_MAX_LENGTH},
+]
+VIEW_CASES = [
+    VIEW, {'key': 'abcd1234'}, {}, [], None, {'key': None}, {'key': 5},
+    {'key': 'k', 'password': None}, {'key': 'k', 'password': 1},
+    {'key': 'k', 'note': {}}, {'password': 'p', 'extra': 1},
+]
+
+
+def outcome(load, payload):
+    try:
+        return load(payload)
+    except ValidationError as err:
+        return 'error', err.messages
+
+
+def check() -> None:
+    """
+    Compare both implementations on every case.
+
+    :raises SystemExit: If any result differs
+    """
+    note_schema, access_schema = NoteDataSchema(), NoteAccessDataSchema()
+    cases = ([(load_note, note_schema.load, c) for c in CREATE_CASES] +
+             [(load_access, access_schema.load, c) for c in VIEW_CASES])
+    for lean, reference, payload in cases:
+        if outcome(lean, payload) != outcome(reference, payload):
+            raise SystemExit(f'FAIL: {payload!r}: {outcome(lean, payload)}'
+                             f' != {outcome(reference, payload)}')
+    if dump_note(NOTE) != note_schema.dump(NOTE):
+        raise SystemExit('FAIL: serialized notes differ')
+    print(f'{len(cases)} payloads and the serialized note are identical')
+
+
+def cpu_time(func, repeat: int) -> float:
+    """
+    :return: CPU microseconds per call
+    """
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=100_000)
+    args = parser.parse_args()
+
+    check()
+    note_schema, access_schema = NoteDataSchema(), NoteAccessDataSchema()
+    rows = {
+        'create': (lambda: note_schema.load(CREATE),
+                   lambda: load_note(CREATE)),
+        'view': (lambda: note_schema.dump(NOTE) and access_schema.load(VIEW),
+                 lambda: dump_note(NOTE) and load_access(VIEW)),
+        'create (invalid)': (lambda: outcome(note_schema.load, {}),
+                             lambda: outcome(load_note, {})),
+    }
+    for label, (reference, lean) in rows.items():
+        before = cpu_time(reference, args.repeat)
+        after = cpu_time(lean, args.repeat)
+        print(f'{label:<18} marshmallow {before:7.2f} us  '
+              f'payloads {after:7.2f} us  saved {before - after:7.2f} us '
+              f'per request ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Lookup latency and table size before and after reaping.
+
+Seeds the benchmark database with historical notes (burned and
+time-expired) plus a small number of live ones, then measures
+``Note.get_by_key`` latency and the size of the ``note`` table
+before and after running the reaper.
+
+Usage (from the ``backend`` directory)::
+
+    BENCH_DATABASE_URI=postgresql+psycopg2://... \\
+        python -m benchmarks.reaper --notes 10000000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, text
+
+from benchmarks.common import (BenchmarkConfig, print_row, summarize,
+                               timed)
+from burnote import create_app, db
+from burnote.models import Note
+from burnote.models.reaper import reap
+
+SEED_CHUNK = 10_000
+
+
+def seed(total: int, live: int) -> list:
+    """
+    Insert ``total`` notes, of which ``live`` stay available.
+
+    :return: Keys of the live notes
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    payload = os.urandom(256)
+    live_keys = []
+    for start in range(0, total, SEED_CHUNK):
+        rows = []
+        for i in range(start, min(start + SEED_CHUNK, total)):
+            key = f'bench{i:011d}'
+            is_live = i % (total // live or 1) == 0 and len(live_keys) < live
+            if is_live:
+                live_keys.append(key)
+            rows.append({
+                'hash': Note.generate_hash(key),
+                'is_expired': not is_live and i % 2 == 0,
+                'title': b'',
+                'text': payload,
+                'timestamp': now - timedelta(days=30),
+                'expiration_date': (None if is_live
+                                    else now - timedelta(days=1)),
+                'burn_after_reading': False,
+            })
+        db.session.execute(insert(Note), rows)
+        db.session.commit()
+    return live_keys
+
+
+def table_size() -> int:
+    """
+    Return the number of bytes used by the ``note`` table and its indexes.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text('VACUUM ANALYZE note').execution_options(
+            isolation_level='AUTOCOMMIT'))
+        return db.session.execute(
+            text("SELECT pg_total_relation_size('note')")).scalar()
+    db.session.execute(text('VACUUM'))
+    page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+    pages = db.session.execute(text('PRAGMA page_count')).scalar()
+    return page_size * pages
+
+
+def measure(label: str, keys: list, lookups: int) -> None:
+    def lookup(_):
+        Note.get_by_key(random.choice(keys), silent=True)
+        db.session.rollback()
+
+    rows = db.session.query(Note).count()
+    print_row(label, {'rows': rows, 'size_mb': table_size() / 2 ** 20,
+                      **summarize(timed(lookup, lookups))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=100_000)
+    parser.add_argument('--live', type=int, default=1_000)
+    parser.add_argument('--lookups', type=int, default=2_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        keys = seed(args.notes, args.live)
+
+        measure('before reap', keys, args.lookups)
+        start = time.perf_counter()
+        deleted = reap(args.batch_size)
+        print(f'reaped {deleted} notes in '
+              f'{time.perf_counter() - start:.2f}s')
+        measure('after reap', keys, args.lookups)
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
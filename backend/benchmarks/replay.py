@@ -0,0 +1,209 @@
+"""
+Replay a JSONL traffic trace against a running deployment.
+
+Every line of the trace describes one request to the note API, without
+any note content::
+
+    {"ts": 1718000000.25, "endpoint": "create", "id": "n1", "size": 2048,
+     "title_size": 12, "password": true, "burn_after_reading": false,
+     "expiration": 60}
+    {"ts": 1718000003.5, "endpoint": "view", "id": "n1",
+     "password_ok": true}
+
+``ts`` is a Unix timestamp or an ISO 8601 date. A ``create`` entry is
+sent to ``NotesCreateResource`` with a text of ``size`` characters
+(``expiration`` in minutes); a ``view`` entry reads the note created
+by the entry with the same ``id`` through ``NotesViewResource``, with
+a wrong password if ``password_ok`` is false, and is a lookup of an
+unknown key if no such note was created. The trace is read lazily, so
+it can be larger than memory; it must be ordered by ``ts``.
+
+Requests are sent at their original offsets divided by ``--speed-up``
+(0 sends them as fast as ``--concurrency`` allows) and the report shows
+the latency distribution and status codes per endpoint, and how far the
+client fell behind the schedule.
+
+Usage (from the ``backend`` directory)::
+
+    python -m benchmarks.replay trace.jsonl --url http://127.0.0.1:8000 \\
+        --speed-up 10 --concurrency 500
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Iterator, Optional
+
+import httpx
+
+from benchmarks.common import print_row, summarize
+from burnote.models.keys import random_key
+
+PASSWORD = 'replay password'
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    """
+    Yield the entries of a trace one by one.
+
+    :param path: Path of the JSONL trace
+    :return: Iterator over the entries, with ``ts`` in seconds
+    """
+    with open(path) as file:
+        for line in file:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if isinstance(entry['ts'], str):
+                entry['ts'] = datetime.fromisoformat(entry['ts']).timestamp()
+            yield entry
+
+
+class Replay:
+    """
+    Sends the entries of a trace and collects the results.
+
+    Created notes are kept by trace ``id`` until they are burned, as a
+    future of their key, so a view that follows its create closely
+    waits for the create to finish instead of reading an unknown key.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.concurrency = concurrency
+        self.slots = asyncio.Semaphore(concurrency)
+        self.notes = {}
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.max_lag = 0.0
+
+    async def send(self, endpoint: str, path: str,
+                   body: dict) -> Optional[httpx.Response]:
+        async with self.slots:
+            start = time.perf_counter()
+            try:
+                response = await self.client.post(path, json=body)
+            except httpx.HTTPError as exc:
+                self.statuses[endpoint][type(exc).__name__] += 1
+                return None
+            self.samples[endpoint].append(time.perf_counter() - start)
+            self.statuses[endpoint][response.status_code] += 1
+            return response
+
+    async def create(self, entry: dict, key: asyncio.Future) -> None:
+        note = {
+            'title': 'r' * entry.get('title_size', 0),
+            'text': 'x' * max(entry.get('size', 1), 1),
+            'burn_after_reading': entry.get('burn_after_reading', False),
+            'expiration': entry.get('expiration'),
+        }
+        if entry.get('password'):
+            note['password'] = PASSWORD
+        response = None
+        try:
+            response = await self.send('create', '/api/v1/notes/create',
+                                       note)
+        finally:
+            created = response is not None and response.status_code == 201
+            key.set_result(response.json()['key'] if created else None)
+
+    async def view(self, entry: dict) -> None:
+        note = self.notes.get(entry.get('id'))
+        key = await note['key'] if note else None
+        body = {'key': key or random_key()}
+        if not entry.get('password_ok', True):
+            body['password'] = 'wrong ' + PASSWORD
+        elif note and note['password']:
+            body['password'] = PASSWORD
+        response = await self.send('view', '/api/v1/notes', body)
+        if (note and note['burn'] and response is not None
+                and response.status_code == 200):
+            self.notes.pop(entry['id'], None)
+
+    def submit(self, entry: dict) -> asyncio.Task:
+        if entry['endpoint'] == 'create':
+            key = asyncio.get_running_loop().create_future()
+            if 'id' in entry:
+                self.notes[entry['id']] = {
+                    'key': key,
+                    'password': bool(entry.get('password')),
+                    'burn': entry.get('burn_after_reading', False),
+                }
+            return asyncio.create_task(self.create(entry, key))
+        if entry['endpoint'] == 'view':
+            return asyncio.create_task(self.view(entry))
+        raise ValueError(f"Unknown endpoint {entry['endpoint']!r}")
+
+    async def replay(self, entries: Iterator[dict],
+                     speed_up: float) -> float:
+        """
+        Send all entries on schedule and wait for the responses.
+
+        :param entries: Trace entries
+        :param speed_up: Divisor of the original offsets, 0 for none
+        :return: Elapsed seconds
+        """
+        pending = set()
+        start = time.perf_counter()
+        first = None
+        for entry in entries:
+            if speed_up:
+                first = entry['ts'] if first is None else first
+                delay = (start + (entry['ts'] - first) / speed_up
+                         - time.perf_counter())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            elif len(pending) >= self.concurrency:
+                # Read the trace only as fast as requests complete
+                await asyncio.wait(pending,
+                                   return_when=asyncio.FIRST_COMPLETED)
+            task = self.submit(entry)
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+        return time.perf_counter() - start
+
+
+async def run(path: str, url: str, speed_up: float,
+              concurrency: int) -> tuple[Replay, float]:
+    limits = httpx.Limits(max_connections=concurrency,
+                          max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits,
+                                 timeout=60) as client:
+        replay = Replay(client, concurrency)
+        elapsed = await replay.replay(read_trace(path), speed_up)
+        return replay, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('trace', help='JSONL trace file')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--speed-up', type=float, default=1,
+                        help='Divide the original inter-arrival times by '
+                             'this factor, 0 sends without pauses')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='Maximum requests in flight')
+    args = parser.parse_args()
+
+    replay, elapsed = asyncio.run(run(args.trace, args.url, args.speed_up,
+                                      args.concurrency))
+    total = sum(len(s) for s in replay.samples.values())
+    print(f'{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} '
+          f'req/s), up to {replay.max_lag * 1000:.0f} ms behind schedule')
+    for endpoint, latencies in sorted(replay.samples.items()):
+        print_row(endpoint, summarize(latencies))
+        print('  statuses: ' + ', '.join(
+            f'{status}={count}' for status, count
+            in sorted(replay.statuses[endpoint].items(), key=str)))
+
+
+if __name__ == '__main__':
+    main()
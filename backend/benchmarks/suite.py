@@ -0,0 +1,263 @@
+"""
+Regression benchmark suite of the API and web flows.
+
+Runs each workload in process through the Flask test client against
+the database from ``BENCH_DATABASE_URI`` (SQLite or PostgreSQL) and
+reports throughput, latency percentiles and the peak memory allocated
+per request. Each workload is timed in several rounds and the fastest
+round is kept, which filters out most of the noise of shared machines.
+``--save`` stores the results as a baseline, ``--baseline``
+compares against one and fails if a workload got slower or uses more
+memory than ``--tolerance`` allows.
+
+Usage (from the ``backend`` directory)::
+
+    BENCH_DATABASE_URI=sqlite:////tmp/bench.db \\
+        python -m benchmarks.suite --save /tmp/baseline.json
+    BENCH_DATABASE_URI=sqlite:////tmp/bench.db \\
+        python -m benchmarks.suite --baseline /tmp/baseline.json
+
+Compare runs only on the same machine and database.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Callable, NamedTuple
+
+from sqlalchemy import update
+
+from benchmarks.common import BenchmarkConfig, print_row, summarize
+from burnote import create_app, db
+from burnote.models import Note
+from burnote.models.keys import random_key
+
+PASSWORD = 'correct horse'
+NOTE = {'title': 'benchmark', 'text': 'x' * 1024, 'expiration': None,
+        'burn_after_reading': False, 'password': ''}
+API_NOTE = {'title': 'benchmark', 'text': 'x' * 1024}
+FORM_NOTE = {'title': 'benchmark', 'text': 'x' * 1024, 'expiration': '',
+             'password': ''}
+
+# Statistics compared against the baseline; tail latencies are
+# reported but too noisy to fail a run on
+HIGHER_IS_WORSE = ('p50_ms', 'peak_kib')
+LOWER_IS_WORSE = ('rps',)
+
+
+class Workload(NamedTuple):
+    # Returns one argument per request, e.g. the key of a note to read
+    prepare: Callable[[int], list]
+    send: Callable
+    status: int
+
+
+def create_notes(count: int, expired: bool = False, **fields) -> list:
+    """
+    Create notes directly through the model.
+
+    :param count: Number of notes
+    :param expired: Move the expiration date of the notes into the past
+    :param fields: Note fields overriding :data:`NOTE`
+    :return: Keys of the created notes
+    """
+    data = {**NOTE, **fields}
+    if expired:
+        data['expiration'] = timedelta(minutes=1)
+    keys = [Note.create(data, save=True)[1] for _ in range(count)]
+    if expired:
+        # Only notes of this workload have an expiration date
+        past = datetime.now(timezone.utc) - timedelta(minutes=1)
+        db.session.execute(update(Note).where(Note.expiration_date.is_not(
+            None)).values(expiration_date=past))
+        db.session.commit()
+    return keys
+
+
+def unknown_keys(count: int) -> list:
+    return [random_key() for _ in range(count)]
+
+
+WORKLOADS = {
+    'api_create': Workload(
+        lambda count: [API_NOTE] * count,
+        lambda client, note: client.post('/api/v1/notes/create', json=note),
+        201),
+    'api_read': Workload(
+        create_notes,
+        lambda client, key: client.post('/api/v1/notes', json={'key': key}),
+        200),
+    'api_burn': Workload(
+        lambda count: create_notes(count, burn_after_reading=True),
+        lambda client, key: client.post('/api/v1/notes', json={'key': key}),
+        200),
+    'api_password_read': Workload(
+        lambda count: create_notes(count, password=PASSWORD),
+        lambda client, key: client.post(
+            '/api/v1/notes', json={'key': key, 'password': PASSWORD}),
+        200),
+    'api_expired_read': Workload(
+        lambda count: create_notes(count, expired=True),
+        lambda client, key: client.post('/api/v1/notes', json={'key': key}),
+        400),
+    'api_scan': Workload(
+        unknown_keys,
+        lambda client, key: client.post('/api/v1/notes', json={'key': key}),
+        400),
+    'form_create': Workload(
+        lambda count: [FORM_NOTE] * count,
+        lambda client, note: client.post('/', data=note),
+        200),
+    'form_read': Workload(
+        create_notes,
+        lambda client, key: client.get(f'/{key}'),
+        200),
+    'form_burn': Workload(
+        lambda count: create_notes(count, burn_after_reading=True),
+        lambda client, key: client.get(f'/{key}'),
+        200),
+    'form_password_read': Workload(
+        lambda count: create_notes(count, password=PASSWORD),
+        lambda client, key: client.post(f'/{key}',
+                                        data={'password': PASSWORD}),
+        200),
+    'form_expired_read': Workload(
+        lambda count: create_notes(count, expired=True),
+        lambda client, key: client.get(f'/{key}'),
+        200),
+    'form_scan': Workload(
+        unknown_keys,
+        lambda client, key: client.get(f'/{key}'),
+        404),
+}
+
+
+def run(app, name: str, requests: int, rounds: int, warmup: int,
+        memory_requests: int) -> dict:
+    """
+    Run one workload: timed rounds, then a shorter pass under
+    tracemalloc, which slows allocations down too much to be timed.
+
+    :return: Statistics of the fastest round and the peak memory
+    """
+    workload = WORKLOADS[name]
+    client = app.test_client()
+    with app.app_context():
+        args = iter(workload.prepare(warmup + rounds * requests +
+                                     memory_requests))
+        db.session.remove()
+
+    def send(arg) -> None:
+        response = workload.send(client, arg)
+        if response.status_code != workload.status:
+            raise SystemExit(f'FAIL: {name} returned {response.status_code}'
+                             f', expected {workload.status}')
+
+    for arg in islice(args, warmup):
+        send(arg)
+
+    best = None
+    for _ in range(rounds):
+        samples = []
+        start = time.perf_counter()
+        for arg in islice(args, requests):
+            request_start = time.perf_counter()
+            send(arg)
+            samples.append(time.perf_counter() - request_start)
+        stats = {**summarize(samples),
+                 'rps': requests / (time.perf_counter() - start)}
+        if best is None or stats['rps'] > best['rps']:
+            best = stats
+
+    peak = 0
+    for arg in args:
+        tracemalloc.start()
+        send(arg)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {**best, 'peak_kib': peak / 1024}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compare results against a baseline.
+
+    :param results: Workload statistics of this run
+    :param baseline: Workload statistics of the baseline run
+    :param tolerance: Allowed relative change, e.g. 0.2 for 20 %
+    :return: Descriptions of the regressions
+    """
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        for key in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+            old, new = baseline[name][key], stats[key]
+            if not old:
+                continue
+            change = new / old - 1
+            worse = change if key in HIGHER_IS_WORSE else -change
+            if worse > tolerance:
+                regressions.append(f'{name} {key}: {old:.3f} -> {new:.3f} '
+                                   f'({change:+.1%})')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workload', action='append',
+                        choices=sorted(WORKLOADS),
+                        help='Workload to run, can be repeated '
+                             '(default: all)')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per round')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--memory-requests', type=int, default=20,
+                        help='Requests measured with tracemalloc')
+    parser.add_argument('--save', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Compare against this file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative regression (default: 0.25)')
+    args = parser.parse_args()
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        database = db.engine.dialect.name
+
+    results = {}
+    for name in args.workload or WORKLOADS:
+        results[name] = run(app, name, args.requests, args.rounds,
+                            args.warmup, args.memory_requests)
+        print_row(name, results[name])
+
+    with app.app_context():
+        db.drop_all()
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'database': database, 'workloads': results}, file,
+                      indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline['database'] != database:
+            raise SystemExit(f"FAIL: baseline was measured on "
+                             f"{baseline['database']}, not {database}")
+        regressions = compare(results, baseline['workloads'],
+                              args.tolerance)
+        if regressions:
+            raise SystemExit('FAIL: regressions beyond '
+                             f'{args.tolerance:.0%}:\n  ' +
+                             '\n  '.join(regressions))
+        print(f'No regressions beyond {args.tolerance:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Throughput sweep over worker and connection pool settings.
+
+Starts a gunicorn server for every combination of the given settings,
+drives it with :mod:`benchmarks.loadtest` and prints a table of
+requests per second and latency. The server uses the database from
+``SQLALCHEMY_DATABASE_URI``, which must already be migrated.
+
+Usage (from the ``backend`` directory)::
+
+    SQLALCHEMY_DATABASE_URI=postgresql+psycopg2://... \\
+        python -m benchmarks.tuning --preset sync gthread \\
+        --workers 4 8 --threads 4 8 --pool-size 5 10
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import percentile
+from benchmarks.loadtest import run
+
+BIND = '127.0.0.1:8765'
+
+
+def wait_until_ready(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url + '/about')
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f'{url} did not start in {timeout}s')
+
+
+def measure(settings: dict, args) -> dict:
+    """
+    Start gunicorn with ``settings`` in the environment and load test it.
+
+    :return: Throughput and latency of the run
+    """
+    env = {**os.environ, 'GUNICORN_BIND': BIND,
+           **{k: str(v) for k, v in settings.items()}}
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'manage:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f'http://{BIND}'
+        wait_until_ready(url)
+        samples, errors, elapsed = asyncio.run(run(
+            url, args.clients, args.duration, args.read_ratio, args.notes))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = [s for values in samples.values() for s in values]
+    return {
+        'req/s': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'errors': sum(errors.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--preset', nargs='+', default=['sync', 'gthread'])
+    parser.add_argument('--workers', nargs='+', type=int, default=[4])
+    parser.add_argument('--threads', nargs='+', type=int, default=[4])
+    parser.add_argument('--pool-size', nargs='+', type=int, default=[5])
+    parser.add_argument('--max-overflow', nargs='+', type=int, default=[10])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--notes', type=int, default=100)
+    args = parser.parse_args()
+
+    grid = itertools.product(args.preset, args.workers, args.threads,
+                             args.pool_size, args.max_overflow)
+    print('preset   workers threads pool overflow     req/s   p50_ms'
+          '   p99_ms errors')
+    for preset, workers, threads, pool_size, max_overflow in grid:
+        if preset == 'sync' and threads != args.threads[0]:
+            continue  # threads are ignored by sync workers
+        result = measure({
+            'GUNICORN_PRESET': preset,
+            'GUNICORN_WORKERS': workers,
+            'GUNICORN_THREADS': threads,
+            'DB_POOL_SIZE': pool_size,
+            'DB_MAX_OVERFLOW': max_overflow,
+        }, args)
+        print(f'{preset:<8} {workers:>7} {threads:>7} {pool_size:>4} '
+              f'{max_overflow:>8} {result["req/s"]:>9.1f} '
+              f'{result["p50_ms"]:>8.1f} {result["p99_ms"]:>8.1f} '
+              f'{result["errors"]:>6}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory used to create a large note, by request body format.
+
+Creates notes of 1, 10 and 100 MB through the API as a JSON body, a
+streamed ``text/plain`` body and a ``multipart/form-data`` body with the
+text as its last part, and reports the peak of the memory allocated by
+Python while the request is handled (tracemalloc), relative to the note
+size, and the latency. The request body itself is built beforehand and
+not counted. ``MAX_CONTENT_LENGTH`` is lifted so that large JSON bodies
+can be compared; with the default configuration they are rejected with
+413. The text is random hex, so compression does not shrink it. Set
+``STORAGE_BACKEND`` to see streamed uploads without the ciphertext
+being joined for the database row.
+
+Usage (from the ``backend`` directory)::
+
+    BENCH_DATABASE_URI=sqlite:////tmp/bench.db \\
+        python -m benchmarks.upload --sizes 1 10 100
+"""
+import argparse
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.common import BenchmarkConfig
+from burnote import create_app, db
+from settings import NOTE_TEXT_MAX_SIZE
+
+BOUNDARY = 'benchmarkboundary'
+
+
+def json_body(text: str) -> tuple[bytes, str]:
+    return (json.dumps({'title': 'benchmark', 'text': text}).encode(),
+            'application/json')
+
+
+def plain_body(text: str) -> tuple[bytes, str]:
+    return text.encode(), 'text/plain; charset=utf-8'
+
+
+def multipart_body(text: str) -> tuple[bytes, str]:
+    body = (f'--{BOUNDARY}\r\n'
+            f'Content-Disposition: form-data; name="title"\r\n\r\n'
+            f'benchmark\r\n'
+            f'--{BOUNDARY}\r\n'
+            f'Content-Disposition: form-data; name="text"; '
+            f'filename="note.txt"\r\n'
+            f'Content-Type: text/plain\r\n\r\n'
+            f'{text}\r\n'
+            f'--{BOUNDARY}--\r\n')
+    return body.encode(), f'multipart/form-data; boundary={BOUNDARY}'
+
+
+FORMATS = {'json': json_body, 'text/plain': plain_body,
+           'multipart': multipart_body}
+
+
+def measure(client, body: bytes, content_type: str) -> tuple[int, int,
+                                                             float]:
+    """
+    Create a note and measure the memory allocated meanwhile.
+
+    :return: A tuple of (status code, peak allocated bytes, seconds)
+    """
+    query = '?title=benchmark' if content_type.startswith('text/') else ''
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.post(f'/api/v1/notes/create{query}', data=body,
+                           content_type=content_type)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return response.status_code, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100],
+                        help='Note sizes in MB')
+    args = parser.parse_args()
+
+    class Config(BenchmarkConfig):
+        MAX_CONTENT_LENGTH = None
+
+    app = create_app(Config)
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    print(f'NOTE_TEXT_MAX_SIZE is {NOTE_TEXT_MAX_SIZE} bytes')
+    print(f'{"format":<10} {"size MB":>7} {"status":>6} {"peak MB":>8} '
+          f'{"peak/size":>9} {"seconds":>8}')
+    for size in args.sizes:
+        text = os.urandom(size * 500_000).hex()
+        for name, build in FORMATS.items():
+            body, content_type = build(text)
+            status, peak, elapsed = measure(client, body, content_type)
+            del body
+            print(f'{name:<10} {size:>7} {status:>6} {peak / 1e6:>8.1f} '
+                  f'{peak / len(text):>9.2f} {elapsed:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,14 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.middleware.proxy_fix import ProxyFix
 
+from burnote.engine import engine_options
+from burnote.jsonprovider import FastJSONProvider
+from burnote.replicas import RoutingSession
 from settings import Config
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 moment = Moment()
 cors = CORS()
@@ -15,9 +19,18 @@ cors = CORS()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
-    app.json.ensure_ascii = False
+    app.json = FastJSONProvider(app)
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app,
+                                x_for=app.config['PROXY_FIX_X_FOR'])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS',
+                          engine_options(app.config))
 
     db.init_app(app)
+    # Before anything opens a session, see RoutingSession
+    from burnote.replicas import replicas
+    replicas.init_app(app)
+
     migrate.init_app(app, db)
     moment.init_app(app)
     cors.init_app(app,
@@ -30,4 +43,41 @@ def create_app(config_class=Config):
     from burnote.api import bp as api_bp
     app.register_blueprint(api_bp)
 
+    from burnote.cli import notes_cli, pages_cli
+    app.cli.add_command(notes_cli)
+    app.cli.add_command(pages_cli)
+
+    from burnote.models.storage import content_storage
+    content_storage.init_app(app)
+
+    from burnote.models.kdf import key_derivation
+    key_derivation.init_app(app)
+
+    from burnote.models.compression import compression
+    compression.init_app(app)
+
+    from burnote.models.cryptopool import crypto_pool
+    crypto_pool.init_app(app)
+
+    from burnote.models.bloom import note_filter
+    note_filter.init_app(app)
+
+    from burnote.models.notecache import note_cache
+    note_cache.init_app(app)
+
+    from burnote.ratelimit import rate_limiter
+    rate_limiter.init_app(app)
+
+    from burnote.models.partitions import partitioning
+    partitioning.init_app(app)
+
+    from burnote.models.reaper import reaper
+    reaper.init_app(app)
+
+    from burnote.rendercache import render_cache
+    render_cache.init_app(app)
+
+    from burnote.metrics import metrics
+    metrics.init_app(app)
+
     return app
@@ -0,0 +1,176 @@
+from typing import Optional
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.engine import make_url
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from . import api, notes
+from .db import create_engine, create_sessionmaker
+from burnote import create_app, db
+from burnote.engine import engine_options
+from burnote.jsonprovider import dumps, loads
+from burnote.ratelimit import RateLimitExceeded, rate_limiter
+from burnote.replicas import replica_uris
+from settings import Config
+
+
+class NotesASGIApp:
+    """
+    ASGI application serving the note API on an asyncio engine.
+
+    ``POST /api/v1/notes`` and ``POST /api/v1/notes/create`` with a JSON
+    body are handled natively, so a slow database round trip does not
+    block a worker. Every other request (web pages, API docs, CORS
+    preflight, streamed text and multipart uploads, ...) is passed to
+    the Flask application running in a thread pool. JSON bodies larger
+    than ``MAX_CONTENT_LENGTH`` are answered with 413, like in Flask.
+    Rate limits apply to the client address taken from
+    ``X-Forwarded-For`` as configured by ``PROXY_FIX_X_FOR``, like the
+    ProxyFix middleware of the Flask application. Rate limiter and note
+    filter calls that go to Redis run in threads.
+    """
+
+    routes = {
+        '/api/v1/notes/create': api.create_note,
+        '/api/v1/notes': api.view_note,
+    }
+    limits = {
+        '/api/v1/notes/create': 'create',
+        '/api/v1/notes': 'read',
+    }
+
+    def __init__(self, flask_app, engine, replicas: list = ()):
+        self.flask_app = flask_app
+        self.engine = engine
+        self.replicas = list(replicas)
+        self.sessionmaker = create_sessionmaker(engine, self.replicas)
+        self.wsgi = WSGIMiddleware(flask_app)
+        self.proxy_x_for = flask_app.config['PROXY_FIX_X_FOR']
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        handler = None
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            handler = self.routes.get(scope['path'])
+        headers = dict(scope.get('headers', ()))
+        content_type = headers.get(b'content-type', b'').split(b';')[0]
+        # Streamed uploads are handled by the Flask application
+        if handler is None or content_type.strip() in (
+                b'text/plain', b'multipart/form-data'):
+            return await self.wsgi(scope, receive, send)
+
+        try:
+            await notes.call(rate_limiter.remote, rate_limiter.limit,
+                             self.limits[scope['path']],
+                             self.client_address(scope))
+            await self.handle(scope, receive, send, handler, headers,
+                              content_type)
+        except RateLimitExceeded as e:
+            await self.respond(
+                send, headers, 429,
+                {'error': {'rate_limit': 'Too many requests.'}},
+                [(b'retry-after', str(e.retry_after).encode())])
+
+    async def handle(self, scope, receive, send, handler, headers,
+                     content_type):
+        if content_type.strip() != b'application/json':
+            return await self.respond(send, headers, 415, {
+                'message': 'Did not attempt to load JSON data because the '
+                           "request Content-Type was not "
+                           "'application/json'."
+            })
+        limit = self.flask_app.config['MAX_CONTENT_LENGTH']
+        try:
+            payload = loads(await self.read_body(receive, limit))
+        except RequestEntityTooLarge as e:
+            return await self.respond(send, headers, 413,
+                                      {'message': e.description})
+        except ValueError:
+            return await self.respond(send, headers, 400, {
+                'message': 'Failed to decode JSON object.'
+            })
+
+        async with self.sessionmaker() as session:
+            body, status = await handler(session, payload)
+        await self.respond(send, headers, status, body)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in (self.engine, *self.replicas):
+                    await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def client_address(self, scope) -> Optional[str]:
+        """
+        Return the address of the client, the ``PROXY_FIX_X_FOR``-th
+        ``X-Forwarded-For`` value from the right if there are that many
+        (see :class:`werkzeug.middleware.proxy_fix.ProxyFix`).
+
+        :param scope: ASGI connection scope
+        :return: The client address, or None if unknown
+        """
+        client = scope['client'][0] if scope.get('client') else None
+        if not self.proxy_x_for:
+            return client
+        values = [value.strip()
+                  for name, header in scope.get('headers', ())
+                  if name == b'x-forwarded-for'
+                  for value in header.decode('latin-1').split(',')]
+        if len(values) >= self.proxy_x_for:
+            return values[-self.proxy_x_for]
+        return client
+
+    @staticmethod
+    async def read_body(receive, limit: Optional[int] = None) -> bytes:
+        body = bytearray()
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if limit is not None and len(body) > limit:
+                raise RequestEntityTooLarge()
+            if not message.get('more_body'):
+                return bytes(body)
+
+    @staticmethod
+    async def respond(send, request_headers: dict, status: int,
+                      body: dict, extra_headers: list = ()) -> None:
+        content = dumps(body) + b'\n'
+        headers = [(b'content-type', b'application/json'),
+                   (b'content-length', str(len(content)).encode()),
+                   *extra_headers]
+        origin = request_headers.get(b'origin')
+        if origin:
+            # Same policy as flask-cors in create_app
+            headers += [(b'access-control-allow-origin', origin),
+                        (b'access-control-allow-credentials', b'true'),
+                        (b'vary', b'Origin')]
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+
+def create_asgi_app(config_class=Config) -> NotesASGIApp:
+    """
+    Create the ASGI application.
+
+    :param config_class: Configuration class, same as for ``create_app``
+    :return: The ASGI application
+    """
+    flask_app = create_app(config_class)
+    with flask_app.app_context():
+        url = db.engine.url
+    options = engine_options(flask_app.config, asyncio=True)
+    replicas = [
+        create_engine(make_url(uri), **engine_options(
+            {**flask_app.config, 'SQLALCHEMY_DATABASE_URI': uri},
+            asyncio=True))
+        for uri in replica_uris(flask_app.config)
+    ]
+    return NotesASGIApp(flask_app, create_engine(url, **options), replicas)
@@ -0,0 +1,63 @@
+from marshmallow import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import notes
+from burnote.api.v1.payloads import dump_note, load_access, load_note
+from burnote.models.errors import DecryptionError
+from burnote.ratelimit import rate_limiter
+
+
+async def create_note(session: AsyncSession, payload) -> tuple[dict, int]:
+    """
+    Asyncio counterpart of ``NotesCreateResource.post``.
+
+    :param session: Asyncio database session
+    :param payload: Decoded JSON request body
+    :return: A tuple of (response body, status code)
+    """
+    try:
+        data = load_note(payload)
+    except ValidationError as err:
+        return {"error": err.messages}, 400
+    _, key = await notes.create(session, data)
+    return {'key': key}, 201
+
+
+async def view_note(session: AsyncSession, payload) -> tuple[dict, int]:
+    """
+    Asyncio counterpart of ``NotesViewResource.post``.
+
+    :param session: Asyncio database session
+    :param payload: Decoded JSON request body
+    :return: A tuple of (response body, status code)
+    :raises RateLimitExceeded: If too many wrong passwords were tried
+                               for the note
+    """
+    try:
+        data = load_access(payload)
+    except ValidationError as err:
+        return {"error": err.messages}, 400
+    key, password = data['key'], data['password']
+
+    note = await notes.get_by_key(session, key)
+    if not note:
+        return {"error": {'key': 'Invalid key.'}}, 400
+
+    if not note.is_available():
+        return {"error": {'note': 'Note has been expired and deleted'}}, 400
+
+    # A failed burn rolls back and expires the note: keep its hash
+    hash = note.hash
+    await notes.call(rate_limiter.remote, rate_limiter.limit, 'password',
+                     hash)
+    try:
+        note = await notes.read(session, note, key, password)
+    except DecryptionError:
+        return {"error": {'password': 'Invalid password.'}}, 400
+    await notes.call(rate_limiter.remote, rate_limiter.refund, 'password',
+                     hash)
+
+    if note is None:
+        return {"error": {'note': 'Note has been expired and deleted'}}, 400
+
+    return dump_note(note), 200
@@ -0,0 +1,48 @@
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import (AsyncEngine, async_sessionmaker,
+                                    create_async_engine)
+
+from burnote.replicas import AsyncRoutingSession
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_url(url: URL) -> URL:
+    """
+    Replace the driver of a synchronous database URL with its
+    asyncio counterpart (asyncpg for PostgreSQL, aiosqlite for SQLite).
+
+    :param url: Database URL used by the synchronous engine
+    :return: Database URL for the asyncio engine
+    """
+    drivername = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername)
+
+
+def create_engine(url: URL, **options) -> AsyncEngine:
+    """
+    Create the asyncio engine.
+
+    :param url: Database URL, converted with :func:`async_url`
+    :param options: Extra keyword arguments for the engine
+    :return: The asyncio engine
+    """
+    return create_async_engine(async_url(url), **options)
+
+
+def create_sessionmaker(engine: AsyncEngine,
+                        replicas: list = ()) -> async_sessionmaker:
+    """
+    Create a session factory bound to the asyncio engine.
+
+    :param engine: The asyncio engine
+    :param replicas: Asyncio engines of the read replicas
+    :return: Factory of ``AsyncSession`` objects
+    """
+    return async_sessionmaker(
+        engine, expire_on_commit=False,
+        sync_session_class=AsyncRoutingSession,
+        info={'replicas': [replica.sync_engine for replica in replicas]})
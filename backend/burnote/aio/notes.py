@@ -0,0 +1,213 @@
+import asyncio
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import ObjectDeletedError
+
+from burnote.metrics import (DECRYPTION_FAILURES, NOTES_BURNED, NOTES_CREATED,
+                             NOTES_NOT_FOUND, NOTES_READ)
+from burnote.models import Note
+from burnote.models.bloom import note_filter
+from burnote.models.cryptopool import crypto_pool
+from burnote.models.encryption import Encryptor
+from burnote.models.errors import DecryptionError
+from burnote.models.kdf import DerivedKey, key_derivation
+from burnote.models.storage import content_storage
+from burnote.replicas import lookup
+from settings import KEY_ATTEMPTS
+
+
+async def get_by_key(session: AsyncSession, key: str) -> Optional[Note]:
+    """
+    Retrieve a note by the generated key.
+
+    :param session: Asyncio database session
+    :param key: Generated key for the note
+    :return: The Note object or None
+    """
+    hash = Note.generate_hash(key)
+    note = Note.from_cache(hash)
+    if note is None and await call(note_filter.remote,
+                                   note_filter.might_contain, hash):
+        note = await session.run_sync(lookup, Note.select_by_hash(hash))
+    if note is None:
+        NOTES_NOT_FOUND.inc()
+    return note
+
+
+async def create(session: AsyncSession, data: dict) -> tuple[Note, str]:
+    """
+    Create and save a new Note, retrying on key collisions.
+
+    :param session: Asyncio database session
+    :param data: Dictionary containing note data
+    :return: A tuple of (note, key)
+    :raises IntegrityError: If no free key was found
+                            in ``KEY_ATTEMPTS`` attempts
+    """
+    for attempt in range(1, KEY_ATTEMPTS + 1):
+        key = Note.generate_key()
+        if (key_derivation.spec_for(data.get('password', ''))
+                or crypto_pool.offloads(len(data['text']))):
+            # Key derivation takes tens of milliseconds and large notes
+            # take milliseconds per MiB: keep them off the event loop
+            note = await asyncio.to_thread(Note.build, data, key)
+        else:
+            note = Note.build(data, key)
+        if content_storage.offloads(len(note.text)):
+            # Writing the blob is file or network I/O
+            await asyncio.to_thread(note.offload)
+        session.add(note)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            await delete_blob(note)
+            if attempt == KEY_ATTEMPTS:
+                raise
+        else:
+            await call(note_filter.remote, note_filter.add, note.hash)
+            NOTES_CREATED.inc()
+            return note, key
+
+
+async def consume(session: AsyncSession, key: str,
+                  password: str) -> Optional[Note]:
+    """
+    Fetch, decrypt and delete a burn-after-reading note atomically.
+
+    See :meth:`Note.consume`.
+
+    :param session: Asyncio database session
+    :param key: Key used for decryption
+    :param password: Password used for decryption, or preferably the
+                     key derived from it
+    :return: The decrypted, no longer persisted note, or None if
+             there is no available note for the key
+    :raises DecryptionError: If the password is invalid
+    """
+    columns = Note.__table__.columns
+    condition = Note.consumable(key)
+    options = {'synchronize_session': False}
+
+    if session.bind.dialect.delete_returning:
+        result = await session.execute(
+            delete(Note).where(condition).returning(*columns),
+            execution_options=options)
+        row = result.first()
+    else:
+        row = (await session.execute(select(*columns).where(condition))
+               ).first()
+        if row and not (await session.execute(
+                delete(Note).where(Note.id == row.id),
+                execution_options=options)).rowcount:
+            row = None
+
+    if row is None:
+        await session.rollback()
+        return None
+
+    note = Note(**row._asdict())
+    try:
+        await decrypt(note, key, password)
+    except DecryptionError:
+        await session.rollback()
+        raise
+    await session.commit()
+    await call(note_filter.remote, note_filter.mark_stale)
+    NOTES_BURNED.inc()
+    await delete_blob(note)
+    return note
+
+
+async def read(session: AsyncSession, note: Note, key: str,
+               password: str) -> Optional[Note]:
+    """
+    Decrypt the note, burning it if it is burn-after-reading.
+
+    See :meth:`Note.read`.
+
+    :param session: Asyncio database session
+    :param note: The note looked up by :func:`get_by_key`
+    :param key: Key used for decryption
+    :param password: Password used for decryption
+    :return: The decrypted note, or None if it has already been consumed
+             or deleted
+    :raises DecryptionError: If the password is invalid
+    """
+    try:
+        if note.burn_after_reading:
+            # Derived before the note is deleted, see Note.consume
+            if note.kdf is None:
+                secret = Encryptor.derive_key(password, key)
+            else:
+                secret = await asyncio.to_thread(
+                    Encryptor.derive_key, password, key, note.kdf)
+            note = await consume(session, key, secret)
+        else:
+            # The ciphertext is deferred and cannot be lazy loaded
+            # in the event loop
+            def load(_):
+                note.cache()
+                return note.text
+
+            await session.run_sync(load)
+            note = await decrypt(note, key, password)
+    except DecryptionError:
+        DECRYPTION_FAILURES.inc()
+        raise
+    except ObjectDeletedError:
+        return None
+    if note is not None:
+        NOTES_READ.inc()
+    return note
+
+
+async def decrypt(note: Note, key: str, password: str) -> Note:
+    """
+    Decrypt the note outside the event loop if a key has to be derived,
+    its ciphertext is in blob storage or it is large enough for the
+    crypto pool.
+
+    :param note: The note to decrypt
+    :param key: Key used for decryption
+    :param password: Password used for decryption, or the key derived
+                     from it
+    :return: The decrypted note
+    :raises DecryptionError: If the password is invalid
+    """
+    derived = note.kdf is None or isinstance(password, DerivedKey)
+    # The text of a blob note is empty, its size is not known here
+    inline = (note.content_ref is None
+              and not crypto_pool.offloads(len(note.text)))
+    if derived and inline:
+        return note.decrypt(key, password)
+    return await asyncio.to_thread(note.decrypt, key, password)
+
+
+async def delete_blob(note: Note) -> None:
+    """
+    Delete the blob of a note, if it has one, outside the event loop.
+
+    :param note: A deleted or unsaved note
+    :return: None
+    """
+    if note.content_ref is not None:
+        await asyncio.to_thread(content_storage.delete, [note.content_ref])
+
+
+async def call(remote: bool, func, *args):
+    """
+    Call a function of the rate limiter or the note filter, in a thread
+    if it makes a network round trip.
+
+    :param remote: Whether the storage behind the function is remote
+    :param func: Function to call
+    :param args: Arguments of the function
+    :return: The result of the function
+    """
+    if remote:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
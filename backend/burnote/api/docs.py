@@ -1,8 +1,7 @@
-from flask import render_template
-
 from . import bp
+from burnote.rendercache import render_cache
 
 
 @bp.route('/docs')
 def redoc():
-    return render_template('pages/redoc.html')
+    return render_cache.page('pages/redoc.html')
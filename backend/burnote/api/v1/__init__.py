@@ -1,7 +1,10 @@
 from flask import Blueprint
 from flask_restful import Api
 
+from burnote.jsonprovider import output_json
+
 bp = Blueprint('api-v1', __name__, url_prefix='/v1')
 api = Api(bp)
+api.representations['application/json'] = output_json
 
 from . import resources
@@ -0,0 +1,170 @@
+from collections.abc import Mapping
+from datetime import timedelta
+
+from marshmallow import ValidationError
+from marshmallow.fields import Boolean
+
+from settings import (NOTE_PASSWORD_MAX_LENGTH, NOTE_TEXT_MAX_SIZE,
+                      NOTE_TITLE_MAX_LENGTH)
+
+# Request parsing and response serialization of the note resources
+# ----------------------------------------------------------------
+# These functions do what ``NoteDataSchema`` and ``NoteAccessDataSchema``
+# do, with the same results and error messages, but without building
+# field objects, error stores and hooks on every call: the create and
+# view endpoints spend a large part of their CPU time in marshmallow.
+# Keep them in sync with the schemas; ``benchmarks.payloads`` checks
+# that both give the same results.
+
+INVALID_INPUT = ['Invalid input type.']
+UNKNOWN_FIELD = ['Unknown field.']
+REQUIRED = ['Missing data for required field.']
+NULL = ['Field may not be null.']
+INVALID_STRING = ['Not a valid string.']
+INVALID_UTF8 = ['Not a valid utf-8 string.']
+INVALID_BOOLEAN = ['Not a valid boolean.']
+INVALID_TIMEDELTA = ['Not a valid period of time.']
+TOO_LONG = 'Longer than maximum length {}.'
+
+NOTE_FIELDS = ('title', 'text', 'expiration', 'burn_after_reading',
+               'password')
+ACCESS_FIELDS = ('key', 'password')
+
+
+def _string(value, errors: dict, name: str):
+    if isinstance(value, str):
+        return value
+    if value is None:
+        errors[name] = NULL
+    elif isinstance(value, bytes):
+        try:
+            return value.decode('utf-8')
+        except UnicodeDecodeError:
+            errors[name] = INVALID_UTF8
+    else:
+        errors[name] = INVALID_STRING
+    return None
+
+
+def _limit(value, errors: dict, name: str, maximum: int):
+    if value is not None and len(value) > maximum:
+        errors[name] = [TOO_LONG.format(maximum)]
+    return value
+
+
+def _boolean(value, errors: dict, name: str):
+    try:
+        if value in Boolean.truthy:
+            return True
+        if value in Boolean.falsy:
+            return False
+    except TypeError:
+        pass
+    errors[name] = INVALID_BOOLEAN if value is not None else NULL
+    return None
+
+
+def _minutes(value, errors: dict, name: str):
+    if value is None:
+        return None
+    try:
+        return timedelta(minutes=int(value))
+    except (TypeError, ValueError, OverflowError):
+        errors[name] = INVALID_TIMEDELTA
+        return None
+
+
+def _check(payload, fields: tuple) -> dict:
+    """
+    Check the payload type and collect unknown fields.
+
+    :return: Errors of the unknown fields
+    :raises ValidationError: If the payload is not an object
+    """
+    if not isinstance(payload, Mapping):
+        raise ValidationError({'_schema': INVALID_INPUT})
+    return {name: UNKNOWN_FIELD for name in payload if name not in fields}
+
+
+def load_note(payload) -> dict:
+    """
+    Validate the fields of a new note, like ``NoteDataSchema().load``.
+
+    :param payload: Decoded JSON request body
+    :return: Dictionary with title, text, expiration, burn_after_reading
+             and password
+    :raises ValidationError: If the payload is invalid
+    """
+    unknown = _check(payload, NOTE_FIELDS)
+    errors = {}
+    data = {}
+    data['title'] = _limit(_string(payload.get('title', ''), errors,
+                                   'title'),
+                           errors, 'title', NOTE_TITLE_MAX_LENGTH)
+    if 'text' in payload:
+        data['text'] = _limit(_string(payload['text'], errors, 'text'),
+                              errors, 'text', NOTE_TEXT_MAX_SIZE)
+    else:
+        errors['text'] = REQUIRED
+    data['expiration'] = _minutes(payload.get('expiration'), errors,
+                                  'expiration')
+    data['burn_after_reading'] = _boolean(
+        payload.get('burn_after_reading', False), errors,
+        'burn_after_reading')
+    data['password'] = _limit(_string(payload.get('password', ''), errors,
+                                      'password'),
+                              errors, 'password', NOTE_PASSWORD_MAX_LENGTH)
+    errors.update(unknown)
+    if errors:
+        raise ValidationError(errors)
+    return data
+
+
+def load_access(payload) -> dict:
+    """
+    Validate a note access request, like ``NoteAccessDataSchema().load``.
+
+    :param payload: Decoded JSON request body
+    :return: Dictionary with key and password
+    :raises ValidationError: If the payload is invalid
+    """
+    unknown = _check(payload, ACCESS_FIELDS)
+    errors = {}
+    data = {}
+    if 'key' in payload:
+        data['key'] = _string(payload['key'], errors, 'key')
+    else:
+        errors['key'] = REQUIRED
+    data['password'] = _string(payload.get('password', ''), errors,
+                               'password')
+    errors.update(unknown)
+    if errors:
+        raise ValidationError(errors)
+    return data
+
+
+def dump_note_meta(note) -> dict:
+    """
+    Serialize the unencrypted fields of a note.
+
+    :param note: The note
+    :return: Dictionary with timestamp, expiration_date and
+             burn_after_reading
+    """
+    timestamp, expiration_date = note.timestamp, note.expiration_date
+    return {
+        'timestamp': timestamp.isoformat() if timestamp else None,
+        'expiration_date': (expiration_date.isoformat()
+                            if expiration_date else None),
+        'burn_after_reading': note.burn_after_reading,
+    }
+
+
+def dump_note(note) -> dict:
+    """
+    Serialize a decrypted note, like ``NoteDataSchema().dump``.
+
+    :param note: The decrypted note
+    :return: Dictionary with title, text and the unencrypted fields
+    """
+    return {'title': note.title, 'text': note.text, **dump_note_meta(note)}
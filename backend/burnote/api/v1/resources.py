@@ -1,12 +1,54 @@
-from flask import request
+import codecs
+from functools import partial, wraps
+from typing import Iterable, Iterator
+
+from flask import Response, request
 from flask_restful import Resource
 from marshmallow import ValidationError
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import (NEED_DATA, Epilogue, Field, File,
+                                       MultipartDecoder)
 
 from . import api
-from .schemas import NoteAccessSchema, NoteSchema
+from .payloads import dump_note, dump_note_meta, load_access, load_note
+from .schemas import NoteBatchSchema
+from burnote.jsonprovider import dumps
+from burnote.models import Note
+from burnote.models.errors import DecryptionError
+from burnote.models.storage import content_storage
+from burnote.ratelimit import RateLimitExceeded, rate_limiter
+from settings import NOTE_TEXT_MAX_SIZE
+
+# Size of the pieces a streamed request body is read in
+STREAM_CHUNK_SIZE = 64 * 1024
+# Maximum size of the fields preceding the text of a multipart body
+MULTIPART_FIELDS_SIZE = 64 * 1024
+
+NOTE_EXPIRED = {"error": {'note': 'Note has been expired and deleted'}}
 
-note_schema = NoteSchema()
-note_access_schema = NoteAccessSchema()
+note_batch_schema = NoteBatchSchema()
+
+
+def rate_limited(name: str):
+    """
+    Count requests of the client against a named limit.
+
+    Exceeded limits, including the failed password limit applied while
+    loading the request, are answered with 429 and ``Retry-After``.
+
+    :param name: Name of the limit, see :class:`RateLimiter`
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                rate_limiter.limit(name, request.remote_addr)
+                return method(*args, **kwargs)
+            except RateLimitExceeded as e:
+                return ({"error": {'rate_limit': 'Too many requests.'}}, 429,
+                        {'Retry-After': str(e.retry_after)})
+        return wrapper
+    return decorator
 
 
 class NotesCreateResource(Resource):
@@ -14,19 +56,111 @@ class NotesCreateResource(Resource):
     API resource for creating new notes.
     """
 
+    @rate_limited('create')
     def post(self):
         """
         Handle HTTP POST requests to create a new note.
 
+        A ``text/plain`` body is streamed into the encryptor as the note
+        text; the other fields are then taken from the query string and
+        the password from the ``X-Note-Password`` header. So is the
+        ``text`` part of a ``multipart/form-data`` body, which must be
+        its last part. JSON bodies are read at once, up to
+        ``MAX_CONTENT_LENGTH``; streamed texts up to
+        ``NOTE_TEXT_MAX_SIZE``.
+
         :return:
           - 201 Created with a JSON object containing the generated note key
           - 400 Bad Request if validation fails
+          - 413 Request Entity Too Large if the body or the text is too
+            large
+          - 429 Too Many Requests if the client exceeded the create limit
         """
+        if request.mimetype == 'text/plain':
+            return self.post_stream()
+        if request.mimetype == 'multipart/form-data':
+            return self.post_multipart()
         try:
-            data = note_schema.load(request.json)
+            data = load_note(request.json)
         except ValidationError as err:
             return {"error": err.messages}, 400
-        return {'key': note_schema.dump(data)['key']}, 201
+        _, key = Note.create(data, save=True)
+        return {'key': key}, 201
+
+    def post_stream(self):
+        """
+        Create a note from a streamed ``text/plain`` request body.
+        """
+        fields = {**request.args.to_dict(), 'text': '',
+                  'password': request.headers.get('X-Note-Password', '')}
+        request.max_content_length = NOTE_TEXT_MAX_SIZE
+        try:
+            data = load_note(fields)
+            data['text'] = read_text_stream(request.stream)
+            _, key = Note.create(data, save=True)
+        except ValidationError as err:
+            return {"error": err.messages}, 400
+        return {'key': key}, 201
+
+    def post_multipart(self):
+        """
+        Create a note from a ``multipart/form-data`` request body whose
+        ``text`` part is streamed into the encryptor.
+        """
+        request.max_content_length = (NOTE_TEXT_MAX_SIZE
+                                      + 2 * MULTIPART_FIELDS_SIZE)
+        boundary = request.mimetype_params.get('boundary', '').encode()
+        try:
+            fields, text = read_multipart(request.stream, boundary)
+            data = load_note({**fields, 'text': ''})
+            data['text'] = text
+            _, key = Note.create(data, save=True)
+        except ValidationError as err:
+            return {"error": err.messages}, 400
+        return {'key': key}, 201
+
+
+class NotesBatchCreateResource(Resource):
+    """
+    API resource for creating many notes in one request.
+    """
+
+    @rate_limited('create')
+    def post(self):
+        """
+        Handle HTTP POST requests to create a batch of notes.
+
+        Every item is validated separately. Valid items are created
+        in a single transaction; invalid ones are reported in place.
+
+        :return:
+          - 201 Created with a JSON object containing a list with
+            the key and link, or the validation error, of every item
+          - 400 Bad Request if the batch itself or every item is invalid
+          - 429 Too Many Requests if the client exceeded the create limit
+        """
+        try:
+            items = note_batch_schema.load(request.json)['notes']
+        except ValidationError as err:
+            return {"error": err.messages}, 400
+
+        results = []
+        valid = []
+        for item in items:
+            try:
+                valid.append(load_note(item))
+            except ValidationError as err:
+                results.append({"error": err.messages})
+            else:
+                results.append(None)
+
+        created = iter(Note.create_many(valid) if valid else ())
+        for i, result in enumerate(results):
+            if result is None:
+                note, key = next(created)
+                results[i] = {'key': key, 'link': note.get_link(key)}
+
+        return {'notes': results}, 201 if valid else 400
 
 
 class NotesViewResource(Resource):
@@ -34,6 +168,7 @@ class NotesViewResource(Resource):
     API resource for retrieving and decrypting existing notes.
     """
 
+    @rate_limited('read')
     def post(self):
         """
         Handle HTTP POST requests to fetch and decrypt an existing note.
@@ -41,13 +176,189 @@ class NotesViewResource(Resource):
         :return:
           - 200 OK with a JSON object containing the decrypted note data
           - 400 Bad Request if validation fails
+          - 429 Too Many Requests if the client exceeded the read limit,
+            or too many wrong passwords were tried for the note
         """
         try:
-            data = note_access_schema.load(request.json)
+            data = load_access(request.json)
         except ValidationError as err:
             return {"error": err.messages}, 400
-        return note_access_schema.dump(data)['note'], 200
+        key, password = data['key'], data['password']
+
+        note = Note.get_by_key(key, silent=True)
+        if not note:
+            return {"error": {'key': 'Invalid key.'}}, 400
+
+        if not note.is_available():
+            return NOTE_EXPIRED, 400
+
+        hash = note.hash
+        rate_limiter.limit('password', hash)
+        try:
+            result = note.read_stream(key, password)
+        except DecryptionError:
+            return {"error": {'password': 'Invalid password.'}}, 400
+        rate_limiter.refund('password', hash)
+
+        if result is None:
+            return NOTE_EXPIRED, 400
+
+        note, text = result
+        if note.content_ref is not None:
+            response = stream_note(note, text)
+            if note.burn_after_reading:
+                # The row is gone; the blob is deleted once the response
+                # is closed, whether or not it has been sent
+                response.call_on_close(partial(content_storage.delete,
+                                               [note.content_ref]))
+            return response
+        note.text = ''.join(text)
+        return dump_note(note), 200
+
+
+def read_text_stream(stream) -> Iterator[bytes]:
+    """
+    Read a request body incrementally, checking that it is UTF-8 text.
+
+    :param stream: Input stream of the request
+    :return: Iterator over chunks of the body
+    :raises ValidationError: If the body is not valid UTF-8
+    :raises RequestEntityTooLarge: If the body exceeds
+                                   ``NOTE_TEXT_MAX_SIZE``
+    """
+    return check_text(iter(partial(stream.read, STREAM_CHUNK_SIZE), b''))
+
+
+def check_text(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Pass a streamed note text on, checking that it is UTF-8 text of at
+    most ``NOTE_TEXT_MAX_SIZE`` bytes.
+
+    :param chunks: Iterable of byte strings
+    :return: Iterator over the same chunks
+    :raises ValidationError: If the text is not valid UTF-8
+    :raises RequestEntityTooLarge: If the text is too large
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    size = 0
+    try:
+        for chunk in chunks:
+            size += len(chunk)
+            if size > NOTE_TEXT_MAX_SIZE:
+                raise RequestEntityTooLarge()
+            decoder.decode(chunk)
+            yield chunk
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        raise ValidationError({'text': ['Not a valid string.']})
+
+
+def read_multipart(stream, boundary: bytes
+                   ) -> tuple[dict, Iterator[bytes]]:
+    """
+    Read a ``multipart/form-data`` body incrementally up to its
+    ``text`` part.
+
+    The fields before the text part (title, password, ...) are read
+    into memory, at most ``MULTIPART_FIELDS_SIZE`` bytes; the text is
+    returned as a stream that reads the rest of the body.
+
+    :param stream: Input stream of the request
+    :param boundary: Boundary of the body parts
+    :return: A tuple of (fields before the text, iterator over chunks
+             of the text, see :func:`check_text`)
+    :raises ValidationError: If the body is malformed, has no text part
+                             or parts after the text
+    :raises RequestEntityTooLarge: If the fields are too large
+    """
+    events = multipart_events(stream, boundary)
+    fields = {}
+    size = 0
+    for event in events:
+        if not isinstance(event, (Field, File)):
+            continue
+        if event.name == 'text':
+            return fields, check_text(multipart_text(events))
+        value = bytearray()
+        for data in part_data(events):
+            size += len(data)
+            if size > MULTIPART_FIELDS_SIZE:
+                raise RequestEntityTooLarge()
+            value += data
+        try:
+            fields[event.name] = value.decode()
+        except UnicodeDecodeError:
+            raise ValidationError({event.name: ['Not a valid utf-8 string.']})
+    raise ValidationError({'text': ['Missing data for required field.']})
+
+
+def multipart_events(stream, boundary: bytes) -> Iterator:
+    """
+    Parse a ``multipart/form-data`` body incrementally.
+
+    :param stream: Input stream of the request
+    :param boundary: Boundary of the body parts
+    :return: Iterator over the parser events up to the epilogue
+    :raises ValidationError: If the body is malformed
+    """
+    decoder = MultipartDecoder(boundary)
+    try:
+        while True:
+            event = decoder.next_event()
+            if event is NEED_DATA:
+                decoder.receive_data(stream.read(STREAM_CHUNK_SIZE) or None)
+            elif isinstance(event, Epilogue):
+                return
+            else:
+                yield event
+    except ValueError:
+        raise ValidationError({'_schema': ['Invalid multipart body.']})
+
+
+def part_data(events: Iterator) -> Iterator[bytes]:
+    """
+    :param events: Parser events after the start of a part
+    :return: Iterator over the data of the part
+    """
+    for event in events:
+        yield event.data
+        if not event.more_data:
+            return
+
+
+def multipart_text(events: Iterator) -> Iterator[bytes]:
+    """
+    :param events: Parser events after the start of the text part
+    :return: Iterator over the text, checking that no part follows it
+    """
+    for data in part_data(events):
+        if data:
+            yield data
+    for _ in events:
+        raise ValidationError({'_schema': ['The text must be the last '
+                                           'part.']})
+
+
+def stream_note(note, text):
+    """
+    Build a streamed JSON response for a note whose text is decrypted
+    while it is sent.
+
+    :param note: Note with a decrypted title
+    :param text: Iterator over pieces of the decrypted text
+    :return: Response with the same JSON object as the non-streamed one
+    """
+    meta = dumps(dump_note_meta(note))
+
+    def generate():
+        yield b'{"title":' + dumps(note.title) + b',"text":"'
+        for piece in text:
+            yield dumps(piece)[1:-1]
+        yield b'",' + meta[1:] + b'\n'
+
+    return Response(generate(), mimetype='application/json')
 
 
 api.add_resource(NotesCreateResource, '/notes/create')
+api.add_resource(NotesBatchCreateResource, '/notes/create/batch')
 api.add_resource(NotesViewResource, '/notes')
@@ -1,88 +1,48 @@
-from marshmallow import (Schema, ValidationError, fields, post_load,
-                         validates_schema)
+from marshmallow import Schema, fields, validate
 
-from burnote.models import Note
-from burnote.models.errors import DecryptionError
+from settings import (NOTE_PASSWORD_MAX_LENGTH, NOTE_TEXT_MAX_SIZE,
+                      NOTE_TITLE_MAX_LENGTH, NOTES_BATCH_MAX_SIZE)
 
 
-class NoteSchema(Schema):
+class NoteDataSchema(Schema):
     """
-    Handles serialization and deserialization of Note data.
+    Validates and serializes Note data without creating a note.
+
+    The note resources use the equivalent, faster functions of
+    :mod:`burnote.api.v1.payloads`.
     """
-    title = fields.Str(required=False, load_default='')
-    text = fields.Str(required=True)
+    title = fields.Str(required=False, load_default='',
+                       validate=validate.Length(max=NOTE_TITLE_MAX_LENGTH))
+    text = fields.Str(required=True,
+                      validate=validate.Length(max=NOTE_TEXT_MAX_SIZE))
     expiration = fields.TimeDelta(required=False, allow_none=True,
                                   precision='minutes', load_default=None,
                                   load_only=True)
     timestamp = fields.DateTime(dump_only=True)
     expiration_date = fields.DateTime(dump_only=True)
     burn_after_reading = fields.Bool(required=False, load_default=False)
-    password = fields.Str(required=False, load_default='', load_only=True)
+    password = fields.Str(
+        required=False, load_default='', load_only=True,
+        validate=validate.Length(max=NOTE_PASSWORD_MAX_LENGTH))
     key = fields.Str(dump_only=True)
 
-    @post_load
-    def create_note(self, data, **kwargs):
-        """
-        Create and save a new Note from the provided data.
 
-        :param data: Deserialized note data
-        :return: The same data with an added 'key' field
-        """
-        _, key = Note.create(data, save=True)
-        data['key'] = key
-        return data
+class NoteBatchSchema(Schema):
+    """
+    Validates the envelope of a batch creation request.
+
+    The items are validated one by one with :func:`payloads.load_note`,
+    so that invalid items do not abort the valid ones.
+    """
+    notes = fields.List(
+        fields.Raw(), required=True,
+        validate=validate.Length(min=1, max=NOTES_BATCH_MAX_SIZE)
+    )
 
 
-class NoteAccessSchema(Schema):
+class NoteAccessDataSchema(Schema):
     """
-    Facilitates accessing and decrypting an existing Note
-    via provided key/password.
+    Validates a note access request without looking the note up.
     """
     key = fields.Str(required=True)
     password = fields.Str(required=False, load_default='')
-    note = fields.Nested(NoteSchema, dump_only=True)
-
-    class Meta:
-        load_only = ('key', 'password')
-
-    @validates_schema
-    def validate_schema(self, data, **kwargs):
-        """
-        Validate the provided key and password,
-        ensuring the note is available and decryptable.
-
-        :param data: Deserialized schema data containing key/password
-        :raises ValidationError: If key is invalid, note is expired,
-                                 or decryption fails
-        """
-        key = data.get('key')
-        password = data.get('password', '')
-
-        note = Note.get_by_key(key, silent=True)
-        if not note:
-            raise ValidationError({'key': 'Invalid key.'})
-
-        if not note.is_available():
-            raise ValidationError({'note': 'Note has been expired and deleted'}
-                                  )
-
-        try:
-            note.decrypt(key, password)
-        except DecryptionError:
-            raise ValidationError({'password': 'Invalid password.'})
-
-        self.context['note'] = note
-
-    @post_load
-    def add_note_to_output(self, data, **kwargs):
-        """
-        Add the decrypted note instance to the output if validation succeeds.
-
-        :param data: Schema data after validation
-        :return: Data updated with 'note' field
-        """
-        if 'note' not in self.context:
-            raise ValidationError({'note': 'Failed to decrypt note.'})
-
-        data['note'] = self.context['note']
-        return data
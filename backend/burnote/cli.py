@@ -0,0 +1,105 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+notes_cli = AppGroup('notes', help='Maintenance commands for notes.')
+
+
+@notes_cli.command('reap')
+@click.option('--batch-size', type=int, default=None,
+              help='Rows deleted per batch (default: REAPER_BATCH_SIZE).')
+@click.option('--max-batches', type=int, default=None,
+              help='Stop after this many batches (default: '
+                   'REAPER_MAX_BATCHES, 0 means no limit).')
+def reap_command(batch_size, max_batches):
+    """Delete expired and burned notes."""
+    from burnote.models.reaper import reap
+
+    config = current_app.config
+    deleted = reap(batch_size or config['REAPER_BATCH_SIZE'],
+                   config['REAPER_MAX_BATCHES'] if max_batches is None
+                   else max_batches)
+    click.echo(f'Deleted {deleted} notes.')
+
+
+@notes_cli.command('filter')
+@click.option('--rebuild', is_flag=True,
+              help='Rebuild the filter from the note table first.')
+def filter_command(rebuild):
+    """Show the note filter size and false positive rate."""
+    from burnote.models.bloom import note_filter
+
+    if rebuild:
+        count = note_filter.rebuild()
+        click.echo('Rebuild already in progress.' if count is None
+                   else f'Added {count} notes.')
+    for name, value in note_filter.stats().items():
+        click.echo(f'{name}: {value}')
+
+
+@notes_cli.command('clear-cache')
+def clear_cache_command():
+    """Empty the note caches of all processes (NOTE_CACHE_REDIS_URL)."""
+    from burnote.models.notecache import note_cache
+
+    if not note_cache.enabled or not current_app.config[
+            'NOTE_CACHE_REDIS_URL']:
+        raise click.ClickException('NOTE_CACHE_REDIS_URL is not set.')
+    note_cache.clear()
+    click.echo('Cleared the note caches.')
+
+
+@notes_cli.command('partition')
+@click.option('--revert', is_flag=True,
+              help='Convert the table back into a plain table.')
+def partition_command(revert):
+    """Partition the note table by month (PostgreSQL)."""
+    from burnote.models.partitions import partition_table, unpartition_table
+    from settings import NOTE_PARTITIONS_AHEAD
+
+    try:
+        if revert:
+            unpartition_table()
+        else:
+            partition_table(NOTE_PARTITIONS_AHEAD)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if revert:
+        click.echo('Converted the note table into a plain table.')
+    else:
+        click.echo('Partitioned the note table. Restart the application '
+                   'with NOTE_PARTITIONS=1.')
+
+
+@notes_cli.command('partitions')
+@click.option('--drop', is_flag=True,
+              help='Drop old partitions without readable notes.')
+def partitions_command(drop):
+    """Create upcoming note partitions and list them (PostgreSQL)."""
+    from burnote.models.partitions import (drop_partitions,
+                                           ensure_partitions,
+                                           list_partitions, partitioning)
+    from settings import NOTE_PARTITIONS_AHEAD
+
+    if not partitioning.enabled:
+        raise click.ClickException('NOTE_PARTITIONS is not enabled or '
+                                   'the note table is not partitioned.')
+    for name in ensure_partitions(NOTE_PARTITIONS_AHEAD):
+        click.echo(f'Created {name}.')
+    if drop:
+        click.echo(f'Dropped {drop_partitions()} notes.')
+    for name, month in list_partitions():
+        click.echo(f'{name}: {month:%Y-%m}')
+
+
+pages_cli = AppGroup('pages', help='Commands for the static pages.')
+
+
+@pages_cli.command('prerender')
+@click.argument('directory', default='burnote/static/pages')
+def prerender_command(directory):
+    """Render the static pages to files served by the web server."""
+    from burnote.rendercache import prerender
+
+    for path in prerender(directory):
+        click.echo(f'Wrote {path}.')
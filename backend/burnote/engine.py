@@ -0,0 +1,46 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool
+
+
+def engine_options(config, asyncio: bool = False) -> dict:
+    """
+    Build SQLAlchemy engine options from the ``DB_*`` settings.
+
+    Pool settings only apply to PostgreSQL; SQLite keeps the SQLAlchemy
+    defaults. With ``DB_PGBOUNCER`` enabled, prepared statements and
+    startup parameters, which PgBouncer in transaction pooling mode does
+    not support, are not used.
+
+    :param config: Flask configuration (or any mapping with the settings)
+    :param asyncio: Build options for the asyncio (asyncpg) engine
+    :return: Keyword arguments for ``create_engine``
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() != 'postgresql':
+        return {}
+
+    if config['DB_POOL_DISABLED']:
+        options = {'poolclass': NullPool}
+    else:
+        options = {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+        }
+    options['pool_pre_ping'] = config['DB_POOL_PRE_PING']
+
+    connect_args = {}
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if asyncio:
+        if config['DB_PGBOUNCER']:
+            connect_args['statement_cache_size'] = 0
+            connect_args['prepared_statement_cache_size'] = 0
+        elif timeout:
+            connect_args['server_settings'] = {
+                'statement_timeout': str(timeout)}
+    elif timeout and not config['DB_PGBOUNCER']:
+        connect_args['options'] = f'-c statement_timeout={timeout}'
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
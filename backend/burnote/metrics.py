@@ -0,0 +1,129 @@
+import os
+import time
+
+from flask import Response, g
+from flask.signals import before_render_template, template_rendered
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Metrics are recorded by every process. With PROMETHEUS_MULTIPROC_DIR
+# set (required for several gunicorn workers), prometheus_client keeps
+# them in memory-mapped files in that directory and /metrics sums the
+# files of all workers.
+
+DB_QUERY_SECONDS = Histogram(
+    'burnote_db_query_seconds', 'Database statement execution time',
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+CRYPTO_SECONDS = Histogram(
+    'burnote_crypto_seconds',
+    'Note encryption and decryption time, without key derivation',
+    ['operation'],
+    buckets=(.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1,
+             .25, .5, 1))
+KDF_SECONDS = Histogram(
+    'burnote_kdf_seconds', 'Password key derivation time', ['algorithm'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+CRYPTO_QUEUE_DEPTH = Gauge(
+    'burnote_crypto_queue_depth',
+    'Encryptions and decryptions submitted to the crypto pool and not '
+    'finished', multiprocess_mode='livesum')
+RENDER_SECONDS = Histogram(
+    'burnote_render_seconds', 'Template rendering time', ['template'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25))
+
+NOTES_CREATED = Counter('burnote_notes_created_total', 'Notes created')
+NOTES_READ = Counter('burnote_notes_read_total', 'Notes read')
+NOTES_BURNED = Counter('burnote_notes_burned_total',
+                       'Burn-after-reading notes consumed')
+NOTES_EXPIRED = Counter('burnote_notes_expired_total',
+                        'Expired and burned notes deleted by the reaper')
+DECRYPTION_FAILURES = Counter('burnote_decryption_failures_total',
+                              'Failed note decryptions (wrong password)')
+NOTES_NOT_FOUND = Counter('burnote_notes_not_found_total',
+                          'Lookups of nonexistent note keys')
+REPLICA_LOOKUPS = Counter('burnote_replica_lookups_total',
+                          'Note lookups on read replicas', ['result'])
+NOTE_CACHE_LOOKUPS = Counter('burnote_note_cache_lookups_total',
+                             'Note lookups in the note cache', ['result'])
+
+
+def registry() -> CollectorRegistry:
+    """
+    Return the registry to expose, aggregating all worker processes
+    in multiprocess mode.
+
+    :return: Prometheus collector registry
+    """
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def metrics_view():
+    return Response(generate_latest(registry()),
+                    mimetype=CONTENT_TYPE_LATEST)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info['query_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = conn.info.pop('query_start', None)
+    if start is not None:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - start)
+
+
+def _before_render(sender, template, context, **extra):
+    g.setdefault('render_start', []).append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    RENDER_SECONDS.labels(template.name).observe(
+        time.perf_counter() - g.render_start.pop())
+
+
+class Metrics:
+    """
+    Exposes the metrics at ``/metrics`` and times database statements
+    and template rendering, if ``METRICS_ENABLED`` is set.
+
+    Crypto and KDF times and the note counters are recorded by the
+    models regardless of the setting.
+    """
+
+    def __init__(self, app=None):
+        self._hooked = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Register the endpoint and the timing hooks on the application.
+
+        :param app: Flask application
+        :return: None
+        """
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+        app.add_url_rule('/metrics', 'metrics', metrics_view)
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_rendered, app)
+        if not self._hooked:
+            # Engine-wide, so asyncio engines are timed as well
+            event.listen(Engine, 'before_cursor_execute',
+                         _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute',
+                         _after_cursor_execute)
+            self._hooked = True
+
+
+metrics = Metrics()
@@ -0,0 +1,375 @@
+import logging
+import math
+import threading
+from typing import Optional
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Hashes added per rebuild batch
+REBUILD_BATCH_SIZE = 10000
+
+# Add an entry in Redis: KEYS are the current bitmap, the next bitmap
+# and the entry count; ARGV the bit positions. The current bitmap is
+# only updated if it exists, a partial one would hide all other notes.
+ADD_SCRIPT = '''
+local current = redis.call('EXISTS', KEYS[1]) == 1
+for _, p in ipairs(ARGV) do
+  if current then
+    redis.call('SETBIT', KEYS[1], p, 1)
+  end
+  redis.call('SETBIT', KEYS[2], p, 1)
+end
+redis.call('INCR', KEYS[3])
+'''
+
+
+def filter_size(capacity: int, error_rate: float) -> tuple[int, int]:
+    """
+    Return the optimal Bloom filter size for the given capacity.
+
+    :param capacity: Expected number of entries
+    :param error_rate: Target false positive rate
+    :return: A tuple of (number of bits, number of hash functions)
+    """
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def positions(hash: str, bits: int, hashes: int) -> list:
+    """
+    Return the bit positions of a note hash.
+
+    Note hashes are SHA-256 digests already, so the positions are taken
+    from two 64-bit slices of the digest (double hashing) instead of
+    hashing again.
+
+    :param hash: Hex note hash
+    :param bits: Number of bits of the filter
+    :param hashes: Number of hash functions
+    :return: List of bit positions
+    """
+    h1 = int(hash[:16], 16)
+    h2 = int(hash[16:32], 16) | 1
+    return [(h1 + i * h2) % bits for i in range(hashes)]
+
+
+class MemoryBloomFilter:
+    """
+    Bloom filter kept in the memory of the process.
+
+    While the filter is rebuilt, new entries are added to both the
+    current and the next filter, so no entry created during the
+    rebuild is lost when the filters are swapped.
+    """
+
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self._current = None
+        self._next = None
+        self.count = 0
+        self.stale = 0
+
+    def ready(self) -> bool:
+        return self._current is not None
+
+    def contains(self, hash: str) -> bool:
+        current = self._current
+        if current is None:
+            return True
+        return all(current[p >> 3] & (1 << (p & 7))
+                   for p in positions(hash, self.bits, self.hashes))
+
+    def add(self, hash: str) -> None:
+        # Read the next filter first: once it has been swapped in,
+        # it is also the current one
+        building = self._next
+        current = self._current
+        for array in (building, current):
+            if array is not None:
+                self._set(array, hash)
+        self.count += 1
+
+    def _set(self, array: bytearray, hash: str) -> None:
+        for p in positions(hash, self.bits, self.hashes):
+            array[p >> 3] |= 1 << (p & 7)
+
+    def mark_stale(self, count: int) -> None:
+        self.stale += count
+
+    def begin_rebuild(self) -> bool:
+        self._next = bytearray((self.bits + 7) // 8)
+        return True
+
+    def add_rebuilt(self, hashes: list) -> None:
+        for hash in hashes:
+            self._set(self._next, hash)
+
+    def finish_rebuild(self, count: int) -> None:
+        self._current = self._next
+        self._next = None
+        self.count = count
+        self.stale = 0
+
+    def abort_rebuild(self) -> None:
+        self._next = None
+
+    def stats(self) -> dict:
+        return {'count': self.count, 'stale': self.stale,
+                'memory_bytes': (self.bits + 7) // 8}
+
+
+class RedisBloomFilter:
+    """
+    Bloom filter shared by all processes through Redis.
+
+    The bitmap is stored under a key that includes its size, so a
+    changed capacity or error rate starts a new filter. New entries are
+    always also written to the ``:next`` bitmap, which a rebuild clears
+    first and then renames over the current one; a lock ensures only
+    one process rebuilds at a time. While the current bitmap is missing
+    (not built yet, evicted, or a rebuild failed) entries go to
+    ``:next`` only, so the filter keeps answering True until rebuilt.
+    """
+
+    def __init__(self, bits: int, hashes: int, url: str,
+                 prefix: str = 'burnote:notes'):
+        if redis is None:
+            raise RuntimeError('The redis note filter requires the redis '
+                               'package')
+        self.bits = bits
+        self.hashes = hashes
+        self.client = redis.Redis.from_url(url)
+        self.key = f'{prefix}:{bits}:{hashes}'
+        self.add_script = self.client.register_script(ADD_SCRIPT)
+
+    def ready(self) -> bool:
+        return bool(self.client.exists(self.key))
+
+    def contains(self, hash: str) -> bool:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.exists(self.key)
+        for p in positions(hash, self.bits, self.hashes):
+            pipe.getbit(self.key, p)
+        exists, *values = pipe.execute()
+        # A missing bitmap (not built yet, or evicted) knows nothing
+        return not exists or all(values)
+
+    def add(self, hash: str) -> None:
+        self.add_script(keys=[self.key, self.key + ':next',
+                              self.key + ':count'],
+                        args=positions(hash, self.bits, self.hashes))
+
+    def mark_stale(self, count: int) -> None:
+        self.client.incrby(self.key + ':stale', count)
+
+    def begin_rebuild(self) -> bool:
+        if not self.client.set(self.key + ':lock', 1, nx=True, ex=3600):
+            return False
+        self.client.delete(self.key + ':next')
+        return True
+
+    def add_rebuilt(self, hashes: list) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for hash in hashes:
+            for p in positions(hash, self.bits, self.hashes):
+                pipe.setbit(self.key + ':next', p, 1)
+        pipe.execute()
+
+    def finish_rebuild(self, count: int) -> None:
+        pipe = self.client.pipeline()
+        # An empty table leaves no bitmap to rename: create it
+        pipe.setbit(self.key + ':next', self.bits - 1, 0)
+        pipe.rename(self.key + ':next', self.key)
+        pipe.set(self.key + ':count', count)
+        pipe.set(self.key + ':stale', 0)
+        pipe.delete(self.key + ':lock')
+        pipe.execute()
+
+    def abort_rebuild(self) -> None:
+        self.client.delete(self.key + ':lock')
+
+    def stats(self) -> dict:
+        count, stale = self.client.mget(self.key + ':count',
+                                        self.key + ':stale')
+        return {'count': int(count or 0), 'stale': int(stale or 0),
+                'memory_bytes': self.client.strlen(self.key)}
+
+
+class NoteFilter:
+    """
+    Bloom filter of the hashes of all notes in the ``note`` table.
+
+    :meth:`might_contain` answers False only for hashes that are
+    certainly not in the table, so lookups of unknown keys need no
+    query. Burned and reaped notes cannot be removed from a Bloom
+    filter; they are counted as stale and dropped when the filter is
+    rebuilt from the table (at startup, and by the reaper once half of
+    the entries are stale or the filter is missing).
+
+    ``NOTE_FILTER`` selects the storage: ``memory`` keeps the filter in
+    the process and is only correct when a single process creates
+    notes, ``redis`` shares it between all processes. Any error makes
+    the filter answer True, falling back to the database.
+    """
+
+    def __init__(self, app=None):
+        self.store = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Configure the filter and start building it in the background.
+
+        :param app: Flask application
+        :return: None
+        """
+        config = app.config
+        bits, hashes = filter_size(config['NOTE_FILTER_CAPACITY'],
+                                   config['NOTE_FILTER_ERROR_RATE'])
+        if config['NOTE_FILTER'] == 'memory':
+            self.store = MemoryBloomFilter(bits, hashes)
+        elif config['NOTE_FILTER'] == 'redis':
+            self.store = RedisBloomFilter(bits, hashes,
+                                          config['NOTE_FILTER_REDIS_URL'])
+        elif config['NOTE_FILTER']:
+            raise ValueError(
+                f"Unknown NOTE_FILTER {config['NOTE_FILTER']!r}")
+        else:
+            self.store = None
+        app.extensions['note_filter'] = self
+        if self.store is not None:
+            threading.Thread(target=self._load, args=(app,),
+                             name='burnote-note-filter', daemon=True).start()
+
+    @property
+    def remote(self) -> bool:
+        """
+        Whether every call is a network round trip (Redis storage).
+        """
+        return isinstance(self.store, RedisBloomFilter)
+
+    def _load(self, app) -> None:
+        with app.app_context():
+            try:
+                if not self.store.ready():
+                    self.rebuild()
+            except Exception:
+                app.logger.exception('Building the note filter failed')
+
+    def might_contain(self, hash: str) -> bool:
+        """
+        Check whether a note with the hash may exist.
+
+        :param hash: Note hash
+        :return: False if the note certainly does not exist
+        """
+        if self.store is None:
+            return True
+        try:
+            return self.store.contains(hash)
+        except Exception:
+            logger.exception('Note filter lookup failed')
+            return True
+
+    def add(self, hash: str) -> None:
+        """
+        Add the hash of a created note. Call it after the note has been
+        committed.
+
+        :param hash: Note hash
+        :return: None
+        """
+        if self.store is None:
+            return
+        try:
+            self.store.add(hash)
+        except Exception:
+            logger.exception('Note filter update failed')
+
+    def mark_stale(self, count: int = 1) -> None:
+        """
+        Record notes deleted from the table.
+
+        :param count: Number of deleted notes
+        :return: None
+        """
+        if self.store is None or not count:
+            return
+        try:
+            self.store.mark_stale(count)
+        except Exception:
+            logger.exception('Note filter update failed')
+
+    def rebuild(self) -> Optional[int]:
+        """
+        Rebuild the filter from the ``note`` table.
+
+        :return: Number of notes added, or None if another rebuild is
+                 in progress
+        """
+        from .note import Note
+
+        if self.store is None or not self._lock.acquire(blocking=False):
+            return None
+        try:
+            if not self.store.begin_rebuild():
+                return None
+            try:
+                count = 0
+                for hashes in Note.iter_hashes(REBUILD_BATCH_SIZE):
+                    self.store.add_rebuilt(hashes)
+                    count += len(hashes)
+            except BaseException:
+                self.store.abort_rebuild()
+                raise
+            self.store.finish_rebuild(count)
+            return count
+        finally:
+            self._lock.release()
+
+    def maybe_rebuild(self) -> Optional[int]:
+        """
+        Rebuild the filter if at least half of its entries are stale,
+        or if it is missing (e.g. evicted from Redis).
+
+        :return: See :meth:`rebuild`, None if no rebuild was needed
+        """
+        if self.store is None:
+            return None
+        stats = self.store.stats()
+        if (self.store.ready()
+                and stats['stale'] * 2 < max(stats['count'], 1)):
+            return None
+        return self.rebuild()
+
+    def stats(self) -> dict:
+        """
+        Return the size and the estimated false positive rate.
+
+        :return: Dictionary with the filter statistics
+        """
+        if self.store is None:
+            return {'enabled': False}
+        stats = self.store.stats()
+        bits, hashes = self.store.bits, self.store.hashes
+        fill = 1 - math.exp(-hashes * stats['count'] / bits)
+        return {
+            'enabled': True,
+            'ready': self.store.ready(),
+            'bits': bits,
+            'hashes': hashes,
+            **stats,
+            'false_positive_rate': fill ** hashes,
+        }
+
+
+note_filter = NoteFilter()
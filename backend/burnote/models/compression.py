@@ -0,0 +1,214 @@
+import itertools
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from .errors import DecryptionError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Raised on corrupted compressed data
+ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard else ())
+
+# Compression
+# -----------
+# Ciphertext does not compress, so note plaintext is compressed before
+# it is encrypted, if that saves enough: notes smaller than
+# ``COMPRESSION_MIN_SIZE`` are never compressed, larger ones only if a
+# fast compression of their first SAMPLE_SIZE bytes shrinks them to
+# ``COMPRESSION_MAX_RATIO`` or less. The algorithm is recorded in the
+# flags byte of the ciphertext header (see encryption.py), so notes
+# written without compression or with another algorithm still decrypt.
+NONE = 0
+ZLIB = 1
+ZSTD = 2
+ALGORITHMS = {'': NONE, 'zlib': ZLIB, 'zstd': ZSTD}
+DEFAULT_LEVELS = {ZLIB: 6, ZSTD: 3}
+SAMPLE_SIZE = 1 << 16
+# Decompressed plaintext is produced in pieces of at most this size
+OUTPUT_SIZE = 1 << 16
+
+
+class ChunkReader:
+    """
+    File-like reader over an iterable of byte strings.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._buffer:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b''
+            self._buffer = bytes(chunk)
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class Compression:
+    """
+    Compresses note plaintext with the ``COMPRESSION`` algorithm
+    ('' disables it, 'zlib', or 'zstd' which requires zstandard) and
+    decompresses it, up to ``DECOMPRESSION_LIMIT`` bytes per note.
+    """
+
+    def __init__(self, app=None):
+        self.algorithm = NONE
+        self.level = 0
+        self.min_size = 0
+        self.max_ratio = 1.0
+        self.limit = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Configure compression from the application config.
+
+        :param app: Flask application
+        :return: None
+        :raises ValueError: If the algorithm is unknown
+        """
+        config = app.config
+        name = config['COMPRESSION']
+        if name not in ALGORITHMS:
+            raise ValueError(f'Unknown compression {name!r}')
+        if name == 'zstd' and zstandard is None:
+            raise RuntimeError('zstd compression requires the zstandard '
+                               'package')
+        self.algorithm = ALGORITHMS[name]
+        self.level = (config['COMPRESSION_LEVEL']
+                      or DEFAULT_LEVELS.get(self.algorithm, 0))
+        self.min_size = config['COMPRESSION_MIN_SIZE']
+        self.max_ratio = config['COMPRESSION_MAX_RATIO']
+        self.limit = config['DECOMPRESSION_LIMIT']
+        app.extensions['compression'] = self
+
+    def choose(self, sample: bytes) -> int:
+        """
+        Select the algorithm for a plaintext.
+
+        :param sample: The plaintext, or its first SAMPLE_SIZE bytes
+        :return: The algorithm flag, NONE if it is not worth compressing
+        """
+        if not self.algorithm or len(sample) < self.min_size:
+            return NONE
+        estimate = len(zlib.compress(sample, 1))
+        if estimate > len(sample) * self.max_ratio:
+            return NONE
+        return self.algorithm
+
+    def apply(self, chunks: Iterable[bytes]
+              ) -> tuple[Iterator[bytes], int]:
+        """
+        Compress a plaintext stream if it is worth it.
+
+        Only the first SAMPLE_SIZE bytes are read to decide.
+
+        :param chunks: Plaintext as an iterable of byte strings
+        :return: A tuple of (plaintext or compressed stream,
+                 algorithm flag)
+        """
+        chunks = iter(chunks)
+        head = []
+        size = 0
+        for chunk in chunks:
+            head.append(chunk)
+            size += len(chunk)
+            if size >= SAMPLE_SIZE:
+                break
+        sample = b''.join(chunk[:SAMPLE_SIZE] for chunk in head)
+        stream = itertools.chain(head, chunks)
+        flag = self.choose(sample[:SAMPLE_SIZE])
+        if flag == NONE:
+            return stream, flag
+        return self.compress(flag, stream), flag
+
+    def compress(self, flag: int, chunks: Iterable[bytes]
+                 ) -> Iterator[bytes]:
+        """
+        Compress a stream incrementally.
+
+        :param flag: Algorithm flag
+        :param chunks: Plaintext as an iterable of byte strings
+        :return: Iterator over the compressed data
+        """
+        if flag == ZSTD:
+            compressor = zstandard.ZstdCompressor(
+                level=self.level).compressobj()
+        else:
+            compressor = zlib.compressobj(self.level)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    def decompress(self, flag: int, chunks: Iterable[bytes],
+                   limit: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Decompress a stream incrementally, in pieces of at most
+        OUTPUT_SIZE bytes.
+
+        :param flag: Algorithm flag
+        :param chunks: Compressed data as an iterable of byte strings
+        :param limit: Maximum decompressed size, ``DECOMPRESSION_LIMIT``
+                      by default (0 means no limit)
+        :return: Iterator over the decompressed data
+        :raises DecryptionError: If the data is invalid or exceeds
+                                 the limit
+        """
+        limit = self.limit if limit is None else limit
+        if flag == ZSTD:
+            if zstandard is None:
+                raise DecryptionError('zstd compressed note, zstandard '
+                                      'is not installed')
+            pieces = self._zstd_pieces(chunks)
+        else:
+            pieces = self._zlib_pieces(chunks)
+        total = 0
+        try:
+            for piece in pieces:
+                total += len(piece)
+                if limit and total > limit:
+                    raise DecryptionError('Decompressed note exceeds '
+                                          'the size limit')
+                yield piece
+        except ERRORS as e:
+            raise DecryptionError('Invalid password or data corrupted'
+                                  ) from e
+
+    @staticmethod
+    def _zlib_pieces(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        decompressor = zlib.decompressobj()
+        for chunk in chunks:
+            while chunk:
+                piece = decompressor.decompress(chunk, OUTPUT_SIZE)
+                chunk = decompressor.unconsumed_tail
+                if piece:
+                    yield piece
+        while not decompressor.eof:
+            piece = decompressor.decompress(b'', OUTPUT_SIZE)
+            if not piece:
+                raise zlib.error('Truncated compressed data')
+            yield piece
+
+    @staticmethod
+    def _zstd_pieces(chunks: Iterable[bytes]) -> Iterator[bytes]:
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            ChunkReader(chunks))
+        while True:
+            piece = reader.read(OUTPUT_SIZE)
+            if not piece:
+                return
+            yield piece
+
+
+compression = Compression()
@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Callable, Optional
+
+from burnote.metrics import CRYPTO_QUEUE_DEPTH
+
+from .compression import compression
+from .encryption import Encryptor, decode_stream
+
+# Crypto pool
+# -----------
+# Notes of ``CRYPTO_OFFLOAD_SIZE`` characters or more are encrypted and
+# decrypted on a pool of ``CRYPTO_WORKERS`` workers instead of the
+# request thread:
+#
+#   thread    threads of the worker process; AES-GCM, zlib and the KDFs
+#             release the GIL, so the threads of a gthread worker or of
+#             the asyncio app encrypt in parallel
+#   process   separate processes, key derivation included, so the pool
+#             is shared by the threads of a worker; the plaintext and
+#             the ciphertext are copied between the processes
+#
+# Streamed notes are encrypted while they are read or written and stay
+# on the request thread.
+
+
+def seal_note(title: str, text: str, password: str, key: str,
+              kdf: Optional[str]) -> bytes:
+    """
+    Encrypt a note into an envelope, see :meth:`Encryptor.encrypt_note`.
+
+    :return: The envelope
+    """
+    return b''.join(Encryptor.encrypt_note(title, text, password, key, kdf))
+
+
+def open_note(envelope: bytes, password: str, key: str,
+              kdf: Optional[str]) -> tuple[str, str]:
+    """
+    Decrypt an envelope, see :meth:`Encryptor.decrypt_note`.
+
+    :return: A tuple of (title, text)
+    :raises DecryptionError: If the password is invalid
+    """
+    title, text = Encryptor.decrypt_note([envelope], password, key, kdf)
+    return title, ''.join(decode_stream(text))
+
+
+def init_worker(settings: dict) -> None:
+    """
+    Apply the compression settings of the application in a worker
+    process.
+
+    :param settings: Attributes of the application's compression
+    :return: None
+    """
+    vars(compression).update(settings)
+
+
+class CryptoPool:
+    """
+    Runs large encryptions and decryptions on the ``CRYPTO_EXECUTOR``
+    pool ('' runs them in the calling thread, 'thread' or 'process').
+    ``burnote_crypto_queue_depth`` counts the submitted tasks that have
+    not finished; those above ``CRYPTO_WORKERS`` are waiting.
+    """
+
+    def __init__(self, app=None):
+        self.executor: Optional[Executor] = None
+        self.threshold = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Create the pool from the application config.
+
+        :param app: Flask application
+        :return: None
+        :raises ValueError: If the executor type is unknown
+        """
+        config = app.config
+        kind = config['CRYPTO_EXECUTOR']
+        workers = config['CRYPTO_WORKERS'] or os.cpu_count() or 1
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        if kind == '':
+            self.executor = None
+        elif kind == 'thread':
+            self.executor = ThreadPoolExecutor(workers,
+                                               thread_name_prefix='crypto')
+        elif kind == 'process':
+            # Forking a worker with running threads could copy held locks
+            self.executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(dict(vars(compression)),))
+        else:
+            raise ValueError(f'Unknown crypto executor {kind!r}')
+        self.threshold = config['CRYPTO_OFFLOAD_SIZE']
+        app.extensions['crypto_pool'] = self
+
+    def offloads(self, size: int) -> bool:
+        """
+        :param size: Note size in characters or bytes
+        :return: True if a note of this size is handled by the pool
+        """
+        return self.executor is not None and size >= self.threshold
+
+    def submit(self, size: int, func: Callable, *args) -> Future:
+        """
+        Schedule ``func(*args)``, on the pool if the note is large.
+
+        :param size: Note size in characters or bytes
+        :param func: Module-level function (picklable for processes)
+        :return: Future of the result
+        """
+        if not self.offloads(size):
+            future = Future()
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        CRYPTO_QUEUE_DEPTH.inc()
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda _: CRYPTO_QUEUE_DEPTH.dec())
+        return future
+
+    def run(self, size: int, func: Callable, *args):
+        """
+        Call ``func(*args)``, on the pool if the note is large, and
+        wait for the result.
+
+        :param size: Note size in characters or bytes
+        :param func: Module-level function (picklable for processes)
+        :return: The result of ``func``
+        """
+        return self.submit(size, func, *args).result()
+
+
+crypto_pool = CryptoPool()
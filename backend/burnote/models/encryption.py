@@ -1,9 +1,44 @@
+import codecs
 import hashlib
+import itertools
 import os
+import struct
+from typing import Iterable, Iterator, Optional, Union
 
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
+from .compression import ALGORITHMS, compression
 from .errors import DecryptionError
+from .kdf import DerivedKey, key_derivation
+
+# Ciphertext format
+# -----------------
+# Legacy (no header): nonce (12 bytes) + AES-GCM ciphertext and tag.
+#
+# Version 1 (chunked): a header followed by segments.
+#   header:  MAGIC (4) | version (1) | flags (1) | chunk shift (1)
+#            | nonce prefix (7)
+#   segment: AES-GCM ciphertext and tag of up to 2 ** shift bytes of
+#            plaintext, authenticated with the header as associated data.
+# The nonce of segment ``i`` is ``prefix | i (4 bytes) | last (1 byte)``,
+# so reordered, dropped or truncated segments fail authentication.
+# The flags select the compression of the plaintext before encryption:
+# 0 none, 1 zlib, 2 zstd (see compression.py).
+# A legacy ciphertext is taken for version 1 only if its random nonce
+# starts with MAGIC and a known version (probability 2 ** -39).
+#
+# Version 2 (note envelope): the version 1 layout with the title and the
+# text of a note in one plaintext: title length (4) | title | text.
+# A note then needs one key derivation and, up to 64 KiB, one nonce and
+# one tag.
+MAGIC = b'BURN'
+VERSION = 1
+ENVELOPE_VERSION = 2
+HEADER = struct.Struct('>4sBBB7s')
+TITLE_LENGTH = struct.Struct('>I')
+CHUNK_SHIFT = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
 
 
 class Encryptor:
@@ -13,49 +48,307 @@ class Encryptor:
     """
 
     @staticmethod
-    def generate_key(password: str, note_id: str) -> bytes:
+    def generate_key(password: Union[str, DerivedKey], note_id: str,
+                     kdf: Optional[str] = None) -> bytes:
         """
-        Generate a SHA-256 key from the provided password and note identifier.
+        Generate a key from the provided password and note identifier.
 
-        :param password: The password used to generate the key
+        :param password: The password used to generate the key, or the
+                         key itself, see :meth:`derive_key`
         :param note_id: A unique identifier for the note
+        :param kdf: KDF spec of the note (see kdf.py); without it the key
+                    is a single SHA-256 of password and note identifier
         :return: A 32-byte encryption key
         """
-        return hashlib.sha256((password + note_id).encode()).digest()
+        if isinstance(password, DerivedKey):
+            return password
+        if kdf is None:
+            return hashlib.sha256((password + note_id).encode()).digest()
+        return key_derivation.derive(password, note_id, kdf)
+
+    @staticmethod
+    def derive_key(password: str, note_id: str,
+                   kdf: Optional[str] = None) -> DerivedKey:
+        """
+        Derive the key of a note in advance; it can be passed to the
+        other methods in place of the password.
+
+        :param password: The password used to generate the key
+        :param note_id: A unique identifier for the note
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :return: The 32-byte encryption key
+        """
+        return DerivedKey(Encryptor.generate_key(password, note_id, kdf))
 
     @staticmethod
-    def encrypt_data(data: str, password: str, note_id: str) -> bytes:
+    def encrypt_data(data: str, password: str, note_id: str,
+                     kdf: Optional[str] = None) -> bytes:
         """
         Encrypt text data using AES-GCM.
 
         :param data: The plaintext data to be encrypted
         :param password: The password used to generate the key
         :param note_id: A unique identifier for the note
-        :return: The AES-GCM encrypted data with nonce prepended
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :return: The encrypted data in the chunked format
         """
-        key = Encryptor.generate_key(password, note_id)
-        nonce = os.urandom(12)
-        aesgcm = AESGCM(key)
-        ciphertext = aesgcm.encrypt(nonce, data.encode(), None)
-        return nonce + ciphertext
+        return b''.join(Encryptor.encrypt_stream(
+            [data.encode()], password, note_id, kdf=kdf, compress=True))
 
     @staticmethod
-    def decrypt_data(ciphertext: bytes, password: str, note_id: str) -> str:
+    def decrypt_data(ciphertext: bytes, password: str, note_id: str,
+                     kdf: Optional[str] = None) -> str:
         """
         Decrypt data previously encrypted with AES-GCM.
 
+        :param ciphertext: The encrypted data, chunked or legacy format
+        :param password: The password used to generate the key
+        :param note_id: A unique identifier for the note
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :return: The decrypted plaintext as a string
+        :raises DecryptionError: If decryption fails due to invalid key or data
+        """
+        if not Encryptor.is_chunked(ciphertext):
+            return Encryptor.decrypt_legacy(ciphertext, password, note_id,
+                                            kdf)
+        plaintext = b''.join(Encryptor.decrypt_stream(
+            [ciphertext], password, note_id, versions=(VERSION,), kdf=kdf))
+        try:
+            return plaintext.decode()
+        except UnicodeDecodeError as e:
+            raise DecryptionError('Invalid password or data corrupted') from e
+
+    @staticmethod
+    def decrypt_legacy(ciphertext: bytes, password: str, note_id: str,
+                       kdf: Optional[str] = None) -> str:
+        """
+        Decrypt data in the legacy single-shot format (nonce + ciphertext).
+
         :param ciphertext: The encrypted data (nonce + ciphertext)
         :param password: The password used to generate the key
         :param note_id: A unique identifier for the note
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
         :return: The decrypted plaintext as a string
         :raises DecryptionError: If decryption fails due to invalid key or data
         """
-        key = Encryptor.generate_key(password, note_id)
-        nonce = ciphertext[:12]
-        encrypted_data = ciphertext[12:]
+        key = Encryptor.generate_key(password, note_id, kdf)
+        nonce = ciphertext[:NONCE_SIZE]
+        encrypted_data = ciphertext[NONCE_SIZE:]
         aesgcm = AESGCM(key)
         try:
             decrypted_data = aesgcm.decrypt(nonce, encrypted_data, None)
             return decrypted_data.decode()
         except Exception as e:
             raise DecryptionError('Invalid password or data corrupted') from e
+
+    @staticmethod
+    def is_chunked(ciphertext: bytes) -> bool:
+        """
+        Return True if the ciphertext starts with a chunked format header.
+
+        :param ciphertext: The encrypted data or its first bytes
+        :return: Boolean indicating the chunked format
+        """
+        return (ciphertext[:len(MAGIC)] == MAGIC
+                and ciphertext[len(MAGIC):len(MAGIC) + 1] in (
+                    bytes([VERSION]), bytes([ENVELOPE_VERSION])))
+
+    @staticmethod
+    def is_envelope(ciphertext: bytes) -> bool:
+        """
+        Return True if the ciphertext is a note envelope (title and text).
+
+        :param ciphertext: The encrypted data or its first bytes
+        :return: Boolean indicating the envelope format
+        """
+        return ciphertext[:len(MAGIC) + 1] == MAGIC + bytes([ENVELOPE_VERSION])
+
+    @staticmethod
+    def encrypt_note(title: str, text: Union[str, Iterable[bytes]],
+                     password: str, note_id: str,
+                     kdf: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Encrypt the title and the text of a note into one envelope.
+
+        :param title: The note title
+        :param text: The note text, a string or an iterable of UTF-8
+                     encoded chunks
+        :param password: The password used to generate the key
+        :param note_id: A unique identifier for the note
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :return: Iterator over the header and the encrypted segments
+        """
+        head = title.encode()
+        if isinstance(text, str):
+            text = [text.encode()]
+        return Encryptor.encrypt_stream(
+            itertools.chain([TITLE_LENGTH.pack(len(head)) + head], text),
+            password, note_id, version=ENVELOPE_VERSION, kdf=kdf,
+            compress=True)
+
+    @staticmethod
+    def decrypt_note(chunks: Iterable[bytes], password: str, note_id: str,
+                     kdf: Optional[str] = None
+                     ) -> tuple[str, Iterator[bytes]]:
+        """
+        Decrypt a note envelope.
+
+        The title is decrypted (and the password verified) before this
+        method returns; the text is decrypted while the returned
+        iterator is consumed.
+
+        :param chunks: Envelope ciphertext as an iterable of byte strings
+        :param password: The password used to generate the key
+        :param note_id: A unique identifier for the note
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :return: A tuple of (title, iterator over the UTF-8 encoded text)
+        :raises DecryptionError: If decryption fails due to invalid key or data
+        """
+        plaintext = Encryptor.decrypt_stream(chunks, password, note_id,
+                                             versions=(ENVELOPE_VERSION,),
+                                             kdf=kdf)
+        buffer = bytearray()
+        for piece in plaintext:
+            buffer += piece
+            if len(buffer) < TITLE_LENGTH.size:
+                continue
+            end = TITLE_LENGTH.size + TITLE_LENGTH.unpack_from(buffer)[0]
+            if len(buffer) >= end:
+                break
+        else:
+            raise DecryptionError('Invalid password or data corrupted')
+        try:
+            title = buffer[TITLE_LENGTH.size:end].decode()
+        except UnicodeDecodeError as e:
+            raise DecryptionError('Invalid password or data corrupted') from e
+        return title, itertools.chain([bytes(buffer[end:])], plaintext)
+
+    @staticmethod
+    def encrypt_stream(chunks: Iterable[bytes], password: str, note_id: str,
+                       chunk_shift: int = CHUNK_SHIFT,
+                       version: int = VERSION,
+                       kdf: Optional[str] = None,
+                       compress: bool = False) -> Iterator[bytes]:
+        """
+        Encrypt a stream of plaintext incrementally.
+
+        Only one segment of plaintext is held in memory at a time, and
+        the first 64 KiB if it may be compressed.
+
+        :param chunks: Plaintext as an iterable of byte strings
+        :param password: The password used to generate the key
+        :param note_id: A unique identifier for the note
+        :param chunk_shift: Segment size as a power of two
+        :param version: Format version written to the header
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :param compress: Compress the plaintext first if it is worth it
+                         (see compression.py)
+        :return: Iterator over the header and the encrypted segments
+        """
+        aesgcm = AESGCM(Encryptor.generate_key(password, note_id, kdf))
+        prefix = os.urandom(NONCE_SIZE - 5)
+        flags = 0
+        if compress:
+            chunks, flags = compression.apply(chunks)
+        header = HEADER.pack(MAGIC, version, flags, chunk_shift, prefix)
+        yield header
+
+        size = 1 << chunk_shift
+        counter = 0
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+            # Keep at least one byte back: the last segment is only
+            # known when the input is exhausted
+            while len(buffer) > size:
+                nonce = prefix + struct.pack('>IB', counter, 0)
+                yield aesgcm.encrypt(nonce, bytes(buffer[:size]), header)
+                del buffer[:size]
+                counter += 1
+        nonce = prefix + struct.pack('>IB', counter, 1)
+        yield aesgcm.encrypt(nonce, bytes(buffer), header)
+
+    @staticmethod
+    def decrypt_stream(chunks: Iterable[bytes], password: str, note_id: str,
+                       versions: tuple = (VERSION, ENVELOPE_VERSION),
+                       kdf: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Decrypt a stream of chunked-format ciphertext incrementally.
+
+        Every segment is authenticated before its plaintext is yielded;
+        a truncated stream raises when the input ends. Compressed
+        plaintext is decompressed, up to ``DECOMPRESSION_LIMIT`` bytes.
+
+        :param chunks: Ciphertext as an iterable of byte strings
+        :param password: The password used to generate the key
+        :param note_id: A unique identifier for the note
+        :param versions: Format versions accepted in the header
+        :param kdf: KDF spec of the note, see :meth:`generate_key`
+        :return: Iterator over the plaintext segments
+        :raises DecryptionError: If decryption fails due to invalid key or data
+        """
+        aesgcm = AESGCM(Encryptor.generate_key(password, note_id, kdf))
+        chunks = iter(chunks)
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= HEADER.size:
+                break
+        else:
+            raise DecryptionError('Invalid password or data corrupted')
+        header = bytes(buffer[:HEADER.size])
+        del buffer[:HEADER.size]
+        magic, version, flags, _, _ = HEADER.unpack(header)
+        if (magic != MAGIC or version not in versions
+                or flags not in ALGORITHMS.values()):
+            raise DecryptionError('Unknown ciphertext format')
+        plaintext = Encryptor._open_segments(
+            aesgcm, header, itertools.chain([bytes(buffer)], chunks))
+        if flags:
+            plaintext = compression.decompress(flags, plaintext)
+        yield from plaintext
+
+    @staticmethod
+    def _open_segments(aesgcm: AESGCM, header: bytes,
+                       chunks: Iterable[bytes]) -> Iterator[bytes]:
+        _, _, _, shift, prefix = HEADER.unpack(header)
+        size = (1 << shift) + TAG_SIZE
+        buffer = bytearray()
+        counter = 0
+        for chunk in chunks:
+            buffer += chunk
+            while len(buffer) > size:
+                yield Encryptor._open_segment(
+                    aesgcm, prefix, counter, False, buffer[:size], header)
+                del buffer[:size]
+                counter += 1
+        yield Encryptor._open_segment(aesgcm, prefix, counter, True, buffer,
+                                      header)
+
+    @staticmethod
+    def _open_segment(aesgcm: AESGCM, prefix: bytes, counter: int,
+                      last: bool, segment, header: bytes) -> bytes:
+        nonce = prefix + struct.pack('>IB', counter, last)
+        try:
+            return aesgcm.decrypt(nonce, bytes(segment), header)
+        except Exception as e:
+            raise DecryptionError('Invalid password or data corrupted') from e
+
+
+def decode_stream(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Decode a stream of UTF-8 bytes incrementally.
+
+    :param chunks: Iterable of byte strings
+    :return: Iterator over decoded string pieces
+    :raises DecryptionError: If the bytes are not valid UTF-8
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError as e:
+        raise DecryptionError('Invalid password or data corrupted') from e
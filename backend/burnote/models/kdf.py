@@ -0,0 +1,160 @@
+import hashlib
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from burnote.metrics import KDF_SECONDS
+
+# Key derivation functions
+# ------------------------
+# A KDF is described by a spec string stored with every note, so the
+# configured KDF can change without breaking existing notes:
+#
+#   scrypt:N:r:p        hashlib.scrypt, N a power of two
+#   pbkdf2:iterations   PBKDF2-HMAC-SHA256
+#
+# The note key is the salt; it is unique per note and not stored.
+# Notes without a spec (no password, or written before KDFs were
+# introduced) use a single SHA-256 over password and key, see
+# :meth:`Encryptor.generate_key`.
+DEFAULT_KDF = 'scrypt:16384:8:1'
+KEY_SIZE = 32
+
+
+@lru_cache(maxsize=16)
+def parse(spec: str) -> tuple[str, tuple[int, ...]]:
+    """
+    Parse and validate a KDF spec.
+
+    :param spec: KDF spec string, e.g. ``scrypt:16384:8:1``
+    :return: A tuple of (algorithm, parameters)
+    :raises ValueError: If the spec is malformed or unknown
+    """
+    name, *params = spec.split(':')
+    try:
+        params = tuple(int(p) for p in params)
+    except ValueError:
+        raise ValueError(f'Invalid KDF spec {spec!r}') from None
+    if name == 'scrypt' and len(params) == 3:
+        n, r, p = params
+        if n < 2 or n & (n - 1):
+            raise ValueError(f'scrypt N must be a power of two: {spec!r}')
+    elif not (name == 'pbkdf2' and len(params) == 1):
+        raise ValueError(f'Unknown KDF spec {spec!r}')
+    return name, params
+
+
+def derive(password: str, note_id: str, spec: str) -> bytes:
+    """
+    Derive an encryption key with the KDF described by ``spec``.
+
+    :param password: The password
+    :param note_id: A unique identifier for the note, used as salt
+    :param spec: KDF spec string
+    :return: A 32-byte encryption key
+    :raises ValueError: If the spec is malformed or unknown
+    """
+    name, params = parse(spec)
+    if name == 'scrypt':
+        n, r, p = params
+        return hashlib.scrypt(password.encode(), salt=note_id.encode(),
+                              n=n, r=r, p=p, dklen=KEY_SIZE,
+                              maxmem=256 * n * r * p)
+    return hashlib.pbkdf2_hmac('sha256', password.encode(),
+                               note_id.encode(), params[0], KEY_SIZE)
+
+
+class DerivedKey(bytes):
+    """
+    An encryption key derived from a password in advance.
+
+    It is accepted wherever the password is (see
+    :meth:`Encryptor.generate_key`), so that the key derivation can run
+    before a transaction is opened, or for several notes at once.
+    """
+
+
+class KeyDerivation:
+    """
+    Runs key derivation on a bounded pool of threads.
+
+    The KDFs release the GIL, so at most ``KDF_WORKERS`` derivations
+    (each taking tens of milliseconds and, for scrypt, ``128 * N * r``
+    bytes of memory) run at once per process; further requests wait
+    for a free worker instead of exhausting CPU and memory. With
+    ``KDF_WORKERS`` set to 0 keys are derived in the calling thread.
+    """
+
+    def __init__(self, app=None):
+        self.spec = DEFAULT_KDF
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Configure the KDF and the worker pool from the application config.
+
+        :param app: Flask application
+        :return: None
+        """
+        self.spec = app.config['KDF']
+        parse(self.spec)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        workers = app.config['KDF_WORKERS']
+        self.executor = (ThreadPoolExecutor(workers, thread_name_prefix='kdf')
+                         if workers else None)
+        app.extensions['key_derivation'] = self
+
+    def spec_for(self, password: str) -> Optional[str]:
+        """
+        Return the KDF spec to store with a new note.
+
+        A note without a password gets no KDF: its key is derived from
+        the note key alone, which stretching cannot make harder to guess.
+
+        :param password: Password of the note
+        :return: The configured spec, or None for an empty password
+        """
+        return self.spec if password else None
+
+    def derive(self, password: str, note_id: str, spec: str) -> bytes:
+        """
+        Derive an encryption key on the worker pool.
+
+        :param password: The password
+        :param note_id: A unique identifier for the note, used as salt
+        :param spec: KDF spec string
+        :return: A 32-byte encryption key
+        """
+        return self.submit(password, note_id, spec).result()
+
+    def submit(self, password: str, note_id: str, spec: str) -> Future:
+        """
+        Start deriving an encryption key on the worker pool.
+
+        :param password: The password
+        :param note_id: A unique identifier for the note, used as salt
+        :param spec: KDF spec string
+        :return: Future of the 32-byte encryption key
+        :raises ValueError: If the spec is malformed or unknown
+        """
+        histogram = KDF_SECONDS.labels(parse(spec)[0])
+        start = time.perf_counter()
+        if self.executor is None:
+            future = Future()
+            try:
+                future.set_result(derive(password, note_id, spec))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = self.executor.submit(derive, password, note_id, spec)
+        # Includes the time spent waiting for a free worker
+        future.add_done_callback(
+            lambda _: histogram.observe(time.perf_counter() - start))
+        return future
+
+
+key_derivation = KeyDerivation()
@@ -0,0 +1,17 @@
+import random
+
+from settings import KEY_ALPHABET, KEY_LENGTH
+
+_random = random.SystemRandom()
+
+
+def random_key() -> str:
+    """
+    Generate a random note key.
+
+    Uniqueness is not checked here: it is enforced by the unique index
+    on ``note.hash`` when the note is inserted.
+
+    :return: A random string key
+    """
+    return ''.join(_random.choices(KEY_ALPHABET, k=KEY_LENGTH))
@@ -1,27 +1,69 @@
 import hashlib
-import random
+import itertools
+from concurrent.futures import Future
 from datetime import datetime, timezone
+from typing import Iterator, Optional
 
-from sqlalchemy.orm import Mapped, mapped_column
+from flask import abort
+from sqlalchemy import and_, delete, insert, not_, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import (Mapped, mapped_column, query_expression,
+                            with_expression)
+from sqlalchemy.orm.exc import ObjectDeletedError
 
 from burnote import db
-from settings import DOMAIN, HASH_LENGTH, KEY_ALPHABET, KEY_LENGTH, SCHEMA
-
-from .encryption import Encryptor
+from burnote.metrics import (CRYPTO_SECONDS, DECRYPTION_FAILURES,
+                             NOTES_BURNED, NOTES_CREATED, NOTES_NOT_FOUND,
+                             NOTES_READ)
+from burnote.replicas import lookup
+from settings import (DOMAIN, HASH_LENGTH, KEY_ATTEMPTS, NOTE_PARTITIONS,
+                      SCHEMA)
+
+from .bloom import note_filter
+from .cryptopool import crypto_pool, open_note, seal_note
+from .encryption import Encryptor, decode_stream
+from .errors import DecryptionError
+from .kdf import DerivedKey, key_derivation
+from .keys import random_key
+from .notecache import note_cache
+from .partitions import note_hash, partitioning
+from .storage import content_storage
 
 
 class Note(db.Model):
+    __table_args__ = (
+        db.Index(
+            'ix_note_expiry', 'is_expired', 'expiration_date',
+            postgresql_where=db.text(
+                'is_expired OR expiration_date IS NOT NULL'),
+            sqlite_where=db.text(
+                'is_expired OR expiration_date IS NOT NULL'),
+        ),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
+    # Partitioned notes are unique through the note_hash table instead
+    # (see partitions.py)
     hash: Mapped[str] = mapped_column(
         db.String(HASH_LENGTH), nullable=False,
-        unique=True, index=True
+        unique=not NOTE_PARTITIONS, index=True
     )
     is_expired: Mapped[bool] = mapped_column(
         db.Boolean, nullable=False, default=False
     )
 
-    title: Mapped[bytes] = mapped_column(db.LargeBinary, nullable=True)
-    text: Mapped[bytes] = mapped_column(db.LargeBinary, nullable=False)
+    # The ciphertext is loaded only when it is accessed, i.e. when the
+    # note is decrypted, not when it is looked up (see get_by_hash)
+    title: Mapped[bytes] = mapped_column(db.LargeBinary, nullable=True,
+                                         deferred=True,
+                                         deferred_group='content')
+    text: Mapped[bytes] = mapped_column(db.LargeBinary, nullable=False,
+                                        deferred=True,
+                                        deferred_group='content')
+    # Reference of the text ciphertext in blob storage, see storage.py
+    content_ref: Mapped[str] = mapped_column(db.String(64), nullable=True)
+    # Password KDF spec the note was encrypted with, see kdf.py
+    kdf: Mapped[str] = mapped_column(db.String(32), nullable=True)
 
     timestamp: Mapped[datetime] = mapped_column(
         nullable=False,
@@ -32,6 +74,10 @@ class Note(db.Model):
     burn_after_reading: Mapped[bool] = mapped_column(db.Boolean,
                                                      nullable=False)
 
+    # Whether the note was neither burned nor expired when it was looked
+    # up, evaluated by the database; None if loaded by another query
+    available: Mapped[Optional[bool]] = query_expression()
+
     def __repr__(self):
         return f'<Note {self.hash}>'
 
@@ -40,14 +86,28 @@ class Note(db.Model):
         """
         Retrieve a note by its hash.
 
+        Hashes rejected by the note filter are not looked up in the
+        database. Only the lightweight columns are read, with
+        :attr:`available` computed by the query; the ciphertext is
+        loaded when the note is decrypted. The lookup is sent to a read
+        replica, if configured, and repeated on the primary if the
+        replica does not find the note (see :mod:`burnote.replicas`).
+        Notes read recently are returned from the note cache, without a
+        query (see :meth:`cache`).
+
         :param hash: Hash string identifying a note
         :param silent: If True, returns None when not found;
                        otherwise raises 404
         :return: The Note object or None
         :raises NotFound: If silent=False and no note matches
         """
-        q = Note.query.filter_by(hash=hash)
-        return q.first() if silent else q.first_or_404()
+        cached = Note.from_cache(hash)
+        if cached is not None:
+            return cached
+        if not note_filter.might_contain(hash):
+            return None if silent else abort(404)
+        note = lookup(db.session, Note.select_by_hash(hash))
+        return note if note is not None or silent else abort(404)
 
     @staticmethod
     def get_by_key(key: str, silent: bool = False) -> 'Note':
@@ -60,22 +120,24 @@ class Note(db.Model):
         :return: The Note object or None
         :raises NotFound: If silent=False and no note matches
         """
-        q = Note.query.filter_by(hash=Note.generate_hash(key))
-        return q.first() if silent else q.first_or_404()
+        note = Note.get_by_hash(Note.generate_hash(key), silent=True)
+        if note is None:
+            NOTES_NOT_FOUND.inc()
+            if not silent:
+                abort(404)
+        return note
 
     @staticmethod
     def generate_key() -> str:
         """
-        Generate a random unique key for the note.
+        Generate a random key for the note.
+
+        The key is not checked against the database: a collision is
+        detected by the unique index on insert (see :meth:`create`).
 
         :return: A random string key
         """
-        key = ''.join(random.choices(KEY_ALPHABET, k=KEY_LENGTH))
-
-        while Note.get_by_key(key, silent=True):
-            key = ''.join(random.choices(KEY_ALPHABET, k=KEY_LENGTH))
-
-        return key
+        return random_key()
 
     @staticmethod
     def generate_hash(external_key: str) -> str:
@@ -109,31 +171,134 @@ class Note(db.Model):
         """
         Create a new Note and optionally save it to the database.
 
+        The note is inserted optimistically; if the key collides with
+        an existing one, a new key is drawn and the insert is retried.
+        Streamed text (an iterable of bytes) can be read only once, so
+        its key is checked with a SELECT instead and it is inserted once.
+
         :param data: Dictionary containing note data
         :param save: Flag indicating whether to save the note
         :return: A tuple of (note, key) where note is the new Note instance
         :raises KeyError: If 'text' is missing in data
+        :raises IntegrityError: If no free key was found
+                                in ``KEY_ATTEMPTS`` attempts
         """
-        note = Note.from_dict(data)
-        key = Note.generate_key()
-        note.hash = Note.generate_hash(key)
+        streamed = not isinstance(data['text'], str)
+        for attempt in range(1, KEY_ATTEMPTS + 1):
+            key = Note.generate_key()
+            if streamed and Note.get_by_hash(Note.generate_hash(key),
+                                             silent=True):
+                continue
+            note = Note.build(data, key)
+            if not save:
+                return note, key
+            try:
+                note.save()
+            except IntegrityError:
+                db.session.rollback()
+                content_storage.delete([note.content_ref])
+                if streamed or attempt == KEY_ATTEMPTS:
+                    raise
+            else:
+                note_filter.add(note.hash)
+                NOTES_CREATED.inc()
+                return note, key
+        raise IntegrityError(None, None, Exception('No free note key'))
+
+    @staticmethod
+    def create_many(items: list) -> list:
+        """
+        Create and save several notes in a single transaction.
+
+        The notes are inserted with one bulk INSERT, which SQLAlchemy
+        sends as multi-row statements where the driver supports it.
+        If any key collides, the whole batch is retried with new keys.
+
+        :param items: List of dictionaries containing note data
+        :return: List of (note, key) tuples in the order of ``items``;
+                 the returned notes are not attached to the session
+        :raises IntegrityError: If no free keys were found
+                                in ``KEY_ATTEMPTS`` attempts
+        """
+        for attempt in range(1, KEY_ATTEMPTS + 1):
+            keys = [random_key() for _ in items]
+            notes = Note.build_many(items, keys)
+            for note in notes:
+                note.offload()
+            try:
+                db.session.execute(insert(Note), [{
+                    'hash': note.hash,
+                    'title': note.title,
+                    'text': note.text,
+                    'content_ref': note.content_ref,
+                    'kdf': note.kdf,
+                    'expiration_date': note.expiration_date,
+                    'burn_after_reading': note.burn_after_reading,
+                } for note in notes])
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                content_storage.delete(note.content_ref for note in notes)
+                if attempt == KEY_ATTEMPTS:
+                    raise
+            else:
+                for note in notes:
+                    note_filter.add(note.hash)
+                NOTES_CREATED.inc(len(notes))
+                return list(zip(notes, keys))
+
+    @staticmethod
+    def build(data: dict, key: str) -> 'Note':
+        """
+        Build a new encrypted Note for the given key.
+
+        :param data: Dictionary containing note data
+        :param key: Key of the note
+        :return: A new, unsaved Note instance
+        :raises KeyError: If 'text' is missing in data
+        """
+        note = Note.prepare(data, key)
         note.encrypt(key, data.get('password', ''))
-        if save:
-            note.save()
-        return note, key
+        return note
 
-    def copy(self) -> 'Note':
+    @staticmethod
+    def build_many(items: list, keys: list) -> list['Note']:
         """
-        Copy the current note data.
+        Build several encrypted Notes; the keys of password-protected
+        notes are derived concurrently on the KDF pool, and large notes
+        are encrypted concurrently on the crypto pool.
 
-        :return: A new Note instance with the same data
+        :param items: List of dictionaries containing note data
+        :param keys: Keys of the notes
+        :return: New, unsaved Note instances in the order of ``items``
         """
-        return Note(
-            title=self.title,
-            text=self.text,
-            expiration_date=self.expiration_date,
-            burn_after_reading=self.burn_after_reading
-        )
+        notes = [Note.prepare(data, key) for data, key in zip(items, keys)]
+        derived = [key_derivation.submit(data['password'], key, note.kdf)
+                   if note.kdf else None
+                   for note, data, key in zip(notes, items, keys)]
+        sealed = [note.seal(key, DerivedKey(future.result()) if future
+                            else data.get('password', ''))
+                  for note, data, key, future in zip(notes, items, keys,
+                                                     derived)]
+        for note, future in zip(notes, sealed):
+            note.text = future.result()
+            note.title = None
+        return notes
+
+    @staticmethod
+    def prepare(data: dict, key: str) -> 'Note':
+        """
+        Build a new Note for the given key, not yet encrypted.
+
+        :param data: Dictionary containing note data
+        :param key: Key of the note
+        :return: A new, unsaved Note instance
+        :raises KeyError: If 'text' is missing in data
+        """
+        note = Note.from_dict(data)
+        note.hash = Note.generate_hash(key)
+        note.kdf = key_derivation.spec_for(data.get('password', ''))
+        return note
 
     def save(self) -> None:
         """
@@ -141,19 +306,57 @@ class Note(db.Model):
 
         :return: None
         """
+        self.offload()
         db.session.add(self)
         db.session.commit()
 
+    def offload(self) -> None:
+        """
+        Move large text ciphertext to blob storage, keeping only
+        its reference in the row.
+
+        :return: None
+        """
+        if self.content_ref is None:
+            self.text, self.content_ref = content_storage.store(self.text)
+
     def encrypt(self, key: str, password: str) -> None:
         """
-        Encrypt the note's title and text.
+        Encrypt the note's title and text into one envelope, stored
+        in the ``text`` column; ``title`` is left empty.
+
+        The text is either a string or an iterable of UTF-8 encoded
+        chunks; a stream is encrypted incrementally and, if it is large,
+        written to blob storage as it is read.
 
         :param key: Key used for encryption
         :param password: Password used for encryption
         :return: None
         """
-        self.text = Encryptor.encrypt_data(self.text, password, key)
-        self.title = Encryptor.encrypt_data(self.title, password, key)
+        if isinstance(self.text, str):
+            # Timed apart from the key derivation, see KDF_SECONDS
+            secret = Encryptor.derive_key(password, key, self.kdf)
+            with CRYPTO_SECONDS.labels('encrypt').time():
+                self.text = self.seal(key, secret).result()
+        else:
+            self.text, self.content_ref = content_storage.store_stream(
+                Encryptor.encrypt_note(self.title or '', self.text,
+                                       password, key, self.kdf))
+        self.title = None
+
+    def seal(self, key: str, password: str) -> Future:
+        """
+        Start encrypting the note's title and text (a string) into one
+        envelope, on the crypto pool if the text is large.
+
+        :param key: Key used for encryption
+        :param password: Password used for encryption, or the key
+                         derived from it
+        :return: Future of the envelope
+        """
+        return crypto_pool.submit(len(self.text), seal_note,
+                                  self.title or '', self.text, password,
+                                  key, self.kdf)
 
     def decrypt(self, key: str, password: str) -> 'Note':
         """
@@ -161,27 +364,350 @@ class Note(db.Model):
 
         :param key: Key used for decryption
         :param password: Password used for decryption
-        :return: The current Note instance (possibly expired)
+        :return: The current Note instance
+        :raises DecryptionError: If the password is invalid
         """
-        self.text = Encryptor.decrypt_data(self.text, password, key)
-        self.title = Encryptor.decrypt_data(self.title, password, key)
-        if self.burn_after_reading:
-            return self.expire()
+        ciphertext = content_storage.load(self.text, self.content_ref)
+        secret = Encryptor.derive_key(password, key, self.kdf)
+        with CRYPTO_SECONDS.labels('decrypt').time():
+            if Encryptor.is_envelope(ciphertext):
+                self.title, self.text = crypto_pool.run(
+                    len(ciphertext), open_note, ciphertext, secret, key,
+                    self.kdf)
+                return self
+            # Rows written before the envelope format keep two ciphertexts
+            self.text = Encryptor.decrypt_data(ciphertext, secret, key,
+                                               self.kdf)
+            self.title = Encryptor.decrypt_data(self.title, secret, key,
+                                                self.kdf)
         return self
 
+    def open(self, key: str, password: str) -> Iterator[str]:
+        """
+        Decrypt the note's title and return its text incrementally.
+
+        The password is verified on the title before this method
+        returns; the text is read from storage and decrypted segment by
+        segment while the returned iterator is consumed.
+
+        :param key: Key used for decryption
+        :param password: Password used for decryption
+        :return: Iterator over pieces of the decrypted text
+        :raises DecryptionError: If the password is invalid
+        """
+        chunks = content_storage.open(self.text, self.content_ref)
+        first = next(chunks, b'')
+        chunks = itertools.chain([first], chunks)
+        if Encryptor.is_envelope(first):
+            # Only the title and the first segment are decrypted here
+            secret = Encryptor.derive_key(password, key, self.kdf)
+            with CRYPTO_SECONDS.labels('decrypt').time():
+                self.title, text = Encryptor.decrypt_note(chunks, secret,
+                                                          key, self.kdf)
+            return decode_stream(text)
+
+        self.title = Encryptor.decrypt_data(self.title, password, key,
+                                            self.kdf)
+        if not Encryptor.is_chunked(first):
+            # Legacy single-shot ciphertext can only be decrypted at once
+            ciphertext = b''.join(chunks)
+            return iter([Encryptor.decrypt_legacy(ciphertext, password, key,
+                                                  self.kdf)])
+        return decode_stream(Encryptor.decrypt_stream(chunks, password, key,
+                                                      kdf=self.kdf))
+
+    def read_stream(self, key: str, password: str
+                    ) -> Optional[tuple['Note', Iterator[str]]]:
+        """
+        Streaming counterpart of :meth:`read`.
+
+        :param key: Key used for decryption
+        :param password: Password used for decryption
+        :return: A tuple of (note, text iterator), see :meth:`open`, or
+                 None if the note has already been consumed by another
+                 reader or deleted
+        :raises DecryptionError: If the password is invalid
+        """
+        try:
+            if self.burn_after_reading:
+                result = Note.consume_stream(
+                    key, Encryptor.derive_key(password, key, self.kdf))
+            else:
+                self.cache()
+                result = self, self.open(key, password)
+        except DecryptionError:
+            DECRYPTION_FAILURES.inc()
+            raise
+        except ObjectDeletedError:
+            # Reaped between the lookup and the load of the ciphertext
+            return None
+        if result is not None:
+            NOTES_READ.inc()
+        return result
+
+    def read(self, key: str, password: str) -> Optional['Note']:
+        """
+        Decrypt the note, burning it if it is burn-after-reading.
+
+        :param key: Key used for decryption
+        :param password: Password used for decryption
+        :return: The decrypted note, or None if the note has already
+                 been consumed by another reader or deleted
+        :raises DecryptionError: If the password is invalid
+        """
+        try:
+            if self.burn_after_reading:
+                # Derived before the note is deleted, so that the
+                # transaction is not kept open during the key derivation
+                note = Note.consume(
+                    key, Encryptor.derive_key(password, key, self.kdf))
+            else:
+                self.cache()
+                note = self.decrypt(key, password)
+        except DecryptionError:
+            DECRYPTION_FAILURES.inc()
+            raise
+        except ObjectDeletedError:
+            # Reaped between the lookup and the load of the ciphertext
+            return None
+        if note is not None:
+            NOTES_READ.inc()
+        return note
+
+    @staticmethod
+    def consume(key: str, password: str) -> Optional['Note']:
+        """
+        Fetch, decrypt and delete a burn-after-reading note atomically.
+
+        The row is fetched and deleted by a single
+        ``DELETE ... RETURNING`` statement, so of several concurrent
+        readers exactly one receives the note. On databases without
+        ``DELETE ... RETURNING`` the row is selected and then deleted
+        by id, and only the reader whose DELETE removed the row wins.
+        If decryption fails the transaction is rolled back and the note
+        is kept.
+
+        :param key: Key used for decryption
+        :param password: Password used for decryption, or preferably
+                         the key derived from it
+                         (:meth:`Encryptor.derive_key`): a KDF would
+                         otherwise run while the row is deleted but not
+                         committed, holding the lock of the row
+        :return: The decrypted, no longer persisted note, or None if
+                 there is no available note for the key
+        :raises DecryptionError: If the password is invalid
+        """
+        note = Note.take(key)
+        if note is None:
+            return None
+        try:
+            note.decrypt(key, password)
+        except DecryptionError:
+            db.session.rollback()
+            raise
+        db.session.commit()
+        note_filter.mark_stale()
+        NOTES_BURNED.inc()
+        content_storage.delete([note.content_ref])
+        return note
+
+    @staticmethod
+    def consume_stream(key: str, password: str
+                       ) -> Optional[tuple['Note', Iterator[str]]]:
+        """
+        Streaming counterpart of :meth:`consume`.
+
+        The row is deleted once the password has been verified. The
+        blob holding the text is read while the returned iterator is
+        consumed, so the caller deletes it (``content_ref``) once the
+        text has been sent, see
+        :class:`burnote.api.v1.resources.NotesViewResource`.
+
+        :param key: Key used for decryption
+        :param password: Password used for decryption, or preferably
+                         the key derived from it, see :meth:`consume`
+        :return: A tuple of (note, text iterator), or None if there is
+                 no available note for the key
+        :raises DecryptionError: If the password is invalid
+        """
+        note = Note.take(key)
+        if note is None:
+            return None
+        try:
+            chunks = note.open(key, password)
+        except DecryptionError:
+            db.session.rollback()
+            raise
+        db.session.commit()
+        note_filter.mark_stale()
+        NOTES_BURNED.inc()
+        return note, chunks
+
+    @staticmethod
+    def take(key: str) -> Optional['Note']:
+        """
+        Delete an available burn-after-reading note and return it.
+
+        The deletion is not committed: the caller commits once the note
+        has been decrypted, or rolls back to keep it.
+
+        :param key: Key of the note
+        :return: The deleted note with its encrypted content, or None
+                 if there is no available note for the key
+        """
+        columns = Note.__table__.columns
+        condition = Note.consumable(key)
+
+        if db.engine.dialect.delete_returning:
+            row = db.session.execute(
+                delete(Note).where(condition).returning(*columns),
+                execution_options={'synchronize_session': False}
+            ).first()
+        else:
+            row = db.session.execute(select(*columns).where(condition)
+                                     ).first()
+            if row and not db.session.execute(
+                    delete(Note).where(Note.id == row.id),
+                    execution_options={'synchronize_session': False}
+            ).rowcount:
+                row = None
+
+        if row is None:
+            db.session.rollback()
+            return None
+        return Note(**row._asdict())
+
+    @staticmethod
+    def iter_hashes(batch_size: int) -> Iterator[list]:
+        """
+        Iterate over the hashes of all notes in batches.
+
+        Every batch is a separate query (keyset pagination by id), so
+        no long-running cursor is kept open.
+
+        :param batch_size: Maximum number of hashes per batch
+        :return: Iterator over lists of hashes
+        """
+        last = 0
+        while True:
+            rows = db.session.execute(
+                select(Note.id, Note.hash).where(Note.id > last)
+                .order_by(Note.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            yield [row.hash for row in rows]
+            last = rows[-1].id
+
+    def cache(self) -> None:
+        """
+        Keep the encrypted note in the note cache, if it is not
+        burn-after-reading, loading its ciphertext.
+
+        Must be called before the note is decrypted.
+
+        :return: None
+        """
+        if note_cache.enabled and not self.burn_after_reading:
+            note_cache.put(self.hash, {column.key: getattr(self, column.key)
+                                       for column in Note.__table__.columns})
+
+    @staticmethod
+    def from_cache(hash: str) -> Optional['Note']:
+        """
+        Retrieve an available note from the note cache.
+
+        :param hash: Hash string identifying a note
+        :return: A new, detached Note instance, or None if the note is
+                 not cached or no longer available
+        """
+        columns = note_cache.get(hash)
+        if columns is None:
+            return None
+        note = Note(**columns)
+        if note.burn_after_reading or not note.is_available():
+            note_cache.discard([hash])
+            return None
+        return note
+
+    @staticmethod
+    def with_hash(hash: str):
+        """
+        Build the SQL condition matching the note with the given hash.
+
+        With partitioned notes (``NOTE_PARTITIONS``, once the table
+        has been partitioned) the creation time of the note is looked
+        up in the ``note_hash`` table as well, so that PostgreSQL
+        searches only the partition holding the note instead of the
+        hash index of every partition.
+
+        :param hash: Hash string identifying a note
+        :return: A SQLAlchemy boolean clause
+        """
+        if not partitioning.enabled:
+            return Note.hash == hash
+        return and_(Note.hash == hash, Note.timestamp == (
+            select(note_hash.c.timestamp)
+            .where(note_hash.c.hash == hash).scalar_subquery()))
+
+    @staticmethod
+    def select_by_hash(hash: str):
+        """
+        Build the lookup of a note by its hash, see :meth:`get_by_hash`.
+
+        :param hash: Hash string identifying a note
+        :return: A SELECT of the note without its ciphertext
+        """
+        return (select(Note).where(Note.with_hash(hash))
+                .options(with_expression(Note.available, Note.live())))
+
+    @staticmethod
+    def live():
+        """
+        Build the SQL condition matching notes that are neither burned
+        nor expired.
+
+        :return: A SQLAlchemy boolean clause
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return and_(
+            not_(Note.is_expired),
+            or_(Note.expiration_date.is_(None), Note.expiration_date > now)
+        )
+
+    @staticmethod
+    def consumable(key: str):
+        """
+        Build the SQL condition matching an available
+        burn-after-reading note with the given key.
+
+        :param key: Key of the note
+        :return: A SQLAlchemy boolean clause
+        """
+        return and_(
+            Note.with_hash(Note.generate_hash(key)),
+            Note.burn_after_reading,
+            Note.live()
+        )
+
     def is_available(self) -> bool:
         """
         Return True if the note is not expired, otherwise False.
 
+        Time-expired notes are not written back here: the reaper
+        deletes them in the background (see :mod:`burnote.models.reaper`).
+
         :return: Boolean indicating if the note is still available
         """
+        if self.available is not None:
+            return self.available
+
         if self.is_expired:
             return False
 
         if self.expiration_date:
             if datetime.now(timezone.utc) > self.expiration_date.replace(
                     tzinfo=timezone.utc):
-                self.expire()
                 return False
 
         return True
@@ -194,17 +720,3 @@ class Note(db.Model):
         :return: The generated URL as a string
         """
         return f'{SCHEMA}://{DOMAIN}/{key}'
-
-    def expire(self) -> 'Note':
-        """
-        Mark the note as expired and clear its title and text.
-
-        :return: A copy of the note with original data
-        """
-        self.is_expired = True
-        self.expiration_date = datetime.now(timezone.utc)
-        copy = self.copy()
-        self.text = b''
-        self.title = b''
-        db.session.commit()
-        return copy
@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from burnote.metrics import NOTE_CACHE_LOOKUPS
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Invalidations are published on this channel: comma-separated hashes,
+# or FLUSH to empty the caches
+CHANNEL = 'burnote:note-cache'
+FLUSH = '*'
+
+
+class NoteCache:
+    """
+    Least recently used cache of the columns of notes, ciphertext
+    included, kept in the process for ``NOTE_CACHE_TTL`` seconds.
+
+    Repeated lookups of a note (page refreshes, password attempts) are
+    then answered without a query. Only notes that are not
+    burn-after-reading are cached (see :meth:`Note.cache`): their rows
+    never change, and they stop being available only by expiring,
+    which is checked on every hit. Burn-after-reading notes are always
+    read from the database, so burning them never depends on the cache.
+
+    Burned and reaped notes are invalidated in the process that deletes
+    them, and in all processes if ``NOTE_CACHE_REDIS_URL`` is set
+    (requires redis); otherwise the TTL bounds how long other processes
+    keep them.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 0
+        self.ttl = 0
+        self.item_limit = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._client = None
+        self._listener = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Configure the cache and subscribe to invalidations.
+
+        :param app: Flask application
+        :return: None
+        """
+        config = app.config
+        self.max_entries = config['NOTE_CACHE_SIZE']
+        self.ttl = config['NOTE_CACHE_TTL']
+        self.item_limit = config['NOTE_CACHE_ITEM_LIMIT']
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        self._client = None
+        self._entries.clear()
+        if self.max_entries and config['NOTE_CACHE_REDIS_URL']:
+            if redis is None:
+                raise RuntimeError('Note cache invalidation requires the '
+                                   'redis package')
+            self._client = redis.Redis.from_url(config['NOTE_CACHE_REDIS_URL'])
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{CHANNEL: self._on_message})
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1, daemon=True, exception_handler=self._on_error)
+        app.extensions['note_cache'] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, hash: str) -> Optional[dict]:
+        """
+        Look up the columns of a note.
+
+        :param hash: Note hash
+        :return: The cached columns, or None
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(hash)
+            if entry is not None and entry[0] < now:
+                del self._entries[hash]
+                entry = None
+            elif entry is not None:
+                self._entries.move_to_end(hash)
+        NOTE_CACHE_LOOKUPS.labels('miss' if entry is None else 'hit').inc()
+        return None if entry is None else entry[1]
+
+    def put(self, hash: str, columns: dict) -> None:
+        """
+        Cache the columns of a note, unless its ciphertext is larger
+        than ``NOTE_CACHE_ITEM_LIMIT``. A note already cached keeps its
+        expiry time.
+
+        :param hash: Note hash
+        :param columns: Column values by name
+        :return: None
+        """
+        size = len(columns['text'] or b'') + len(columns['title'] or b'')
+        if not self.enabled or size > self.item_limit:
+            return
+        with self._lock:
+            if hash in self._entries:
+                return
+            self._entries[hash] = (time.monotonic() + self.ttl, columns)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, hashes: Iterable[str]) -> None:
+        """
+        Remove notes from the cache of this process.
+
+        :param hashes: Note hashes
+        :return: None
+        """
+        with self._lock:
+            for hash in hashes:
+                self._entries.pop(hash, None)
+
+    def invalidate(self, hashes: Iterable[str]) -> None:
+        """
+        Remove deleted notes from the caches of all processes.
+
+        :param hashes: Note hashes
+        :return: None
+        """
+        if not self.enabled:
+            return
+        hashes = list(hashes)
+        self.discard(hashes)
+        if hashes:
+            self._publish(','.join(hashes))
+
+    def clear(self) -> None:
+        """
+        Empty the caches of all processes.
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+        if self.enabled:
+            self._publish(FLUSH)
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries),
+                'max_entries': self.max_entries}
+
+    def _publish(self, message: str) -> None:
+        if self._client is None:
+            return
+        try:
+            self._client.publish(CHANNEL, message)
+        except Exception:
+            logger.exception('Note cache invalidation failed')
+
+    def _on_error(self, error, pubsub, thread) -> None:
+        # Invalidations may have been missed while disconnected; the
+        # subscription is restored by the next poll
+        logger.warning('Note cache invalidations interrupted: %s', error)
+        with self._lock:
+            self._entries.clear()
+        time.sleep(1)
+
+    def _on_message(self, message: dict) -> None:
+        data = message['data'].decode()
+        if data == FLUSH:
+            with self._lock:
+                self._entries.clear()
+        else:
+            self.discard(data.split(','))
+
+
+note_cache = NoteCache()
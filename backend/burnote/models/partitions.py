@@ -0,0 +1,396 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import OperationalError
+
+from burnote import db
+from burnote.metrics import NOTES_EXPIRED
+from settings import NOTE_PARTITIONS
+
+from .bloom import note_filter
+from .storage import content_storage
+
+# Partitioned notes (PostgreSQL only)
+# ----------------------------------
+# ``flask notes partition`` range-partitions the note table by month of
+# ``timestamp`` into ``note_pYYYYMM`` tables. A unique index on a
+# partitioned table must include the partition key, so ``ix_note_hash``
+# becomes a non-unique index per partition and hashes are unique
+# through the ``note_hash`` table, which maps every hash to the creation
+# time of its note and is maintained by triggers. With
+# ``NOTE_PARTITIONS`` the application routes lookups through
+# ``note_hash`` and the reaper creates partitions ahead of time and
+# drops old partitions once none of their notes can be read any more,
+# which frees them without deleting rows and vacuuming the table.
+# There is no default partition (it would prevent detaching partitions
+# concurrently), so notes can only be created while the reaper keeps
+# creating partitions ahead.
+
+PARTITION_NAME = re.compile(r'^note_p(\d{4})(\d{2})$')
+# Partitions still receive notes created shortly before the end of
+# their month, so they are dropped only once this period has passed
+CLOSE_DELAY = timedelta(days=1)
+# Held while dropping partitions, so that concurrent reapers skip it
+DROP_LOCK = 0x6275726e
+# Longest wait for the lock of the note table when a partition cannot
+# be detached concurrently; the partition is detached by a later run
+DETACH_LOCK_TIMEOUT = '5s'
+
+note_hash = table('note_hash', column('hash'), column('timestamp'))
+
+
+def month_of(day) -> date:
+    return date(day.year, day.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """
+    :param month: First day of the month
+    :return: Name of the partition holding the notes of the month
+    """
+    return f'note_p{month:%Y%m}'
+
+
+def is_partitioned() -> bool:
+    """
+    :return: True if the note table has been partitioned
+             (see :func:`partition_table`)
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT to_regclass('note_hash') IS NOT NULL "
+        "AND coalesce((SELECT relkind = 'p' FROM pg_class "
+        "WHERE oid = to_regclass('note')), false)")).scalar()
+
+
+def list_partitions(conn=None) -> list[tuple[str, date]]:
+    """
+    List the monthly partitions of the note table.
+
+    :param conn: Connection to use, the session by default
+    :return: Sorted list of (partition name, first day of the month)
+    """
+    names = (conn or db.session).execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'note'::regclass"
+    )).scalars()
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            year, month = map(int, match.groups())
+            partitions.append((name, date(year, month, 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_partitions(first: date, months_ahead: int,
+                      existing=()) -> list[str]:
+    """
+    Create the monthly partitions from ``first`` to ``months_ahead``
+    months after the current one, in the current transaction.
+
+    :param first: A day of the first month
+    :param months_ahead: Number of months after the current one
+    :param existing: Names of the partitions that already exist
+    :return: Names of the created partitions
+    """
+    month = month_of(first)
+    last = month_of(datetime.now(timezone.utc))
+    for _ in range(months_ahead):
+        last = next_month(last)
+    created = []
+    while month <= last:
+        name = partition_name(month)
+        if name not in existing:
+            db.session.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF note "
+                f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"))
+            created.append(name)
+        month = next_month(month)
+    return created
+
+
+def ensure_partitions(months_ahead: int) -> list[str]:
+    """
+    Create the partitions of the current and the following months.
+
+    :param months_ahead: Number of months after the current one
+    :return: Names of the created partitions
+    """
+    existing = {name for name, _ in list_partitions()}
+    created = create_partitions(datetime.now(timezone.utc), months_ahead,
+                                existing)
+    db.session.commit()
+    return created
+
+
+def partition_table(months_ahead: int) -> None:
+    """
+    Convert the note table into a partitioned table, copying the
+    existing notes, in one transaction.
+
+    The table is locked while the notes are copied.
+
+    :param months_ahead: Number of months after the current one
+    :return: None
+    :raises RuntimeError: If the table is already partitioned or the
+                          database is not PostgreSQL
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        raise RuntimeError('Partitioned notes require PostgreSQL.')
+    if is_partitioned():
+        raise RuntimeError('The note table is already partitioned.')
+    execute = db.session.execute
+    execute(text('LOCK TABLE note IN EXCLUSIVE MODE'))
+    execute(text('ALTER TABLE note RENAME TO note_unpartitioned'))
+    execute(text('ALTER TABLE note_unpartitioned '
+                 'RENAME CONSTRAINT note_pkey TO note_unpartitioned_pkey'))
+    execute(text('ALTER INDEX ix_note_hash '
+                 'RENAME TO ix_note_unpartitioned_hash'))
+    execute(text('ALTER INDEX ix_note_expiry '
+                 'RENAME TO ix_note_unpartitioned_expiry'))
+
+    execute(text('CREATE TABLE note (LIKE note_unpartitioned '
+                 'INCLUDING DEFAULTS, PRIMARY KEY (id, "timestamp")) '
+                 'PARTITION BY RANGE ("timestamp")'))
+    execute(text('CREATE INDEX ix_note_hash ON note (hash)'))
+    execute(text('CREATE INDEX ix_note_expiry ON note '
+                 '(is_expired, expiration_date) '
+                 'WHERE is_expired OR expiration_date IS NOT NULL'))
+    # Finds live notes without expiration date when dropping partitions
+    execute(text('CREATE INDEX ix_note_no_expiry ON note (id) '
+                 'WHERE NOT is_expired AND expiration_date IS NULL'))
+
+    execute(text('CREATE TABLE note_hash ('
+                 'hash VARCHAR(64) NOT NULL PRIMARY KEY, '
+                 '"timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL)'))
+    execute(text("""
+        CREATE FUNCTION note_hash_insert() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO note_hash (hash, "timestamp")
+            VALUES (NEW.hash, NEW."timestamp");
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    execute(text("""
+        CREATE FUNCTION note_hash_delete() RETURNS trigger AS $$
+        BEGIN
+            DELETE FROM note_hash WHERE hash = OLD.hash;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """))
+    execute(text('CREATE TRIGGER note_hash_insert AFTER INSERT ON note '
+                 'FOR EACH ROW EXECUTE FUNCTION note_hash_insert()'))
+    execute(text('CREATE TRIGGER note_hash_delete AFTER DELETE ON note '
+                 'FOR EACH ROW EXECUTE FUNCTION note_hash_delete()'))
+
+    first = execute(text(
+        'SELECT min("timestamp") FROM note_unpartitioned')).scalar()
+    create_partitions(first or datetime.now(timezone.utc), months_ahead)
+
+    execute(text('INSERT INTO note SELECT * FROM note_unpartitioned'))
+    execute(text('ALTER SEQUENCE note_id_seq OWNED BY note.id'))
+    execute(text('DROP TABLE note_unpartitioned'))
+    db.session.commit()
+
+
+def unpartition_table() -> None:
+    """
+    Convert the partitioned note table back into a plain table, see
+    :func:`partition_table`.
+
+    :return: None
+    :raises RuntimeError: If the table is not partitioned
+    """
+    if not is_partitioned():
+        raise RuntimeError('The note table is not partitioned.')
+    execute = db.session.execute
+    execute(text('LOCK TABLE note IN EXCLUSIVE MODE'))
+    execute(text('CREATE TABLE note_unpartitioned '
+                 '(LIKE note INCLUDING DEFAULTS)'))
+    execute(text('INSERT INTO note_unpartitioned SELECT * FROM note'))
+    execute(text('ALTER SEQUENCE note_id_seq '
+                 'OWNED BY note_unpartitioned.id'))
+    execute(text('DROP TABLE note'))
+    execute(text('DROP TABLE note_hash'))
+    execute(text('DROP FUNCTION note_hash_insert()'))
+    execute(text('DROP FUNCTION note_hash_delete()'))
+
+    execute(text('ALTER TABLE note_unpartitioned RENAME TO note'))
+    execute(text('ALTER TABLE note ADD CONSTRAINT note_pkey '
+                 'PRIMARY KEY (id)'))
+    execute(text('CREATE UNIQUE INDEX ix_note_hash ON note (hash)'))
+    execute(text('CREATE INDEX ix_note_expiry ON note '
+                 '(is_expired, expiration_date) '
+                 'WHERE is_expired OR expiration_date IS NOT NULL'))
+    db.session.commit()
+
+
+def has_live_notes(conn, name: str, now: datetime) -> bool:
+    """
+    :param conn: Connection to use
+    :param name: Partition name
+    :param now: Current UTC time (naive)
+    :return: True if the partition holds a note that can still be read
+    """
+    # Both conditions are served by partial indexes of the partition
+    return conn.execute(text(
+        f'SELECT EXISTS (SELECT 1 FROM {name} '
+        f'WHERE NOT is_expired AND expiration_date IS NULL) '
+        f'OR EXISTS (SELECT 1 FROM {name} '
+        f'WHERE NOT is_expired AND expiration_date >= :now)'
+    ), {'now': now}).scalar()
+
+
+def detached_partitions(conn) -> list[str]:
+    """
+    :param conn: Connection to use
+    :return: Names of the monthly partitions that have been detached
+             from the note table but not dropped yet
+    """
+    names = conn.execute(text(
+        "SELECT relname FROM pg_class "
+        "WHERE relkind = 'r' AND NOT relispartition "
+        "AND relname ~ '^note_p[0-9]{6}$' AND pg_table_is_visible(oid)"
+    )).scalars()
+    return sorted(names)
+
+
+def detach_partitions(conn, now: datetime) -> None:
+    """
+    Detach the closed partitions whose notes are all burned or expired.
+
+    :param conn: Connection in autocommit mode
+    :param now: Current UTC time (naive)
+    :return: None
+    """
+    # A default partition cannot coexist with concurrent detaches
+    concurrently = (conn.dialect.server_version_info >= (14,)
+                    and not conn.execute(text(
+                        "SELECT partdefid <> 0 FROM pg_partitioned_table "
+                        "WHERE partrelid = 'note'::regclass")).scalar())
+    if concurrently:
+        # Detaches interrupted after their first transaction
+        for name in conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'note'::regclass "
+                "AND i.inhdetachpending")).scalars():
+            conn.execute(text(
+                f'ALTER TABLE note DETACH PARTITION {name} FINALIZE'))
+    for name, month in list_partitions(conn):
+        if datetime.combine(next_month(month),
+                            datetime.min.time()) > now - CLOSE_DELAY:
+            return
+        if has_live_notes(conn, name, now):
+            continue
+        try:
+            conn.execute(text(
+                f'ALTER TABLE note DETACH PARTITION {name}'
+                + (' CONCURRENTLY' if concurrently else '')))
+        except OperationalError:
+            # Lock timeout, retried by the next run
+            return
+
+
+def drop_detached(conn) -> int:
+    """
+    Drop the detached partitions with the hashes of their notes, and
+    delete their blobs.
+
+    :param conn: Connection in autocommit mode
+    :return: The number of notes dropped
+    """
+    dropped = 0
+    for name in detached_partitions(conn):
+        refs = conn.execute(text(
+            f'SELECT content_ref FROM {name} '
+            f'WHERE content_ref IS NOT NULL')).scalars().all()
+        count = conn.execute(text(
+            f'DELETE FROM note_hash '
+            f'WHERE hash IN (SELECT hash FROM {name})')).rowcount
+        conn.execute(text(f'DROP TABLE {name}'))
+        note_filter.mark_stale(count)
+        NOTES_EXPIRED.inc(count)
+        content_storage.delete(refs)
+        dropped += count
+    return dropped
+
+
+def drop_partitions() -> int:
+    """
+    Drop closed partitions whose notes are all burned or expired.
+
+    Partitions are detached first, concurrently on PostgreSQL 14 and
+    later, so that queries on the note table are not blocked; otherwise
+    the lock of the note table is waited for at most
+    DETACH_LOCK_TIMEOUT. The detached tables are then dropped with the
+    hashes of their notes. Runs in autocommit mode on its own
+    connection; partitions left detached by an interrupted run are
+    dropped by the next one.
+
+    :return: The number of notes dropped
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    with db.engine.connect().execution_options(
+            isolation_level='AUTOCOMMIT') as conn:
+        if not conn.execute(text('SELECT pg_try_advisory_lock(:lock)'),
+                            {'lock': DROP_LOCK}).scalar():
+            return 0
+        try:
+            conn.execute(text(f"SET lock_timeout = '{DETACH_LOCK_TIMEOUT}'"))
+            detach_partitions(conn, now)
+            return drop_detached(conn)
+        finally:
+            conn.execute(text('RESET lock_timeout'))
+            conn.execute(text('SELECT pg_advisory_unlock(:lock)'),
+                         {'lock': DROP_LOCK})
+
+
+class Partitioning:
+    """
+    Tells whether notes are partitioned: ``NOTE_PARTITIONS`` is set and
+    the note table has been partitioned, which is checked at startup.
+    Otherwise notes are looked up and reaped as in a plain table.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Check the note table if ``NOTE_PARTITIONS`` is set.
+
+        :param app: Flask application
+        :return: None
+        """
+        self.enabled = False
+        app.extensions['partitioning'] = self
+        if not NOTE_PARTITIONS:
+            return
+        with app.app_context():
+            try:
+                self.enabled = is_partitioned()
+            except Exception:
+                app.logger.exception('Could not check the note table')
+            finally:
+                db.session.remove()
+        if not self.enabled:
+            app.logger.warning(
+                'NOTE_PARTITIONS is set but the note table is not '
+                'partitioned; run `flask notes partition`. Notes are '
+                'handled as in a plain table until then.')
+
+
+partitioning = Partitioning()
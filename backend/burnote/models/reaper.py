@@ -0,0 +1,155 @@
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, or_, select
+
+from burnote import db
+from burnote.metrics import NOTES_EXPIRED
+from settings import NOTE_PARTITIONS_AHEAD
+
+from .bloom import note_filter
+from .note import Note
+from .notecache import note_cache
+from .partitions import drop_partitions, ensure_partitions, partitioning
+from .storage import content_storage
+
+
+def reapable():
+    """
+    Build the SQL condition matching notes that can be deleted.
+
+    A note is reapable once it has been burned (``is_expired``) or its
+    expiration date has passed. The condition is served by the partial
+    ``ix_note_expiry`` index.
+
+    :return: A SQLAlchemy boolean clause
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return or_(Note.is_expired, Note.expiration_date < now)
+
+
+def reap_batch(batch_size: int) -> int:
+    """
+    Delete a single bounded batch of expired and burned notes.
+
+    :param batch_size: Maximum number of rows to delete
+    :return: The number of deleted rows
+    """
+    rows = db.session.execute(
+        select(Note.id, Note.hash, Note.content_ref).where(reapable())
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    db.session.execute(
+        delete(Note).where(Note.id.in_([row.id for row in rows])),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    note_filter.mark_stale(len(rows))
+    note_cache.invalidate(row.hash for row in rows)
+    NOTES_EXPIRED.inc(len(rows))
+    # Blobs are deleted only after the rows are gone: a failure here
+    # leaves an orphaned blob, never a note pointing to a missing blob
+    content_storage.delete(row.content_ref for row in rows)
+    return len(rows)
+
+
+def reap(batch_size: int, max_batches: int = 0) -> int:
+    """
+    Delete expired and burned notes in bounded batches.
+
+    Every batch is committed separately, so locks are held only
+    for a short time even when there is a large backlog. With
+    partitioned notes, upcoming partitions are created and old
+    partitions without readable notes are dropped first (see
+    :mod:`burnote.models.partitions`).
+
+    :param batch_size: Maximum number of rows deleted per batch
+    :param max_batches: Stop after this many batches (0 means no limit)
+    :return: The total number of deleted rows
+    """
+    total = 0
+    if partitioning.enabled:
+        ensure_partitions(NOTE_PARTITIONS_AHEAD)
+        total += drop_partitions()
+    batches = 0
+    while not max_batches or batches < max_batches:
+        deleted = reap_batch(batch_size)
+        total += deleted
+        batches += 1
+        if deleted < batch_size:
+            break
+    return total
+
+
+class Reaper:
+    """
+    Runs :func:`reap` periodically in a background thread.
+
+    Every application process (e.g. every gunicorn worker) starts its
+    own scheduler. Concurrent reapers are safe: each batch deletes
+    only the rows that are still present.
+    """
+
+    def __init__(self, app=None):
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Register the reaper on the application and start the scheduler
+        if ``REAPER_INTERVAL`` is set.
+
+        :param app: Flask application
+        :return: None
+        """
+        app.extensions['reaper'] = self
+        if app.config.get('REAPER_INTERVAL'):
+            self.start(app)
+
+    def start(self, app) -> None:
+        """
+        Start the background scheduler thread.
+
+        :param app: Flask application providing the database context
+        :return: None
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(app,), name='burnote-reaper', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background scheduler thread.
+
+        :return: None
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, app) -> None:
+        interval = app.config['REAPER_INTERVAL']
+        while not self._stop.wait(interval):
+            with app.app_context():
+                try:
+                    deleted = reap(app.config['REAPER_BATCH_SIZE'],
+                                   app.config['REAPER_MAX_BATCHES'])
+                    note_filter.maybe_rebuild()
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Reaper run failed')
+                    continue
+            if deleted:
+                app.logger.info('Reaper deleted %d notes', deleted)
+
+
+reaper = Reaper()
@@ -0,0 +1,320 @@
+import hashlib
+import itertools
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, Optional
+
+READ_SIZE = 64 * 1024
+
+try:
+    import boto3
+except ImportError:  # pragma: no cover - optional dependency
+    boto3 = None
+
+
+class BlobStorage(ABC):
+    """
+    Content-addressed storage for note ciphertext.
+
+    Blobs are identified by the SHA-256 digest of their content.
+    """
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """
+        Return the content address of the data.
+
+        :param data: Blob content
+        :return: Hex SHA-256 digest
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @abstractmethod
+    def put(self, data: bytes) -> str:
+        """
+        Store a blob.
+
+        :param data: Blob content
+        :return: Reference of the blob
+        """
+
+    @abstractmethod
+    def get(self, ref: str) -> bytes:
+        """
+        Load a blob.
+
+        :param ref: Reference returned by :meth:`put`
+        :return: Blob content
+        :raises KeyError: If the blob does not exist
+        """
+
+    @abstractmethod
+    def delete(self, ref: str) -> None:
+        """
+        Delete a blob. Deleting a missing blob is not an error.
+
+        :param ref: Reference returned by :meth:`put`
+        :return: None
+        """
+
+    @abstractmethod
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        """
+        Store a blob given as a stream of chunks.
+
+        :param chunks: Blob content as an iterable of byte strings
+        :return: Reference of the blob
+        """
+
+    @abstractmethod
+    def open(self, ref: str) -> Iterator[bytes]:
+        """
+        Load a blob incrementally.
+
+        :param ref: Reference returned by :meth:`put`
+        :return: Iterator over chunks of the blob content
+        :raises KeyError: If the blob does not exist
+        """
+
+
+class LocalStorage(BlobStorage):
+    """
+    Stores blobs as files below a root directory, sharded by the first
+    two bytes of the digest (``ab/cd/abcd...``).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, ref: str) -> str:
+        return os.path.join(self.root, ref[:2], ref[2:4], ref)
+
+    def put(self, data: bytes) -> str:
+        return self.put_stream([data])
+
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        # Write to a temporary file first so readers never see
+        # a partially written blob; the name is known only at the end
+        fd, tmp = tempfile.mkstemp(dir=self.root)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    f.write(chunk)
+            ref = digest.hexdigest()
+            path = self.path(ref)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return ref
+
+    def open(self, ref: str) -> Iterator[bytes]:
+        try:
+            f = open(self.path(ref), 'rb')
+        except FileNotFoundError:
+            raise KeyError(ref) from None
+        return self._read(f)
+
+    @staticmethod
+    def _read(f) -> Iterator[bytes]:
+        with f:
+            while chunk := f.read(READ_SIZE):
+                yield chunk
+
+    def get(self, ref: str) -> bytes:
+        try:
+            with open(self.path(ref), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(ref) from None
+
+    def delete(self, ref: str) -> None:
+        try:
+            os.unlink(self.path(ref))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(BlobStorage):
+    """
+    Stores blobs in an S3-compatible bucket. ``endpoint_url`` points
+    to a non-AWS service, e.g. a local MinIO instance.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '',
+                 endpoint_url: Optional[str] = None):
+        if boto3 is None:
+            raise RuntimeError('S3 storage requires the boto3 package')
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def put(self, data: bytes) -> str:
+        ref = self.digest(data)
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + ref,
+                               Body=data)
+        return ref
+
+    def put_stream(self, chunks: Iterable[bytes]) -> str:
+        # The key is the digest of the content, so the stream is spooled
+        # (to disk once it gets large) before it is uploaded
+        digest = hashlib.sha256()
+        with tempfile.SpooledTemporaryFile(max_size=READ_SIZE) as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+            f.seek(0)
+            ref = digest.hexdigest()
+            self.client.upload_fileobj(f, self.bucket, self.prefix + ref)
+        return ref
+
+    def get(self, ref: str) -> bytes:
+        return b''.join(self.open(ref))
+
+    def open(self, ref: str) -> Iterator[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket,
+                                              Key=self.prefix + ref)
+        except self.client.exceptions.NoSuchKey:
+            raise KeyError(ref) from None
+        return response['Body'].iter_chunks(READ_SIZE)
+
+    def delete(self, ref: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + ref)
+
+
+class ContentStorage:
+    """
+    Decides where note ciphertext is kept.
+
+    Ciphertext smaller than ``STORAGE_INLINE_LIMIT`` bytes stays in the
+    ``note`` row; larger ciphertext is written to the configured blob
+    storage (``STORAGE_BACKEND``: ``local`` or ``s3``) and the row only
+    keeps its reference.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.inline_limit = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Configure the blob storage from the application config.
+
+        :param app: Flask application
+        :return: None
+        """
+        config = app.config
+        self.inline_limit = config['STORAGE_INLINE_LIMIT']
+        if config['STORAGE_BACKEND'] == 'local':
+            self.backend = LocalStorage(config['STORAGE_LOCAL_PATH'])
+        elif config['STORAGE_BACKEND'] == 's3':
+            self.backend = S3Storage(config['STORAGE_S3_BUCKET'],
+                                     config['STORAGE_S3_PREFIX'],
+                                     config['STORAGE_S3_ENDPOINT_URL'])
+        elif config['STORAGE_BACKEND']:
+            raise ValueError(
+                f"Unknown STORAGE_BACKEND {config['STORAGE_BACKEND']!r}")
+        else:
+            self.backend = None
+        app.extensions['content_storage'] = self
+
+    def store(self, ciphertext: bytes) -> tuple[bytes, Optional[str]]:
+        """
+        Store ciphertext outside the row if it is large enough.
+
+        :param ciphertext: Encrypted note content
+        :return: A tuple of (inline content, blob reference); exactly one
+                 of them is meaningful, the inline content is empty when
+                 the reference is set
+        """
+        if not self.offloads(len(ciphertext)):
+            return ciphertext, None
+        return b'', self.backend.put(ciphertext)
+
+    def offloads(self, size: int) -> bool:
+        """
+        :param size: Ciphertext size in bytes
+        :return: True if ciphertext of this size is kept in blob storage
+        """
+        return self.backend is not None and size >= self.inline_limit
+
+    def store_stream(self, chunks: Iterable[bytes]
+                     ) -> tuple[bytes, Optional[str]]:
+        """
+        Store streamed ciphertext, see :meth:`store`.
+
+        Up to ``STORAGE_INLINE_LIMIT`` bytes are buffered in memory;
+        once the stream grows beyond that it is written to the blob
+        storage as it arrives.
+
+        :param chunks: Encrypted note content as an iterable of bytes
+        :return: A tuple of (inline content, blob reference)
+        """
+        chunks = iter(chunks)
+        head = bytearray()
+        for chunk in chunks:
+            head += chunk
+            if self.backend is not None and len(head) >= self.inline_limit:
+                return b'', self.backend.put_stream(
+                    itertools.chain([bytes(head)], chunks))
+        return bytes(head), None
+
+    def load(self, inline: bytes, ref: Optional[str]) -> bytes:
+        """
+        Return the ciphertext stored by :meth:`store`.
+
+        :param inline: Inline content of the row
+        :param ref: Blob reference of the row
+        :return: The ciphertext
+        """
+        if ref is None:
+            return inline
+        return self.blobs().get(ref)
+
+    def open(self, inline: bytes, ref: Optional[str]) -> Iterator[bytes]:
+        """
+        Return the ciphertext stored by :meth:`store` incrementally.
+
+        :param inline: Inline content of the row
+        :param ref: Blob reference of the row
+        :return: Iterator over chunks of the ciphertext
+        """
+        if ref is None:
+            return iter([inline])
+        return self.blobs().open(ref)
+
+    def delete(self, refs) -> None:
+        """
+        Delete the blobs of deleted notes.
+
+        :param refs: Blob references; None values are skipped
+        :return: None
+        """
+        for ref in refs:
+            if ref is not None:
+                self.blobs().delete(ref)
+
+    def blobs(self) -> BlobStorage:
+        """
+        Return the blob storage holding referenced ciphertext.
+
+        :return: The configured blob storage
+        :raises RuntimeError: If ``STORAGE_BACKEND`` is not set, e.g. it
+                              was unset while notes still have blobs
+        """
+        if self.backend is None:
+            raise RuntimeError('A note has its ciphertext in blob storage, '
+                               'but STORAGE_BACKEND is not set; set it to '
+                               'the storage the blobs were written to')
+        return self.backend
+
+
+content_storage = ContentStorage()
@@ -0,0 +1,223 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from werkzeug.exceptions import TooManyRequests
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Token bucket in Redis: KEYS[1] holds the tokens and the time of the
+# last update; ARGV is rate (tokens per second), burst and cost (a
+# negative cost gives tokens back). Returns the seconds to wait, 0 if
+# the request is allowed.
+TOKEN_BUCKET_SCRIPT = '''
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local needed = math.max(cost, 1)
+local wait = 0
+if cost < 0 then
+  tokens = math.min(burst, tokens - cost)
+elseif tokens >= needed then
+  tokens = tokens - cost
+else
+  wait = (needed - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1)
+return tostring(wait)
+'''
+
+
+def parse_limit(limit: str) -> tuple[float, int]:
+    """
+    Parse a limit such as ``5/minute``.
+
+    :param limit: Number of requests and period
+    :return: A tuple of (tokens added per second, bucket size)
+    :raises ValueError: If the limit is malformed
+    """
+    count, _, period = limit.partition('/')
+    try:
+        count = int(count)
+        seconds = PERIODS[period.strip()]
+    except (KeyError, ValueError):
+        raise ValueError(f'Invalid rate limit {limit!r}') from None
+    return count / seconds, count
+
+
+class RateLimitExceeded(TooManyRequests):
+    """
+    Raised when a rate limit is exceeded; renders as a 429 response
+    with a ``Retry-After`` header.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(retry_after=math.ceil(retry_after))
+        self.retry_after = math.ceil(retry_after)
+
+
+class MemoryStorage:
+    """
+    Token buckets kept in the process, evicting the least recently used
+    bucket beyond ``max_entries``.
+
+    An evicted bucket starts full again, so ``max_entries`` should be
+    well above the number of clients seen within one limit period.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, rate: float, burst: int, cost: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            needed = max(cost, 1)
+            if cost < 0:
+                tokens = min(burst, tokens - cost)
+                wait = 0
+            elif tokens >= needed:
+                tokens -= cost
+                wait = 0
+            else:
+                wait = (needed - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisStorage:
+    """
+    Token buckets shared by all processes through Redis (or a
+    compatible server). Every update is a single script call, and
+    buckets expire once they are full again.
+    """
+
+    def __init__(self, url: str, prefix: str = 'burnote:ratelimit:'):
+        if redis is None:
+            raise RuntimeError('Redis rate limit storage requires the '
+                               'redis package')
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, key: str, rate: float, burst: int, cost: int) -> float:
+        return float(self.script(keys=[self.prefix + key],
+                                 args=[rate, burst, cost]))
+
+
+class RateLimiter:
+    """
+    Applies the ``RATELIMIT_*`` limits with token buckets.
+
+    Limits are named: ``create`` and ``read`` are applied per client
+    address, ``password`` to failed password attempts per note: every
+    attempt takes a token up front, which is given back if the password
+    was right, so concurrent attempts cannot share a token.
+    ``RATELIMIT_STORAGE`` selects ``memory`` (single process) or
+    ``redis`` storage; empty disables rate limiting. If the storage
+    fails, requests are allowed.
+    """
+
+    def __init__(self, app=None):
+        self.storage = None
+        self.limits = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Configure the limits and the storage from the application config.
+
+        :param app: Flask application
+        :return: None
+        """
+        config = app.config
+        self.limits = {
+            'create': parse_limit(config['RATELIMIT_CREATE']),
+            'read': parse_limit(config['RATELIMIT_READ']),
+            'password': parse_limit(config['RATELIMIT_PASSWORD']),
+        }
+        if config['RATELIMIT_STORAGE'] == 'memory':
+            self.storage = MemoryStorage(config['RATELIMIT_MAX_ENTRIES'])
+        elif config['RATELIMIT_STORAGE'] == 'redis':
+            self.storage = RedisStorage(config['RATELIMIT_REDIS_URL'])
+        elif config['RATELIMIT_STORAGE']:
+            raise ValueError(
+                f"Unknown RATELIMIT_STORAGE {config['RATELIMIT_STORAGE']!r}")
+        else:
+            self.storage = None
+        app.extensions['rate_limiter'] = self
+
+    @property
+    def remote(self) -> bool:
+        """
+        Whether every call is a network round trip (Redis storage).
+        """
+        return isinstance(self.storage, RedisStorage)
+
+    def hit(self, name: str, key: str, cost: int = 1) -> float:
+        """
+        Take ``cost`` tokens from a bucket.
+
+        :param name: Name of the limit
+        :param key: Client address, note hash, ...
+        :param cost: Tokens to take; 0 only checks that a token is left,
+                     a negative cost gives tokens back
+        :return: Seconds to wait before retrying, 0 if allowed
+        """
+        if self.storage is None:
+            return 0
+        rate, burst = self.limits[name]
+        try:
+            return self.storage.hit(f'{name}:{key}', rate, burst, cost)
+        except Exception:
+            logger.exception('Rate limit storage failed')
+            return 0
+
+    def limit(self, name: str, key: str) -> None:
+        """
+        Count a request against a limit.
+
+        :param name: Name of the limit
+        :param key: Client address, note hash, ...
+        :return: None
+        :raises RateLimitExceeded: If the limit is exceeded
+        """
+        wait = self.hit(name, key)
+        if wait:
+            raise RateLimitExceeded(wait)
+
+    def refund(self, name: str, key: str) -> None:
+        """
+        Give back the token of a request counted with :meth:`limit`,
+        e.g. after a password attempt that succeeded.
+
+        :param name: Name of the limit
+        :param key: Client address, note hash, ...
+        :return: None
+        """
+        self.hit(name, key, cost=-1)
+
+
+rate_limiter = RateLimiter()
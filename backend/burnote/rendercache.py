@@ -0,0 +1,156 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from flask import current_app, render_template, request, session
+
+# Render cache
+# ------------
+# Pages that do not depend on the request (about, API docs, error
+# pages) are rendered once per process and served from memory with an
+# ETag and Last-Modified, answering conditional requests with 304.
+# Pages with a form differ only by the CSRF token: they are rendered
+# once, split at the token and joined with the token of each request.
+# While the session holds flashed messages, or a form has errors,
+# pages are always rendered and not cached: they may show them.
+
+# Fully static pages, with the file names ``flask pages prerender``
+# writes them to
+STATIC_PAGES = {
+    'pages/about.html': 'about.html',
+    'pages/redoc.html': 'docs.html',
+    'errors/404.html': 'errors/404.html',
+    'errors/429.html': 'errors/429.html',
+    'errors/500.html': 'errors/500.html',
+}
+
+
+class CachedPage(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+
+def render_page(template: str) -> CachedPage:
+    """
+    Render a static page.
+
+    :param template: Template name
+    :return: The rendered page with its validators
+    """
+    body = render_template(template).encode()
+    return CachedPage(body, hashlib.sha256(body).hexdigest()[:32],
+                      datetime.now(timezone.utc).replace(microsecond=0))
+
+
+def prerender(directory: str) -> list[str]:
+    """
+    Write the static pages to files, for a web server to serve them
+    without the application.
+
+    :param directory: Output directory
+    :return: Paths of the written files
+    """
+    paths = []
+    with current_app.test_request_context():
+        for template, name in STATIC_PAGES.items():
+            path = os.path.join(directory, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Replace the file at once, it may be served meanwhile
+            with open(path + '.tmp', 'wb') as file:
+                file.write(render_page(template).body)
+            os.replace(path + '.tmp', path)
+            paths.append(path)
+    return paths
+
+
+class RenderCache:
+    """
+    Caches rendered templates, if ``RENDER_CACHE`` is set and templates
+    are not reloaded (i.e. not in debug mode).
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._pages = {}
+        self._forms = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Register the cache on the application.
+
+        :param app: Flask application
+        :return: None
+        """
+        app.extensions['render_cache'] = self
+        reload = app.config['TEMPLATES_AUTO_RELOAD']
+        if reload is None:
+            reload = app.debug
+        self.enabled = app.config['RENDER_CACHE'] and not reload
+        self._pages.clear()
+        self._forms.clear()
+
+    def get(self, template: str) -> CachedPage:
+        """
+        Return a static page, rendering it on first use.
+
+        :param template: Template name
+        :return: The rendered page with its validators
+        """
+        if not self.enabled or '_flashes' in session:
+            return render_page(template)
+        page = self._pages.get(template)
+        if page is None:
+            page = self._pages[template] = render_page(template)
+        return page
+
+    def page(self, template: str, status: int = 200):
+        """
+        Respond with a static page.
+
+        Successful responses carry an ETag and Last-Modified and are
+        revalidated by browsers on every use; error pages are only
+        served from the cache.
+
+        :param template: Template name
+        :param status: Response status code
+        :return: The response, 304 if the client has the current page
+        """
+        page = self.get(template)
+        response = current_app.response_class(page.body, status=status,
+                                              mimetype='text/html')
+        if status != 200:
+            return response
+        response.set_etag(page.etag)
+        response.last_modified = page.last_modified
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    def form(self, template: str, form, **context) -> str:
+        """
+        Render a page with a form, reusing everything but the CSRF token
+        of an earlier rendering.
+
+        :param template: Template name
+        :param form: The form, rendered with ``form.hidden_tag()``
+        :param context: Other template variables, part of the cache key
+        :return: The rendered page
+        """
+        if (not self.enabled or request.method != 'GET' or form.errors
+                or '_flashes' in session or 'csrf_token' not in form):
+            return render_template(template, form=form, **context)
+        token = form.csrf_token.current_token
+        key = (template, tuple(sorted(context.items())))
+        parts = self._forms.get(key)
+        if parts is not None:
+            return token.join(parts)
+        html = render_template(template, form=form, **context)
+        if html.count(token) == 1:
+            self._forms[key] = html.split(token)
+        return html
+
+
+render_cache = RenderCache()
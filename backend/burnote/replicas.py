@@ -0,0 +1,135 @@
+import logging
+import random
+
+from flask import current_app
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.interfaces import UserDefinedOption
+
+from burnote.engine import engine_options
+from burnote.metrics import REPLICA_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Read replicas
+# -------------
+# Statements with the :data:`ON_REPLICA` option are sent to a random
+# replica of ``DB_REPLICA_URIS``, and so are the loads of the deferred
+# columns of the objects they return; everything else, in particular
+# every INSERT and DELETE, goes to the primary. Only note lookups use
+# the option (see :func:`lookup`), and a lookup that finds nothing on
+# the replica is repeated on the primary, so a note that has not
+# reached the replica yet is never reported as missing. Notes are not
+# updated after they are created, so a note found on a lagging replica
+# has the same content as on the primary; burning it still deletes it
+# on the primary, which decides whether it was already consumed.
+
+
+class ReplicaOption(UserDefinedOption):
+    """
+    ORM option routing a statement to a replica. It is propagated to
+    the lazy loads of the returned objects.
+    """
+    propagate_to_loaders = True
+
+
+ON_REPLICA = ReplicaOption()
+
+
+def route(orm_execute_state) -> None:
+    """
+    ``do_orm_execute`` hook sending statements with :data:`ON_REPLICA`
+    to a replica, if the session has replicas.
+
+    :param orm_execute_state: The ORM statement being executed
+    :return: None
+    """
+    engines = orm_execute_state.session.info.get('replicas')
+    if engines and any(isinstance(option, ReplicaOption) for option
+                       in orm_execute_state.user_defined_options):
+        orm_execute_state.bind_arguments['bind'] = random.choice(engines)
+
+
+class RoutingSession(FlaskSession):
+    """
+    Flask-SQLAlchemy session sending lookups to the replicas of the
+    current application.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self.info['replicas'] = current_app.extensions.get('replicas', [])
+
+
+class AsyncRoutingSession(Session):
+    """
+    Synchronous session class of the asyncio sessions, routing like
+    :class:`RoutingSession`. The replica engines are passed in the
+    ``info`` dictionary of the session factory.
+    """
+
+
+event.listen(RoutingSession, 'do_orm_execute', route)
+event.listen(AsyncRoutingSession, 'do_orm_execute', route)
+
+
+def lookup(session: Session, statement):
+    """
+    Run a lookup on a replica, and on the primary if the replica does
+    not find anything or fails.
+
+    :param session: Database session
+    :param statement: SELECT of a single object
+    :return: The object or None
+    """
+    if session.info.get('replicas'):
+        try:
+            found = session.scalar(statement.options(ON_REPLICA))
+        except DBAPIError:
+            logger.exception('Replica lookup failed')
+            REPLICA_LOOKUPS.labels('error').inc()
+            session.rollback()
+        else:
+            REPLICA_LOOKUPS.labels('hit' if found is not None
+                                   else 'miss').inc()
+            if found is not None:
+                return found
+    return session.scalar(statement)
+
+
+def replica_uris(config) -> list[str]:
+    """
+    :param config: Flask configuration
+    :return: Database URLs of the replicas
+    """
+    return [uri.strip() for uri in config['DB_REPLICA_URIS'].split(',')
+            if uri.strip()]
+
+
+class Replicas:
+    """
+    Creates the engines of the read replicas of ``DB_REPLICA_URIS``,
+    with the same ``DB_*`` options as the primary.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """
+        Create the replica engines of the application.
+
+        :param app: Flask application
+        :return: None
+        """
+        app.extensions['replicas'] = [
+            create_engine(uri, **engine_options(
+                {**app.config, 'SQLALCHEMY_DATABASE_URI': uri}))
+            for uri in replica_uris(app.config)
+        ]
+
+
+replicas = Replicas()
@@ -1,15 +1,22 @@
-from flask import render_template
-
 from . import bp
 from burnote import db
+from burnote.rendercache import render_cache
 
 
 @bp.errorhandler(404)
 def page_not_found(error):
-    return render_template('errors/404.html'), 404
+    return render_cache.page('errors/404.html', 404)
+
+
+@bp.errorhandler(429)
+def too_many_requests(error):
+    response = error.get_response()
+    response.set_data(render_cache.get('errors/429.html').body)
+    response.mimetype = 'text/html'
+    return response
 
 
 @bp.errorhandler(500)
 def internal_server_error(error):
     db.session.rollback()
-    return render_template('errors/500.html'), 500
+    return render_cache.page('errors/500.html', 500)
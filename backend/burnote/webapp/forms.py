@@ -5,6 +5,8 @@ from wtforms import (BooleanField, PasswordField, SelectField, StringField,
                      SubmitField, TextAreaField)
 from wtforms.validators import DataRequired, Length, Optional
 
+from settings import NOTE_PASSWORD_MAX_LENGTH, NOTE_TEXT_MAX_SIZE
+
 choises = (
     ('', 'Never'),
     ('1 0 0', '1 minute'),
@@ -29,11 +31,13 @@ def parse_timedelta(timedelta_str):
 
 class NoteForm(FlaskForm):
     title = StringField('Title', validators=[Optional(), Length(max=32)])
-    text = TextAreaField('Body', validators=[DataRequired()])
+    text = TextAreaField('Body', validators=[
+        DataRequired(), Length(max=NOTE_TEXT_MAX_SIZE)])
     expiration = SelectField('Expiration', choices=choises,
                              coerce=parse_timedelta)
     burn_after_reading = BooleanField('Burn after reading')
-    password = PasswordField('Password', validators=[Optional()])
+    password = PasswordField('Password', validators=[
+        Optional(), Length(max=NOTE_PASSWORD_MAX_LENGTH)])
     submit = SubmitField('Submit')
 
 
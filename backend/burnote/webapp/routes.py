@@ -1,9 +1,13 @@
-from flask import flash, render_template
+from datetime import datetime, timezone
+
+from flask import flash, render_template, request
 
 from . import bp
 from .forms import NoteAccessForm, NoteForm
 from burnote.models.errors import DecryptionError
 from burnote.models.note import Note
+from burnote.ratelimit import rate_limiter
+from burnote.rendercache import render_cache
 
 
 @bp.route('/', methods=['GET', 'POST'])
@@ -11,20 +15,22 @@ def create():
     form = NoteForm()
 
     if form.validate_on_submit():
+        rate_limiter.limit('create', request.remote_addr)
         note, key = Note.create(form.data, save=True)
         flash('Note created successfully', 'success')
         return render_template('notes/success.html', link=note.get_link(key))
 
-    return render_template('notes/create.html', form=form)
+    return render_cache.form('notes/create.html', form)
 
 
 @bp.route('/about')
 def about():
-    return render_template('pages/about.html')
+    return render_cache.page('pages/about.html')
 
 
 @bp.route('/<key>', methods=['GET', 'POST'])
 def note_view(key):
+    rate_limiter.limit('read', request.remote_addr)
     note = Note.get_by_key(key)
 
     if not note.is_available():
@@ -35,23 +41,41 @@ def note_view(key):
     # Handle POST request
     form = NoteAccessForm()
     if form.validate_on_submit():
+        hash = note.hash
+        rate_limiter.limit('password', hash)
         try:
-            note = note.decrypt(key, form.password.data)
+            note = note.read(key, form.password.data)
         except DecryptionError:
             flash('Invalid password', 'danger')
             return render_template('notes/password_protected.html', form=form)
+        rate_limiter.refund('password', hash)
 
-        if note.burn_after_reading:
-            flash('This note was only available once. It has been deleted. '
-                  'Make sure to remember the content.', 'warning')
-
-        return render_template('notes/view.html', note=note)
+        return render_note(note)
 
     # Handle GET request
+    if note.kdf is not None:
+        # Only password-protected notes have a KDF: do not derive a key
+        # from an empty password only to find out
+        return render_cache.form('notes/password_protected.html', form)
     try:
-        note = note.decrypt(key, '')
+        note = note.read(key, '')
     except DecryptionError:
-        return render_template('notes/password_protected.html', form=form)
+        return render_cache.form('notes/password_protected.html', form)
+
+    return render_note(note)
+
+
+def render_note(note):
+    """
+    Render a decrypted note.
+
+    :param note: The decrypted note, or None if it was consumed
+                 by a concurrent reader
+    """
+    if note is None:
+        flash('This note has expired and has been deleted.', 'danger')
+        return render_template('notes/expired.html',
+                               exp_time=datetime.now(timezone.utc))
 
     if note.burn_after_reading:
         flash('This note was only available once. It has been deleted. '
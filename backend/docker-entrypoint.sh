@@ -0,0 +1,16 @@
+#!/bin/sh
+# Publish the static files and the pre-rendered pages of this image to
+# the directory served by nginx. It is a volume that outlives the
+# container, so this runs at every start, replacing the files of the
+# previous image.
+set -e
+
+if [ -n "$STATIC_PUBLISH_DIR" ]; then
+    mkdir -p "$STATIC_PUBLISH_DIR"
+    cp -r burnote/static/. "$STATIC_PUBLISH_DIR"/
+    # A short-lived process: no metrics files, reaper or note filter
+    env -u PROMETHEUS_MULTIPROC_DIR REAPER_INTERVAL=0 NOTE_FILTER= \
+        flask pages prerender "$STATIC_PUBLISH_DIR"/pages
+fi
+
+exec "$@"
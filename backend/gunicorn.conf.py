@@ -0,0 +1,63 @@
+"""
+Gunicorn configuration, loaded automatically from the working directory.
+
+``GUNICORN_PRESET`` selects a worker model:
+
+- ``sync``: one request per worker process, ``2 * CPU + 1`` workers;
+- ``gthread``: ``CPU`` workers with ``GUNICORN_THREADS`` threads each,
+  which keeps idle keep-alive connections cheap and lets a worker serve
+  other requests while one waits for the database.
+
+Every value of a preset can be overridden with its own variable
+(``GUNICORN_WORKERS``, ``GUNICORN_THREADS``, ...). Each thread holds at
+most one database connection, so a worker opens up to
+``min(threads, DB_POOL_SIZE + DB_MAX_OVERFLOW)`` connections; keep
+``workers`` times that below the PostgreSQL (or PgBouncer) limit.
+"""
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+
+PRESETS = {
+    'sync': {
+        'worker_class': 'sync',
+        'workers': 2 * cpus + 1,
+        'threads': 1,
+        'keepalive': 2,
+    },
+    'gthread': {
+        'worker_class': 'gthread',
+        'workers': cpus,
+        'threads': 4,
+        'keepalive': 5,
+    },
+}
+
+preset = PRESETS[os.getenv('GUNICORN_PRESET', 'sync')]
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', preset['worker_class'])
+workers = int(os.getenv('GUNICORN_WORKERS', preset['workers']))
+threads = int(os.getenv('GUNICORN_THREADS', preset['threads']))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', preset['keepalive']))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+# Restart workers periodically to bound memory growth, 0 disables it
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+
+def on_starting(server):
+    # Prometheus multiprocess mode: start from an empty metrics directory
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,33 @@
+"""add note expiry index
+
+Revision ID: 0e48a3454256
+Revises: 81ecc2888e7a
+Create Date: 2026-10-18 15:02:11.402913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0e48a3454256'
+down_revision = '81ecc2888e7a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('note', schema=None) as batch_op:
+        batch_op.create_index(
+            'ix_note_expiry', ['is_expired', 'expiration_date'],
+            unique=False,
+            postgresql_where=sa.text(
+                'is_expired OR expiration_date IS NOT NULL'),
+            sqlite_where=sa.text(
+                'is_expired OR expiration_date IS NOT NULL'),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('note', schema=None) as batch_op:
+        batch_op.drop_index('ix_note_expiry')
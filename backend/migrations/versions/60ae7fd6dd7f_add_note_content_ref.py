@@ -0,0 +1,27 @@
+"""add note content_ref
+
+Revision ID: 60ae7fd6dd7f
+Revises: 0e48a3454256
+Create Date: 2026-10-18 15:24:37.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '60ae7fd6dd7f'
+down_revision = '0e48a3454256'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('note', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_ref', sa.String(length=64),
+                                      nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('note', schema=None) as batch_op:
+        batch_op.drop_column('content_ref')
@@ -0,0 +1,27 @@
+"""add note kdf
+
+Revision ID: d6116c5f49b9
+Revises: 60ae7fd6dd7f
+Create Date: 2026-10-18 15:31:02.540118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6116c5f49b9'
+down_revision = '60ae7fd6dd7f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('note', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('kdf', sa.String(length=32),
+                                      nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('note', schema=None) as batch_op:
+        batch_op.drop_column('kdf')
@@ -7,9 +7,143 @@ HASH_LENGTH = 64
 
 KEY_ALPHABET = ascii_lowercase + digits
 KEY_LENGTH = 8
+# Attempts to insert a note before giving up on key collisions
+KEY_ATTEMPTS = 5
+# Maximum number of notes accepted by the batch creation endpoint
+NOTES_BATCH_MAX_SIZE = int(os.environ.get('NOTES_BATCH_MAX_SIZE', '1000'))
+# Size limits of the fields of new notes: title and password in
+# characters, text in bytes of UTF-8 (checked in characters for JSON
+# and form bodies, which MAX_CONTENT_LENGTH limits anyway)
+NOTE_TITLE_MAX_LENGTH = int(os.environ.get('NOTE_TITLE_MAX_LENGTH', '256'))
+NOTE_PASSWORD_MAX_LENGTH = int(os.environ.get('NOTE_PASSWORD_MAX_LENGTH',
+                                              '1024'))
+NOTE_TEXT_MAX_SIZE = int(os.environ.get('NOTE_TEXT_MAX_SIZE',
+                                        str(100 << 20)))
 DOMAIN = os.environ.get('DOMAIN', 'localhost:5000')
 SCHEMA = 'https' if os.environ.get('HTTPS', '0') == '1' else 'http'
+# PostgreSQL only: notes are range-partitioned by month of creation,
+# once the table has been converted by `flask notes partition` (see
+# models/partitions.py)
+NOTE_PARTITIONS = os.environ.get('NOTE_PARTITIONS', '0') == '1'
+# Number of monthly partitions created ahead of the current month
+NOTE_PARTITIONS_AHEAD = int(os.environ.get('NOTE_PARTITIONS_AHEAD', '3'))
 
 class Config(object):
     SECRET_KEY = os.environ.get('SECRET_KEY', 'you-will-never-guess')
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI', 'sqlite:///app.db')
+
+    # Background reaper: 0 disables the in-process scheduler,
+    # use `flask notes reap` (e.g. from cron) instead.
+    REAPER_INTERVAL = int(os.getenv('REAPER_INTERVAL', '0'))
+    REAPER_BATCH_SIZE = int(os.getenv('REAPER_BATCH_SIZE', '1000'))
+    REAPER_MAX_BATCHES = int(os.getenv('REAPER_MAX_BATCHES', '0'))
+
+    # Database connection pool (PostgreSQL only). Every worker process
+    # opens up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'
+    # Do not keep connections in the application, e.g. behind PgBouncer
+    DB_POOL_DISABLED = os.getenv('DB_POOL_DISABLED', '0') == '1'
+    # Statement timeout in milliseconds, 0 disables it
+    DB_STATEMENT_TIMEOUT = int(os.getenv('DB_STATEMENT_TIMEOUT', '0'))
+    # PgBouncer in transaction pooling mode: no prepared statements and
+    # no startup parameters (set statement_timeout on the role instead)
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', '0') == '1'
+    # Comma-separated URLs of read replicas for note lookups, see
+    # burnote/replicas.py; writes always go to SQLALCHEMY_DATABASE_URI
+    DB_REPLICA_URIS = os.getenv('DB_REPLICA_URIS', '')
+
+    # Blob storage for large note ciphertext: '' keeps everything in the
+    # database, 'local' uses STORAGE_LOCAL_PATH, 's3' an S3-compatible
+    # bucket (requires boto3; set the endpoint for MinIO and the like)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', '')
+    STORAGE_INLINE_LIMIT = int(os.getenv('STORAGE_INLINE_LIMIT', '65536'))
+    STORAGE_LOCAL_PATH = os.getenv('STORAGE_LOCAL_PATH', 'blobs')
+    STORAGE_S3_BUCKET = os.getenv('STORAGE_S3_BUCKET', 'burnote')
+    STORAGE_S3_PREFIX = os.getenv('STORAGE_S3_PREFIX', 'notes/')
+    STORAGE_S3_ENDPOINT_URL = os.getenv('STORAGE_S3_ENDPOINT_URL')
+
+    # Password key derivation for new notes: 'scrypt:N:r:p' or
+    # 'pbkdf2:iterations' (see burnote/models/kdf.py). Derivations run
+    # on KDF_WORKERS threads per process, 0 runs them inline.
+    KDF = os.getenv('KDF', 'scrypt:16384:8:1')
+    KDF_WORKERS = int(os.getenv('KDF_WORKERS', str(os.cpu_count() or 1)))
+
+    # Encryption and decryption of notes of CRYPTO_OFFLOAD_SIZE
+    # characters or more: '' runs them on the request thread, 'thread'
+    # or 'process' on a pool of CRYPTO_WORKERS (0 for one per CPU),
+    # see burnote/models/cryptopool.py
+    CRYPTO_EXECUTOR = os.getenv('CRYPTO_EXECUTOR', '')
+    CRYPTO_WORKERS = int(os.getenv('CRYPTO_WORKERS', '0'))
+    CRYPTO_OFFLOAD_SIZE = int(os.getenv('CRYPTO_OFFLOAD_SIZE',
+                                        str(256 * 1024)))
+
+    # Compression of note plaintext before encryption, off by default
+    # since it lets the ciphertext size reveal something of the content:
+    # 'zlib', or 'zstd' (requires zstandard), at COMPRESSION_LEVEL (0
+    # for the default level). Notes smaller than COMPRESSION_MIN_SIZE
+    # bytes, or that a fast compression does not shrink to at most
+    # COMPRESSION_MAX_RATIO of their size, are stored uncompressed.
+    # Decryption fails above DECOMPRESSION_LIMIT bytes of plaintext.
+    COMPRESSION = os.getenv('COMPRESSION', '')
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '0'))
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_MAX_RATIO = float(os.getenv('COMPRESSION_MAX_RATIO', '0.9'))
+    DECOMPRESSION_LIMIT = int(os.getenv('DECOMPRESSION_LIMIT',
+                                        str(256 << 20)))
+
+    # Bloom filter of existing notes, answers lookups of unknown keys
+    # without a query: '' disables it, 'memory' keeps it in the process
+    # (only for a single process), 'redis' shares it (requires redis)
+    NOTE_FILTER = os.getenv('NOTE_FILTER', '')
+    NOTE_FILTER_CAPACITY = int(os.getenv('NOTE_FILTER_CAPACITY', '1000000'))
+    NOTE_FILTER_ERROR_RATE = float(os.getenv('NOTE_FILTER_ERROR_RATE',
+                                             '0.01'))
+    NOTE_FILTER_REDIS_URL = os.getenv('NOTE_FILTER_REDIS_URL',
+                                      'redis://localhost:6379/0')
+
+    # Largest request body read into memory (JSON, forms), in bytes,
+    # and largest form field; larger requests are answered with 413.
+    # Streamed note texts (text/plain and multipart/form-data creates)
+    # are limited by NOTE_TEXT_MAX_SIZE instead.
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(16 << 20)))
+    MAX_FORM_MEMORY_SIZE = int(os.getenv('MAX_FORM_MEMORY_SIZE',
+                                         str(16 << 20)))
+
+    # Cache of the notes that are not burn-after-reading, ciphertext
+    # included, in each process: NOTE_CACHE_SIZE entries (0 disables
+    # it) kept for NOTE_CACHE_TTL seconds, ciphertexts larger than
+    # NOTE_CACHE_ITEM_LIMIT bytes are not cached. NOTE_CACHE_REDIS_URL
+    # sends invalidations to all processes (requires redis).
+    NOTE_CACHE_SIZE = int(os.getenv('NOTE_CACHE_SIZE', '0'))
+    NOTE_CACHE_TTL = float(os.getenv('NOTE_CACHE_TTL', '30'))
+    NOTE_CACHE_ITEM_LIMIT = int(os.getenv('NOTE_CACHE_ITEM_LIMIT', '65536'))
+    NOTE_CACHE_REDIS_URL = os.getenv('NOTE_CACHE_REDIS_URL', '')
+
+    # Number of reverse proxies setting X-Forwarded-For in front of the
+    # application, so that the client address is the real one
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', '0'))
+
+    # Rate limiting with token buckets: '' disables it, 'memory' keeps
+    # the buckets in the process (at most RATELIMIT_MAX_ENTRIES of
+    # them), 'redis' shares them between processes (requires redis).
+    # Limits are 'count/second|minute|hour|day'; create and read apply
+    # per client address, password to failed attempts per note.
+    RATELIMIT_STORAGE = os.getenv('RATELIMIT_STORAGE', '')
+    RATELIMIT_MAX_ENTRIES = int(os.getenv('RATELIMIT_MAX_ENTRIES', '100000'))
+    RATELIMIT_REDIS_URL = os.getenv('RATELIMIT_REDIS_URL',
+                                    'redis://localhost:6379/0')
+    RATELIMIT_CREATE = os.getenv('RATELIMIT_CREATE', '30/minute')
+    RATELIMIT_READ = os.getenv('RATELIMIT_READ', '120/minute')
+    RATELIMIT_PASSWORD = os.getenv('RATELIMIT_PASSWORD', '5/minute')
+
+    # Keep rendered static pages and forms in memory (not in debug mode),
+    # see burnote/rendercache.py
+    RENDER_CACHE = os.getenv('RENDER_CACHE', '1') == '1'
+
+    # Prometheus metrics at /metrics. With several worker processes set
+    # PROMETHEUS_MULTIPROC_DIR to an empty directory, see gunicorn.conf.py
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
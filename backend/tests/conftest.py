@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from burnote import create_app, db
+from settings import Config
+
+
+class TestConfig(Config):
+    """
+    Configuration used by the tests.
+
+    The database is taken from ``TEST_DATABASE_URI`` (a file in the
+    test's temporary directory by default), so the tests can never
+    touch the application database by accident.
+    """
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    REAPER_INTERVAL = 0
+    # A cheap KDF: the tests are about the note logic, not its cost
+    KDF = 'pbkdf2:1000'
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Config(TestConfig):
+        SQLALCHEMY_DATABASE_URI = (os.getenv('TEST_DATABASE_URI')
+                                   or f'sqlite:///{tmp_path / "test.db"}')
+
+    app = create_app(Config)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
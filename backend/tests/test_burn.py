@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from burnote import db
+from burnote.models import Note
+from burnote.models.errors import DecryptionError
+
+READERS = 8
+ROUNDS = 10
+
+
+def race(app, key: str, password: str, text: str) -> list:
+    """
+    Let ``READERS`` threads consume one note at the same time.
+
+    :return: Texts received by the readers that got the note
+    """
+    barrier = threading.Barrier(READERS)
+    results = []
+    errors = []
+
+    def reader():
+        with app.app_context():
+            barrier.wait()
+            try:
+                note = Note.consume(key, password)
+            except DecryptionError:
+                note = None
+            except Exception as e:
+                errors.append(e)
+                note = None
+            finally:
+                db.session.remove()
+            if note is not None:
+                results.append(note.text)
+
+    threads = [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    return results
+
+
+@pytest.mark.parametrize('password', ['', 'secret'])
+def test_concurrent_burns_have_one_winner(app, password):
+    for i in range(ROUNDS):
+        text = f'note {i}'
+        with app.app_context():
+            _, key = Note.create({'text': text, 'password': password,
+                                  'burn_after_reading': True,
+                                  'expiration': None}, save=True)
+
+        assert race(app, key, password, text) == [text]
+
+        with app.app_context():
+            assert Note.get_by_key(key, silent=True) is None
+
+
+def test_wrong_password_does_not_burn(app):
+    with app.app_context():
+        _, key = Note.create({'text': 'kept', 'password': 'secret',
+                              'burn_after_reading': True,
+                              'expiration': None}, save=True)
+
+    assert race(app, key, 'wrong', 'kept') == []
+
+    with app.app_context():
+        assert Note.consume(key, 'secret').text == 'kept'